@@ -0,0 +1,114 @@
+"""
+Benchmark harness for Goblin Forge.
+
+Provides timing, statistics and JSON baselines so runs can be compared to
+flag regressions.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+def measure(fn, repeat=20, warmup=2, ops_per_call=1):
+    """
+    Time a callable.
+
+    Args:
+        fn (callable): Zero-argument callable to time
+        repeat (int): Number of timed calls
+        warmup (int): Untimed calls made first
+        ops_per_call (int): Operations performed by one call, for per-op rates
+
+    Returns:
+        dict: Timing statistics in seconds per call
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "repeat": repeat,
+        "min": samples[0],
+        "median": median,
+        "mean": statistics.fmean(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_second": ops_per_call / median if median else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata():
+    """Describe the machine and revision a run was made on"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(path, results):
+    """Write a run to a JSON baseline file"""
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    with open(path, "w") as f:
+        json.dump({"meta": run_metadata(), "results": results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    """Read a JSON baseline file"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, threshold=0.25):
+    """
+    Compare median timings of two runs.
+
+    Args:
+        baseline (dict): Results of the reference run
+        current (dict): Results of the new run
+        threshold (float): Relative slowdown that counts as a regression
+
+    Returns:
+        list: (name, baseline_median, current_median, ratio, regressed) tuples
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        before = baseline[name]["median"]
+        after = current[name]["median"]
+        ratio = after / before if before else float("inf")
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def format_seconds(value):
+    """Render a duration with a readable unit"""
+    if value < 1e-3:
+        return f"{value * 1e6:.1f}us"
+    if value < 1:
+        return f"{value * 1e3:.2f}ms"
+    return f"{value:.3f}s"
@@ -0,0 +1,264 @@
+"""
+Load generator for Goblin Forge.
+
+Simulates analysts using the dashboard: loading the gadget catalog,
+submitting batches of tasks, polling the task and metrics endpoints,
+uploading files and cancelling tasks. Reports throughput, latency
+percentiles and error rates per action.
+
+    # Against a running deployment
+    python -m benchmarks.load_generator --url http://localhost:8000 --users 50 --duration 60
+
+    # Against an in-process API and Celery worker (no Redis, fake nmap)
+    python -m benchmarks.load_generator --in-process --users 20 --duration 15
+
+The mix of actions is set with --mix, e.g. ``--mix poll=10,submit=3,scan=1``.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.run_benchmarks import configure_environment, quiet, PLUGIN_DIR, WORK_DIR
+
+DEFAULT_MIX = {
+    "gadgets": 2,
+    "poll": 10,
+    "submit": 4,
+    "scan": 1,
+    "upload": 1,
+    "cancel": 1,
+}
+
+ENCODER_MODES = ["base64_encode", "hex_encode", "url_encode", "hash_md5", "hash_sha256"]
+
+
+def parse_mix(value):
+    """Parse ``name=weight,...`` into a weight mapping"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown action: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoadStats:
+    """Collects per-action request outcomes"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, action, latency, status=None, error=None):
+        self.latencies[action].append(latency)
+        if error is not None:
+            self.errors[action] += 1
+        else:
+            self.statuses[action][status] += 1
+
+    def summary(self, elapsed):
+        report = {}
+        for action in sorted(self.latencies):
+            values = sorted(self.latencies[action])
+            statuses = self.statuses[action]
+            failed = self.errors[action] + sum(
+                count for status, count in statuses.items() if status >= 400 and status != 429
+            )
+            report[action] = {
+                "requests": len(values),
+                "throughput_rps": len(values) / elapsed,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p90_ms": percentile(values, 0.90) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+                "error_rate": failed / len(values),
+                "rejected_429": statuses.get(429, 0),
+                "statuses": dict(statuses),
+            }
+        return report
+
+
+class VirtualUser:
+    """One simulated dashboard user"""
+
+    def __init__(self, client, stats, mix, batch_size, upload_size, think_time):
+        self.client = client
+        self.stats = stats
+        self.actions = list(mix)
+        self.weights = [mix[a] for a in self.actions]
+        self.batch_size = batch_size
+        self.upload_size = upload_size
+        self.think_time = think_time
+        self.user_id = f"load-{random.getrandbits(32):08x}"
+
+    async def request(self, action, method, url, **kwargs):
+        headers = kwargs.pop("headers", {})
+        headers["X-Client-Id"] = self.user_id
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(action, time.perf_counter() - start, error=e)
+            return None
+        self.stats.record(action, time.perf_counter() - start, status=response.status_code)
+        return response
+
+    async def submit(self, action, gadget_id, modes, parameters):
+        response = await self.request(action, "POST", "/api/submit_task", json={
+            "gadget_id": gadget_id, "modes": modes, "parameters": parameters,
+        })
+        if response is not None and response.status_code == 200:
+            return response.json().get("task_ids", [])
+        return []
+
+    async def do_gadgets(self):
+        await self.request("gadgets", "GET", "/api/gadgets")
+
+    async def do_poll(self):
+        # One dashboard refresh hits all three panels
+        await asyncio.gather(
+            self.request("poll.pending_tasks", "GET", "/api/pending_tasks"),
+            self.request("poll.minion_metrics", "GET", "/api/minion_metrics"),
+            self.request("poll.completed_tasks", "GET", "/api/completed_tasks"),
+        )
+
+    async def do_submit(self):
+        modes = random.sample(ENCODER_MODES, min(self.batch_size, len(ENCODER_MODES)))
+        payload = os.urandom(64).hex()  # Unique input so submissions are not coalesced
+        await self.submit("submit", "encoder", modes, {mode: {"input": payload} for mode in modes})
+
+    async def do_scan(self):
+        target = f"10.0.{random.randint(0, 255)}.{random.randint(1, 254)}"
+        await self.submit("scan", "scanner", ["quick_scan"], {"quick_scan": {"target": target}})
+
+    async def do_upload(self):
+        files = {"file": (f"{self.user_id}.bin", os.urandom(self.upload_size), "application/octet-stream")}
+        response = await self.request("upload", "POST", "/api/upload_file", files=files)
+        if response is not None and response.status_code == 200:
+            file_path = response.json()["file_path"]
+            await self.submit("upload.submit", "file_processor", ["file_analyzer"], {
+                "file_analyzer": {"input_file": file_path, "analysis_type": "basic"}
+            })
+
+    async def do_cancel(self):
+        task_ids = await self.submit("cancel.submit", "scanner", ["full_scan"], {
+            "full_scan": {"target": f"cancel-{random.getrandbits(32):08x}"}
+        })
+        for task_id in task_ids:
+            await self.request("cancel", "POST", f"/api/cancel_task/{task_id}")
+
+    async def run(self, deadline):
+        while time.monotonic() < deadline:
+            action = random.choices(self.actions, self.weights)[0]
+            await getattr(self, f"do_{action}")()
+            if self.think_time:
+                await asyncio.sleep(random.expovariate(1 / self.think_time))
+
+
+async def run_load(client, users, duration, mix, batch_size, upload_size, think_time, ramp_up):
+    stats = LoadStats()
+    start = time.monotonic()
+    deadline = start + duration
+
+    async def start_user(index):
+        # Spread user start-up over the ramp-up period
+        await asyncio.sleep(ramp_up * index / max(1, users))
+        await VirtualUser(client, stats, mix, batch_size, upload_size, think_time).run(deadline)
+
+    await asyncio.gather(*(start_user(i) for i in range(users)))
+    return stats.summary(time.monotonic() - start)
+
+
+@contextlib.contextmanager
+def in_process_stack(worker_concurrency):
+    """Run the API app and a threaded Celery worker on the in-memory transport"""
+    configure_environment(eager=False)
+
+    from celery.contrib.testing.worker import start_worker
+    from goblin_forge.api import main as api
+    from goblin_forge.core.minion_manager import celery_app
+
+    api.plugin_loader.plugin_dir = PLUGIN_DIR
+    with quiet():
+        api.plugin_loader.discover_gadgets()
+    try:
+        with start_worker(celery_app, pool="threads", concurrency=worker_concurrency,
+                          perform_ping_check=False, shutdown_timeout=30):
+            yield httpx.ASGITransport(app=api.app)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+def print_report(report, elapsed_target):
+    print(f"\n{'action':<24} {'reqs':>7} {'rps':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'err%':>6} {'429':>6}")
+    for action, row in report.items():
+        print(
+            f"{action:<24} {row['requests']:>7} {row['throughput_rps']:>8.1f} "
+            f"{row['p50_ms']:>7.1f}ms {row['p90_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms "
+            f"{row['error_rate'] * 100:>5.1f}% {row['rejected_429']:>6}"
+        )
+    total = sum(row["requests"] for row in report.values())
+    print(f"\n{total} requests in {elapsed_target:.0f}s ({total / elapsed_target:.1f} req/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate dashboard and submission load against Goblin Forge")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running Goblin Forge API")
+    target.add_argument("--in-process", action="store_true",
+                        help="Drive an in-process API and Celery worker instead of a deployment")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load")
+    parser.add_argument("--ramp-up", type=float, default=2, help="Seconds over which users start")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Action weights, e.g. poll=10,submit=3")
+    parser.add_argument("--batch-size", type=int, default=3, help="Modes per encoder submission")
+    parser.add_argument("--upload-size", type=int, default=256 * 1024, help="Bytes per uploaded file")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between a user's actions")
+    parser.add_argument("--worker-concurrency", type=int, default=4, help="Threads of the in-process worker")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    async def drive(transport=None):
+        client_args = {"base_url": args.url or "http://goblin-forge", "timeout": 60}
+        if transport is not None:
+            client_args["transport"] = transport
+        async with httpx.AsyncClient(**client_args) as client:
+            return await run_load(
+                client, args.users, args.duration, args.mix, args.batch_size,
+                args.upload_size, args.think_time, args.ramp_up
+            )
+
+    if args.in_process:
+        with in_process_stack(args.worker_concurrency) as transport, quiet():
+            report = asyncio.run(drive(transport))
+    else:
+        report = asyncio.run(drive())
+
+    print_report(report, args.duration)
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
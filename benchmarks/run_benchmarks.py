@@ -0,0 +1,436 @@
+"""
+Run the Goblin Forge benchmark suite.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --save benchmarks/baselines/local.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baselines/local.json
+
+Celery runs eagerly on the in-memory transport, so no Redis is needed, and
+ScannerGadget runs against the fake nmap in benchmarks/fake_bin. Comparing
+against a saved baseline exits non-zero when a benchmark regressed by more
+than --threshold.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FAKE_BIN = REPO_ROOT / "benchmarks" / "fake_bin"
+PLUGIN_DIR = REPO_ROOT / "goblin_forge" / "plugins"
+WORK_DIR = Path(tempfile.mkdtemp(prefix="goblin_bench_"))
+
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.harness import (  # noqa: E402
+    measure, save_results, load_results, compare_results, format_seconds
+)
+
+
+def configure_environment(eager=True):
+    """Isolate the run in a scratch directory with limits that stay out of the way"""
+    os.environ.setdefault("GOBLIN_METRICS_DIR", str(WORK_DIR / "metrics"))
+    os.environ.setdefault("GOBLIN_TRACE_EXPORTER", "none")
+    os.environ.setdefault("GOBLIN_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("GOBLIN_COALESCE_WINDOW", "0")
+    for name in ("GOBLIN_CLIENT_RATE", "GOBLIN_CLIENT_BURST",
+                 "GOBLIN_MAX_PENDING_TASKS", "GOBLIN_MAX_INFLIGHT_PER_GADGET"):
+        os.environ.setdefault(name, "1000000000")
+    os.environ["PATH"] = f"{FAKE_BIN}{os.pathsep}{os.environ['PATH']}"
+    os.chdir(WORK_DIR)
+
+    from goblin_forge.core.minion_manager import celery_app
+    celery_app.conf.update(
+        broker_url="memory://",
+        result_backend="cache+memory://",
+        task_always_eager=eager,
+    )
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow anything the code under test writes to stdout"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _synthetic_plugins(count):
+    """Write `count` statically declared gadgets into a scratch plugin directory"""
+    plugin_dir = WORK_DIR / "synthetic_plugins" / "plugins"
+    plugin_dir.mkdir(exist_ok=True, parents=True)
+    (plugin_dir / "__init__.py").touch()
+    for i in range(count):
+        (plugin_dir / f"gadget_{i}.py").write_text(
+            "from goblin_forge.plugins.base_gadget import BaseGadget\n\n"
+            f"class Gadget{i}(BaseGadget):\n"
+            f"    name = 'Gadget {i}'\n"
+            f"    tab_id = 'gadget_{i}'\n"
+            "    modes = [{'id': 'run', 'name': 'Run', 'description': 'Run it'}]\n"
+            "    form_schemas = {'run': {'input': {'type': 'string', 'label': 'Input'}}}\n"
+        )
+    return plugin_dir
+
+
+def bench_plugin_discovery(repeat):
+    from goblin_forge.core.plugin_loader import PluginLoader
+
+    counter = iter(range(1_000_000))
+    results = {}
+    with quiet():
+        # No manifest yet: every plugin is parsed (and imported if not declared statically)
+        results["plugin_loader.discover_gadgets.cold"] = measure(
+            lambda: PluginLoader(str(PLUGIN_DIR), WORK_DIR / f"manifest_{next(counter)}.json").discover_gadgets(),
+            repeat=repeat
+        )
+        # Fresh process with a manifest on disk, as on API or worker restart
+        manifest_path = WORK_DIR / "manifest.json"
+        PluginLoader(str(PLUGIN_DIR), manifest_path).discover_gadgets()
+        results["plugin_loader.discover_gadgets.manifest"] = measure(
+            lambda: PluginLoader(str(PLUGIN_DIR), manifest_path).discover_gadgets(), repeat=repeat
+        )
+        loader = PluginLoader(str(PLUGIN_DIR), manifest_path)
+        results["plugin_loader.discover_gadgets.warm"] = measure(
+            loader.discover_gadgets, repeat=repeat
+        )
+
+        synthetic_dir = _synthetic_plugins(200)
+        synthetic_manifest = WORK_DIR / "synthetic_manifest.json"
+        results["plugin_loader.discover_gadgets.cold.200"] = measure(
+            lambda: PluginLoader(str(synthetic_dir), WORK_DIR / f"manifest_{next(counter)}.json").discover_gadgets(),
+            repeat=repeat, warmup=0
+        )
+        PluginLoader(str(synthetic_dir), synthetic_manifest).discover_gadgets()
+        results["plugin_loader.discover_gadgets.manifest.200"] = measure(
+            lambda: PluginLoader(str(synthetic_dir), synthetic_manifest).discover_gadgets(), repeat=repeat
+        )
+    return results
+
+
+def bench_api(repeat):
+    from fastapi.testclient import TestClient
+    from goblin_forge.api import main as api
+
+    api.plugin_loader.plugin_dir = PLUGIN_DIR
+    submission = {
+        "gadget_id": "encoder",
+        "modes": ["hash_sha256"],
+        "parameters": {"hash_sha256": {"input": "goblin" * 100}},
+    }
+
+    results = {}
+    with quiet(), TestClient(api.app) as client:
+        results["api.get_gadgets"] = measure(lambda: client.get("/api/gadgets"), repeat=repeat)
+        results["api.submit_task"] = measure(
+            lambda: client.post("/api/submit_task", json=submission), repeat=repeat
+        )
+    return results
+
+
+def bench_minion_bookkeeping(sizes, batch=20, repeat=10):
+    from goblin_forge.core import minion_manager as mm
+    from goblin_forge.plugins.encoder_gadget import EncoderGadget
+
+    class FakeAsyncResult:
+        id = "bench"
+
+    results = {}
+    gadget = EncoderGadget()
+    for size in sizes:
+        manager = mm.MinionManager(results_dir=str(WORK_DIR / f"bookkeeping_{size}"))
+        manager.coalesce_window = 0
+        manager.create_result_directory = lambda name, mode: WORK_DIR
+        loop = asyncio.new_event_loop()
+
+        with quiet(), \
+                mock.patch.object(mm.execute_gadget_task, "apply_async", return_value=FakeAsyncResult()), \
+                mock.patch.object(manager, "_monitor_task", new=mock.AsyncMock()):
+            # Fill the manager with `size` pending tasks, then time more work at that depth
+            for i in range(size):
+                loop.run_until_complete(manager.submit_task(gadget, "hash_md5", {"input": str(i)}))
+
+            counter = iter(range(size, size * 10))
+            results[f"minion_manager.submit.{size}"] = measure(
+                lambda: [
+                    loop.run_until_complete(manager.submit_task(gadget, "hash_md5", {"input": str(next(counter))}))
+                    for _ in range(batch)
+                ],
+                repeat=repeat, warmup=0, ops_per_call=batch
+            )
+
+            pending_ids = iter([t["task_id"] for t in list(manager.pending_tasks)])
+            results[f"minion_manager.complete.{size}"] = measure(
+                lambda: [
+                    manager.update_task_status(next(pending_ids), manager.STATUS_IDLE, {"status": "completed"})
+                    for _ in range(batch)
+                ],
+                repeat=repeat, warmup=0, ops_per_call=batch
+            )
+            results[f"minion_manager.get_pending_tasks.{size}"] = measure(
+                manager.get_pending_tasks, repeat=repeat
+            )
+            results[f"minion_manager.list_tasks.{size}"] = measure(
+                lambda: manager.list_tasks("pending", limit=50, fields=["task_id", "status"], mode="hash_md5"),
+                repeat=repeat
+            )
+        loop.close()
+    return results
+
+
+def _completed_task_list(count):
+    """Task dicts shaped like /api/completed_tasks entries"""
+    return [
+        {
+            "task_id": f"Encoder & Decoder_hash_md5_1700000000_{i:06x}",
+            "gadget_id": "encoder",
+            "gadget_name": "Encoder & Decoder",
+            "mode": "hash_md5",
+            "params": {"input": f"goblin payload {i}" * 8},
+            "result_dir": f"results/goblinforge_20240101_000000_encoder_&_decoder_hash_md5_{i}",
+            "submit_time": "2024-01-01T00:00:00.000000",
+            "completion_time": "2024-01-01T00:00:01.000000",
+            "execution_time_seconds": 1.0 + i / 1000,
+            "status": "Idle Goblin",
+            "result": {
+                "status": "completed",
+                "result_file": f"results/goblinforge_{i}/result.txt",
+                "result_preview": f"{i:032x}",
+                "execution_time": 0.004,
+                "resource_usage": {"run_time_seconds": 0.003, "peak_rss_bytes": 60000000, "subprocess_count": 0},
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def bench_serialization(sizes, repeat):
+    """Default FastAPI response path against the fast path, and bytes on the wire"""
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from starlette.responses import JSONResponse
+    from goblin_forge.api import responses
+
+    list_adapter = TypeAdapter(List[dict])
+    results = {}
+    for size in sizes:
+        tasks = _completed_task_list(size)
+
+        def default_path():
+            # response_model=List[dict] validation, jsonable_encoder, then json.dumps
+            return JSONResponse(jsonable_encoder(list_adapter.validate_python(tasks))).body
+
+        def fast_path():
+            return responses.FastJSONResponse(tasks).body
+
+        body = fast_path()
+        encodings = {"gzip": lambda: responses.compress(body, "gzip")}
+        if responses.brotli is not None:
+            encodings["br"] = lambda: responses.compress(body, "br")
+
+        results[f"serialization.default.{size}"] = measure(default_path, repeat=repeat)
+        results[f"serialization.default.{size}"]["bytes"] = len(default_path())
+        results[f"serialization.fast.{size}"] = measure(fast_path, repeat=repeat)
+        results[f"serialization.fast.{size}"]["bytes"] = len(body)
+        for name, encode in encodings.items():
+            stats = measure(encode, repeat=repeat)
+            stats["bytes"] = len(encode())
+            results[f"serialization.fast.{name}.{size}"] = stats
+    return results
+
+
+def _encoder_inputs(size):
+    import base64
+    import urllib.parse
+
+    text = ("goblin forge " * (size // 13 + 1))[:size]
+    return {
+        "base64_encode": text,
+        "base64_decode": base64.b64encode(text.encode()).decode(),
+        "hex_encode": text,
+        "hex_decode": text.encode().hex(),
+        "url_encode": text,
+        "url_decode": urllib.parse.quote(text),
+        "hash_md5": text,
+        "hash_sha256": text,
+    }
+
+
+def bench_encoder(sizes, repeat):
+    from goblin_forge.plugins.encoder_gadget import EncoderGadget
+
+    gadget = EncoderGadget()
+    loop = asyncio.new_event_loop()
+    result_dir = WORK_DIR / "encoder"
+    results = {}
+    for size in sizes:
+        for mode, text in _encoder_inputs(size).items():
+            stats = measure(
+                lambda: loop.run_until_complete(gadget.execute(mode, {"input": text}, result_dir)),
+                repeat=repeat
+            )
+            stats["mb_per_second"] = size / stats["median"] / 1e6
+            results[f"encoder.{mode}.{size}"] = stats
+
+    # 1000 short inputs: one execute() per input vs. a single execute_batch()
+    items = [{"input": f"record-{i}"} for i in range(1000)]
+    results["encoder.hash_sha256.1000_items.per_item"] = measure(
+        lambda: [loop.run_until_complete(gadget.execute("hash_sha256", item, result_dir)) for item in items],
+        repeat=max(3, repeat // 4)
+    )
+    results["encoder.hash_sha256.1000_items.batch"] = measure(
+        lambda: loop.run_until_complete(gadget.execute_batch("hash_sha256", items, result_dir)),
+        repeat=repeat
+    )
+    loop.close()
+    return results
+
+
+def bench_file_processor(size, repeat):
+    from goblin_forge.plugins.file_processor_gadget import FileProcessorGadget
+
+    input_file = WORK_DIR / "large_input.bin"
+    chunk = os.urandom(1024 * 1024)
+    with open(input_file, "wb") as f:
+        for _ in range(max(1, size // len(chunk))):
+            f.write(chunk)
+
+    gadget = FileProcessorGadget()
+    loop = asyncio.new_event_loop()
+    result_dir = WORK_DIR / "file_processor"
+    result_dir.mkdir(exist_ok=True)
+    results = {}
+    for mode, extra in (("file_analyzer", {"analysis_type": "detailed"}),
+                        ("file_converter", {"output_format": "txt"})):
+        stats = measure(
+            lambda: loop.run_until_complete(
+                gadget.execute(mode, {"input_file": str(input_file), **extra}, result_dir)
+            ),
+            repeat=repeat, warmup=1
+        )
+        stats["mb_per_second"] = size / stats["median"] / 1e6
+        results[f"file_processor.{mode}.{size}"] = stats
+    loop.close()
+    return results
+
+
+def bench_scanner(repeat):
+    from goblin_forge.plugins.scanner_gadget import ScannerGadget
+
+    gadget = ScannerGadget()
+    loop = asyncio.new_event_loop()
+    result_dir = WORK_DIR / "scanner"
+    fake_nmap = str(FAKE_BIN / "nmap")
+    results = {
+        # Reference cost of launching the stub, to separate gadget overhead from process startup
+        "scanner.bare_subprocess": measure(
+            lambda: subprocess.run([fake_nmap, "-F", "127.0.0.1"], capture_output=True), repeat=repeat
+        ),
+    }
+    with quiet():
+        for mode in ("quick_scan", "full_scan"):
+            results[f"scanner.{mode}"] = measure(
+                lambda: loop.run_until_complete(gadget.execute(mode, {"target": "127.0.0.1"}, result_dir)),
+                repeat=repeat
+            )
+
+        # Daily rescan of an unchanged range: every host scanned in full vs. against the baseline
+        hosts_file = WORK_DIR / "fake_network.json"
+        network = {f"10.0.0.{i}": {"up": True, "ports": {"22": "ssh", "80": "http"}} for i in range(1, 21)}
+        hosts_file.write_text(json.dumps(network))
+        target = " ".join(network)
+        with mock.patch.dict(os.environ, {"FAKE_NMAP_HOSTS": str(hosts_file), "FAKE_NMAP_HOST_DELAY": "0.01"}):
+            results["scanner.incremental_scan.20_hosts_no_baseline"] = measure(
+                lambda: loop.run_until_complete(gadget.execute(
+                    "incremental_scan", {"target": target, "reset_baseline": True}, result_dir
+                )),
+                repeat=repeat
+            )
+            loop.run_until_complete(gadget.execute("incremental_scan", {"target": target}, result_dir))
+            results["scanner.incremental_scan.20_hosts_unchanged"] = measure(
+                lambda: loop.run_until_complete(gadget.execute("incremental_scan", {"target": target}, result_dir)),
+                repeat=repeat
+            )
+    loop.close()
+    return results
+
+
+def run(quick=False, only=None):
+    configure_environment()
+    repeat = 5 if quick else 20
+    suites = {
+        "plugins": lambda: bench_plugin_discovery(repeat),
+        "api": lambda: bench_api(repeat),
+        "serialization": lambda: bench_serialization([100] if quick else [100, 1000], repeat),
+        "minion_manager": lambda: bench_minion_bookkeeping([10_000] if quick else [10_000, 100_000]),
+        "encoder": lambda: bench_encoder([1024, 65536] if quick else [1024, 65536, 1024 * 1024], repeat),
+        "file_processor": lambda: bench_file_processor((8 if quick else 64) * 1024 * 1024, 3 if quick else 5),
+        "scanner": lambda: bench_scanner(repeat),
+    }
+
+    results = {}
+    for name, suite in suites.items():
+        if only and only not in name:
+            continue
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        results.update(suite())
+    return results
+
+
+def print_results(results):
+    print(f"{'benchmark':<48} {'median':>10} {'p95':>10} {'ops/s':>12} {'MB/s':>9} {'bytes':>10}")
+    for name, stats in sorted(results.items()):
+        mbps = stats.get("mb_per_second")
+        print(
+            f"{name:<48} {format_seconds(stats['median']):>10} {format_seconds(stats['p95']):>10} "
+            f"{stats['ops_per_second'] or 0:>12.1f} {f'{mbps:.1f}' if mbps else '':>9} "
+            f"{stats.get('bytes', ''):>10}"
+        )
+
+
+def print_comparison(rows):
+    print(f"\n{'benchmark':<48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, before, after, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<48} {format_seconds(before):>10} {format_seconds(after):>10} {ratio:>7.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Goblin Forge benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs and fewer repetitions")
+    parser.add_argument("--only", help="Only run suites whose name contains this string")
+    parser.add_argument("--save", help="Write the results to this JSON baseline file")
+    parser.add_argument("--compare", help="Compare against this JSON baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative slowdown of the median reported as a regression")
+    args = parser.parse_args(argv)
+    # The run changes into a scratch directory, so pin paths first
+    save_path = os.path.abspath(args.save) if args.save else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    try:
+        results = run(quick=args.quick, only=args.only)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    print_results(results)
+    if save_path:
+        save_results(save_path, results)
+        print(f"\nSaved baseline to {save_path}")
+    if compare_path:
+        rows = compare_results(load_results(compare_path)["results"], results, args.threshold)
+        print_comparison(rows)
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ function MinionDashboard() {
   const [minionStatus, setMinionStatus] = useState({});
   const [pendingTasks, setPendingTasks] = useState([]);
   const [metrics, setMetrics] = useState(null);
+  const [workers, setWorkers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -53,6 +54,10 @@ function MinionDashboard() {
       console.log('Metrics:', metricsResponse.data);
       setMetrics(metricsResponse.data || {});
       
+      // Fetch worker inventory
+      const workersResponse = await axios.get(`${API_URL}/workers`);
+      setWorkers(workersResponse.data.workers || []);
+      
       setError(null);
       setLoading(false);
     } catch (err) {
@@ -82,6 +87,16 @@ function MinionDashboard() {
     }
   };
 
+  const drainMinion = async (minionId) => {
+    try {
+      const response = await axios.post(`${API_URL}/drain_minion/${minionId}`);
+      alert(response.data.message);
+      fetchData();
+    } catch (err) {
+      alert('Failed to drain minion: ' + err.message);
+    }
+  };
+
   const resumeMinion = async (minionId) => {
     try {
       const response = await axios.post(`${API_URL}/resume_minion/${minionId}`);
@@ -172,14 +187,82 @@ function MinionDashboard() {
         </Row>
       )}
 
-      {/* Active Minions */}
+      {/* Workers */}
       <div className="d-flex justify-content-between align-items-center mb-3">
-        <h5 className="mb-0">Active Minions</h5>
+        <h5 className="mb-0">Workers</h5>
         <Button variant="outline-primary" size="sm" onClick={fetchData}>
           Refresh
         </Button>
       </div>
 
+      {workers.length === 0 ? (
+        <div className="text-center p-4">
+          <p className="text-muted">No workers are reporting. Start a Minion worker to see it here!</p>
+        </div>
+      ) : (
+        <Table responsive hover>
+          <thead>
+            <tr>
+              <th>Worker</th>
+              <th>State</th>
+              <th>Active / Reserved</th>
+              <th>Busy</th>
+              <th>Tasks/s</th>
+              <th>Memory</th>
+              <th>Heartbeat</th>
+              <th>Actions</th>
+            </tr>
+          </thead>
+          <tbody>
+            {workers.map((worker) => (
+              <tr key={worker.hostname}>
+                <td>{worker.hostname}</td>
+                <td>
+                  <Badge bg={worker.state === 'active' ? 'success' : worker.state === 'offline' ? 'danger' : 'warning'}>
+                    {worker.state}
+                  </Badge>
+                </td>
+                <td>{worker.active ?? '-'} / {worker.reserved ?? '-'} of {worker.concurrency ?? '-'}</td>
+                <td style={{ minWidth: '120px' }}>
+                  {worker.busy_ratio != null && (
+                    <ProgressBar
+                      now={worker.busy_ratio * 100}
+                      label={`${Math.round(worker.busy_ratio * 100)}%`}
+                      variant={worker.busy_ratio > 0.9 ? 'danger' : worker.busy_ratio > 0.7 ? 'warning' : 'success'}
+                    />
+                  )}
+                </td>
+                <td>{worker.tasks_per_second ?? '-'}</td>
+                <td>{worker.rss_mb != null ? `${worker.rss_mb} MB` : '-'}</td>
+                <td>{worker.heartbeat_age_seconds != null ? `${worker.heartbeat_age_seconds}s ago` : '-'}</td>
+                <td>
+                  {worker.state === 'active' && (
+                    <>
+                      <Button variant="secondary" size="sm" className="me-2" onClick={() => pauseMinion(worker.hostname)}>
+                        Pause
+                      </Button>
+                      <Button variant="warning" size="sm" onClick={() => drainMinion(worker.hostname)}>
+                        Drain
+                      </Button>
+                    </>
+                  )}
+                  {['paused', 'draining', 'drained'].includes(worker.state) && (
+                    <Button variant="success" size="sm" onClick={() => resumeMinion(worker.hostname)}>
+                      Resume
+                    </Button>
+                  )}
+                </td>
+              </tr>
+            ))}
+          </tbody>
+        </Table>
+      )}
+
+      {/* Active Minions */}
+      <div className="d-flex justify-content-between align-items-center mt-4 mb-3">
+        <h5 className="mb-0">Active Minions</h5>
+      </div>
+
       {Object.keys(minionStatus).length === 0 ? (
         <div className="text-center p-4">
           <p className="text-muted">No active minions. Deploy some to see them here!</p>
@@ -210,16 +293,6 @@ function MinionDashboard() {
                       Cancel
                     </Button>
                   )}
-                  {status === "Idle Goblin" && (
-                    <Button variant="secondary" size="sm" onClick={() => pauseMinion(id)}>
-                      Pause
-                    </Button>
-                  )}
-                  {status === "Paused Goblin" && (
-                    <Button variant="success" size="sm" onClick={() => resumeMinion(id)}>
-                      Resume
-                    </Button>
-                  )}
                 </td>
               </tr>
             ))}
@@ -1,22 +1,47 @@
-from fastapi import FastAPI, HTTPException , UploadFile, File
+from fastapi import FastAPI, HTTPException , UploadFile, File, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
 import asyncio
+import mimetypes
+import os
 from pathlib import Path
 import time
 import shutil
+import logging
 
 from goblin_forge.core.plugin_loader import PluginLoader
 from goblin_forge.core.minion_manager import MinionManager
+from goblin_forge.core.admission import AdmissionController
+from goblin_forge.core.capacity import read_ledgers
+from goblin_forge.core.pipeline import PipelineManager, PipelineError
+from goblin_forge.core.search_index import SearchIndex
+from goblin_forge.core import metrics, tracing
+from goblin_forge.core.logging_config import configure_logging, get_logging_stats
+from goblin_forge.core.task_index import parse_timestamp
+from goblin_forge.api.responses import FastJSONResponse, CompressionMiddleware
+
+configure_logging(service="api")
+metrics.configure_metrics("api")
+logger = logging.getLogger(__name__)
+
+# Largest number of inputs accepted in one /api/submit_batch request
+MAX_BATCH_ITEMS = int(os.environ.get("GOBLIN_MAX_BATCH_ITEMS", 100000))
+# Read size when streaming result files out of the storage backend
+RESULT_FILE_CHUNK_BYTES = 256 * 1024
 
 # Initialize app
 app = FastAPI(
     title="Goblin Forge",
     description="A web application for executing CLI binaries through a menu-driven interface",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Compress large JSON bodies (task lists, gadget catalog, metrics)
+app.add_middleware(CompressionMiddleware)
+
 # Enable CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -24,11 +49,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe request latency per route template"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.API_REQUEST_LATENCY.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        ).observe(time.perf_counter() - start)
+
 # Initialize the plugin loader and minion manager
 plugin_loader = PluginLoader()
 minion_manager = MinionManager()
+admission_controller = AdmissionController(minion_manager)
+pipeline_manager = PipelineManager(minion_manager, plugin_loader)
+search_index = SearchIndex(minion_manager)
 
 # Load plugins on startup
 @app.on_event("startup")
@@ -37,6 +83,10 @@ async def startup_event():
     plugin_loader.discover_gadgets()
     # Clean up old results
     minion_manager.cleanup_old_results()
+    # Index results finished while the API was down, in the background
+    search_index.schedule_sync()
+    # Follow worker heartbeats for the worker inventory
+    minion_manager.workers.start()
 
 # Models for API requests and responses
 class TaskSubmission(BaseModel):
@@ -49,6 +99,23 @@ class TaskResponse(BaseModel):
     status: str
     result_dirs: List[str]
 
+class BatchSubmission(BaseModel):
+    gadget_id: str
+    mode: str
+    parameters: Dict[str, Any] = {}
+    items: List[Dict[str, Any]]
+
+class PipelineStep(BaseModel):
+    id: str
+    gadget_id: str
+    mode: str
+    parameters: Dict[str, Any] = {}
+    depends_on: List[str] = []
+
+class PipelineSubmission(BaseModel):
+    name: str
+    steps: List[PipelineStep]
+
 class GadgetInfo(BaseModel):
     id: str
     name: str
@@ -56,45 +123,68 @@ class GadgetInfo(BaseModel):
     modes: List[Dict[str, Any]]
 
 # API Endpoints
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """Expose Prometheus/OpenMetrics metrics aggregated across processes"""
+    body, content_type = metrics.render_metrics(request.headers.get("accept", ""))
+    return Response(content=body, media_type=content_type)
+
 @app.get("/api/gadgets", response_model=List[GadgetInfo])
 async def get_gadgets():
     """Get all available Goblin Gadgets"""
-    gadgets = plugin_loader.discover_gadgets()
-    print(f"API: Returning {len(gadgets)} gadgets")
+    # Served from the plugin manifest; a gadget is only imported once to compute form schemas it
+    # does not declare. The rescan, that import and the manifest write stay off the event loop
+    gadgets = await asyncio.to_thread(_describe_gadgets)
+    logger.info("Returning gadgets", extra={"event": "api.gadgets", "count": len(gadgets)})
+    return FastJSONResponse(gadgets)
 
-    result = []
-    
-    for gadget_class in gadgets:
-        gadget = gadget_class()
-        modes_info = []
-        
-        for mode in gadget.get_modes():
-            mode_id = mode["id"]
-            modes_info.append({
-                "id": mode_id,
-                "name": mode["name"],
-                "description": mode["description"],
-                "form_schema": gadget.get_form_schema(mode_id)
-            })
-        
-        result.append({
-            "id": gadget.tab_id,
-            "name": gadget.name,
-            "description": gadget.description,
-            "modes": modes_info
-        })
-    
-    return result
+def _describe_gadgets():
+    return [
+        {
+            "id": spec.tab_id,
+            "name": spec.name,
+            "description": spec.description,
+            "modes": spec.describe_modes()
+        }
+        for spec in plugin_loader.discover_gadgets()
+    ]
+
+async def _admit(request: Request, demand):
+    """Admit a submission of {gadget_id: task count}, raising 429 (413 when it can never fit)"""
+    client_id = request.headers.get("X-Client-Id") or (request.client.host if request.client else "unknown")
+    decision = admission_controller.check_demand(client_id, demand)
+    if decision.reason == "too_large":
+        raise HTTPException(
+            status_code=413,
+            detail=f"Submission of {sum(demand.values())} tasks exceeds the per-client limit of "
+                   f"{admission_controller.client_burst:g}, split it up"
+        )
+    if decision.rejected:
+        if decision.retry_after is None:
+            raise HTTPException(status_code=429, detail=f"Submission rejected ({decision.reason})")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Submission rejected ({decision.reason}), retry later",
+            headers={"Retry-After": str(decision.retry_after)}
+        )
+    await admission_controller.wait(decision)
 
 @app.post("/api/submit_task", response_model=TaskResponse)
-async def submit_task(task: TaskSubmission):
+async def submit_task(task: TaskSubmission, request: Request):
     """Submit tasks to be executed by Minions"""
+    with tracing.start_span("api.submit_task", gadget_id=task.gadget_id, modes=task.modes):
+        return await _submit_task(task, request)
+
+async def _submit_task(task: TaskSubmission, request: Request):
     gadget_id = task.gadget_id
     gadget_class = plugin_loader.get_gadget(gadget_id)
     
     if not gadget_class:
         raise HTTPException(status_code=404, detail=f"Gadget {gadget_id} not found")
     
+    # Apply backpressure before any work is queued
+    await _admit(request, {gadget_id: len(task.modes)})
+    
     gadget = gadget_class()
     task_ids = []
     result_dirs = []
@@ -120,6 +210,60 @@ async def submit_task(task: TaskSubmission):
         "result_dirs": result_dirs
     }
 
+@app.post("/api/submit_batch", response_model=dict)
+async def submit_batch(batch: BatchSubmission, request: Request):
+    """Submit many inputs for one gadget mode, executed together as a single task"""
+    with tracing.start_span("api.submit_batch", gadget_id=batch.gadget_id, mode=batch.mode, items=len(batch.items)):
+        gadget_class = plugin_loader.get_gadget(batch.gadget_id)
+        if not gadget_class:
+            raise HTTPException(status_code=404, detail=f"Gadget {batch.gadget_id} not found")
+        if not batch.items or len(batch.items) > MAX_BATCH_ITEMS:
+            raise HTTPException(status_code=400, detail=f"A batch needs between 1 and {MAX_BATCH_ITEMS} items")
+        
+        # One Minion task, so it costs one admission token
+        await _admit(request, {batch.gadget_id: 1})
+        
+        task_info = await minion_manager.submit_task(
+            gadget_class(), batch.mode, batch.parameters, items=batch.items
+        )
+        return {**task_info, "items": len(batch.items)}
+
+@app.post("/api/submit_pipeline", response_model=dict)
+async def submit_pipeline(pipeline: PipelineSubmission, request: Request):
+    """Submit a multi-step pipeline whose steps pass artifacts by reference"""
+    with tracing.start_span("api.submit_pipeline", pipeline=pipeline.name, steps=len(pipeline.steps)):
+        steps = [step.model_dump() for step in pipeline.steps]
+        try:
+            pipeline_manager.validate(steps)
+        except PipelineError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Admit the whole pipeline in one decision, one token per step
+        per_gadget = {}
+        for step in steps:
+            per_gadget[step["gadget_id"]] = per_gadget.get(step["gadget_id"], 0) + 1
+        await _admit(request, per_gadget)
+        
+        return await pipeline_manager.submit_pipeline(pipeline.name, steps)
+
+@app.get("/api/pipelines", response_model=List[dict])
+async def get_pipelines(limit: int = Query(50, ge=1, le=1000)):
+    """Get the most recent pipelines with the status of each step"""
+    return FastJSONResponse(pipeline_manager.list_pipelines(limit))
+
+@app.get("/api/pipelines/{pipeline_id}", response_model=dict)
+async def get_pipeline(pipeline_id: str):
+    """Get a pipeline with its steps, their task ids and results"""
+    pipeline = await pipeline_manager.get_pipeline(pipeline_id)
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail=f"Pipeline {pipeline_id} not found")
+    return FastJSONResponse(pipeline)
+
+@app.post("/api/cancel_pipeline/{pipeline_id}", response_model=dict)
+async def cancel_pipeline(pipeline_id: str):
+    """Cancel the running and remaining steps of a pipeline"""
+    return await pipeline_manager.cancel_pipeline(pipeline_id)
+
 @app.get("/api/task_status/{task_id}")
 async def get_task_status(task_id: str):
     """Get the status of a submitted task"""
@@ -127,59 +271,196 @@ async def get_task_status(task_id: str):
     return {"task_id": task_id, "status": status}
 
 @app.get("/api/minion_status")
-async def get_minion_status():
-    """Get status of all Minions"""
-    return {"minions": minion_manager.minion_status}
+async def get_minion_status(
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    gadget: Optional[str] = None,
+    mode: Optional[str] = None
+):
+    """Get status of active Minions, one page at a time"""
+    try:
+        minions, next_cursor = minion_manager.list_minion_status(
+            limit=limit, cursor=cursor, status=status, gadget_id=gadget, mode=mode
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"minions": minions, "next_cursor": next_cursor})
 
 # Add an endpoint to force cleanup of old results
 @app.post("/api/cleanup_results")
 async def cleanup_results():
     """Manually trigger cleanup of old results"""
-    minion_manager.cleanup_old_results()
-    return {"status": "Cleanup completed"}
+    removed = minion_manager.cleanup_old_results()
+    search_index.schedule_remove(removed)
+    return {"status": "Cleanup completed", "removed": len(removed)}
+
+@app.get("/api/search", response_model=dict)
+async def search_results(
+    q: str = Query(..., max_length=256),
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    gadget: Optional[str] = None,
+    mode: Optional[str] = None,
+    result_dir: Optional[str] = None
+):
+    """Search the text of result artifacts, returning matching lines with their offsets"""
+    with tracing.start_span("api.search", query_length=len(q)):
+        start = time.perf_counter()
+        try:
+            matches, next_cursor = await asyncio.to_thread(
+                search_index.search, q, limit=limit, cursor=cursor,
+                gadget_id=gadget, mode=mode, result_dir=result_dir
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return FastJSONResponse({
+            "query": q,
+            "matches": matches,
+            "next_cursor": next_cursor,
+            "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        })
 
 
 
+def _list_tasks(which, limit, cursor, fields, status, gadget, mode, since, until):
+    """
+    Serve a page of a task listing, with the next cursor in the X-Next-Cursor header.
+
+    The response is returned directly so the list skips response_model validation.
+    """
+    try:
+        tasks, next_cursor = minion_manager.list_tasks(
+            which, limit=limit, cursor=cursor,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            status=status, gadget_id=gadget, mode=mode,
+            since=parse_timestamp(since), until=parse_timestamp(until)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(tasks, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
 @app.get("/api/completed_tasks", response_model=List[dict])
-async def get_completed_tasks(limit: int = 50):
-    """Get recently completed tasks with their results"""
-    return minion_manager.get_completed_tasks(limit)
+async def get_completed_tasks(
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    gadget: Optional[str] = None,
+    mode: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Get recently completed tasks with their results, newest first"""
+    return _list_tasks("completed", limit, cursor, fields, status, gadget, mode, since, until)
 
 @app.get("/api/pending_tasks", response_model=List[dict])
-async def get_pending_tasks():
-    """Get currently pending tasks"""
-    return minion_manager.get_pending_tasks()
+async def get_pending_tasks(
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    gadget: Optional[str] = None,
+    mode: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Get currently pending tasks, oldest first"""
+    return _list_tasks("pending", limit, cursor, fields, status, gadget, mode, since, until)
 
 @app.get("/api/minion_metrics", response_model=dict)
 async def get_minion_metrics():
     """Get system metrics for minions"""
-    return minion_manager.get_minion_metrics()
+    metrics = minion_manager.get_minion_metrics()
+    metrics["admission"] = admission_controller.get_metrics()
+    # Worker inspection is a broker round-trip, keep it off the event loop
+    metrics["autoscaler"] = await asyncio.to_thread(minion_manager.get_autoscaler_status)
+    metrics["workers"] = (await asyncio.to_thread(minion_manager.get_workers))["totals"]
+    metrics["logging"] = get_logging_stats()
+    metrics["capacity"] = await asyncio.to_thread(read_ledgers)
+    metrics["search_index"] = await asyncio.to_thread(search_index.stats)
+    return FastJSONResponse(metrics)
+
+@app.get("/api/resource_usage", response_model=dict)
+async def get_resource_usage():
+    """Get resource accounting aggregated per gadget and mode"""
+    return FastJSONResponse(minion_manager.get_resource_usage())
+
+@app.get("/api/storage", response_model=dict)
+async def get_storage():
+    """Get blob store usage, dedup ratio and bytes saved"""
+    # Walks the blob store, keep it off the event loop
+    return FastJSONResponse(await asyncio.to_thread(minion_manager.get_storage_stats))
 
 @app.post("/api/cancel_task/{task_id}", response_model=dict)
 async def cancel_task(task_id: str):
-    """Cancel a running task"""
-    return minion_manager.cancel_task(task_id)
+    """Cancel a running task and stop its subprocesses"""
+    return await minion_manager.cancel_task(task_id)
 
 @app.post("/api/retry_task/{task_id}", response_model=dict)
 async def retry_task(task_id: str):
-    """Retry a failed task"""
-    return minion_manager.retry_task(task_id)
+    """Retry a failed task, resuming from its checkpoint"""
+    return await minion_manager.retry_task(task_id)
+
+@app.get("/api/workers", response_model=dict)
+async def get_workers():
+    """Get every worker with its state, task counts, busy ratio, tasks/sec and memory"""
+    return FastJSONResponse(await asyncio.to_thread(minion_manager.get_workers))
 
 @app.post("/api/pause_minion/{minion_id}", response_model=dict)
 async def pause_minion(minion_id: str):
-    """Pause a minion to prevent it from taking new tasks"""
-    return minion_manager.pause_minion(minion_id)
+    """Pause a worker (by hostname) to prevent it from taking new tasks"""
+    return await asyncio.to_thread(minion_manager.pause_minion, minion_id)
+
+@app.post("/api/drain_minion/{minion_id}", response_model=dict)
+async def drain_minion(minion_id: str):
+    """Pause a worker and report it drained once its tasks are done"""
+    return await asyncio.to_thread(minion_manager.drain_minion, minion_id)
 
 @app.post("/api/resume_minion/{minion_id}", response_model=dict)
 async def resume_minion(minion_id: str):
-    """Resume a paused minion"""
-    return minion_manager.resume_minion(minion_id)
+    """Resume a paused or draining worker"""
+    return await asyncio.to_thread(minion_manager.resume_minion, minion_id)
 
 @app.get("/api/task_details/{task_id}", response_model=dict)
 async def get_task_details(task_id: str):
     """Get detailed information about a task"""
     return minion_manager.get_task_details(task_id)
 
+@app.get("/api/task_result/{task_id}", response_model=dict)
+async def get_task_result(task_id: str):
+    """Get the full result manifest a Minion wrote for a task"""
+    result = await asyncio.to_thread(minion_manager.get_task_result, task_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No result found for task {task_id}")
+    return result
+
+@app.get("/api/result_file")
+async def get_result_file(path: str):
+    """Stream a result artifact from the storage backend, whichever node produced it"""
+    storage = minion_manager.results_manager.storage
+    try:
+        key = storage.key_for(path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    info = await asyncio.to_thread(storage.stat, key)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"No result file {path}")
+    stream = await asyncio.to_thread(storage.open_read, key)
+
+    async def chunks():
+        try:
+            while chunk := await asyncio.to_thread(stream.read, RESULT_FILE_CHUNK_BYTES):
+                yield chunk
+        finally:
+            await asyncio.to_thread(stream.close)
+
+    return StreamingResponse(
+        chunks(),
+        media_type=mimetypes.guess_type(key)[0] or "application/octet-stream",
+        headers={"Content-Length": str(info.size)},
+    )
+
 @app.post("/api/upload_file", response_model=dict)
 async def upload_file(file: UploadFile = File(...)):
     """Upload a file to the task's result directory"""
@@ -195,6 +476,8 @@ async def upload_file(file: UploadFile = File(...)):
     file_path = temp_result_dir / filename
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
+    # Minions on other nodes fetch it from the storage backend
+    await asyncio.to_thread(minion_manager.results_manager.storage.publish_file, file_path)
     
     return {
         "file_path": str(file_path),
@@ -0,0 +1,130 @@
+"""
+Fast response path for the Goblin Forge API.
+
+FastJSONResponse serializes with orjson when it is installed. Hot endpoints
+return it directly, which skips FastAPI's response_model validation and
+jsonable_encoder pass. CompressionMiddleware compresses complete response
+bodies above a size threshold with brotli or gzip, whichever the client
+prefers and is available.
+
+Configuration:
+    GOBLIN_COMPRESS_MIN_SIZE  Smallest body in bytes worth compressing (default 1024)
+    GOBLIN_GZIP_LEVEL         gzip level (default 6)
+    GOBLIN_BROTLI_QUALITY     brotli quality (default 4)
+"""
+import gzip
+import json
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/openmetrics-text", "application/javascript")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, falling back to the standard library"""
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def _accepted_encodings(accept_encoding):
+    """Map each encoding in an Accept-Encoding header to its q-value"""
+    encodings = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported content encoding the client accepts, if any"""
+    encodings = _accepted_encodings(accept_encoding or "")
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for name in candidates:
+        quality = encodings.get(name, encodings.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=int(os.environ.get("GOBLIN_BROTLI_QUALITY", 4)))
+    return gzip.compress(body, compresslevel=int(os.environ.get("GOBLIN_GZIP_LEVEL", 6)), mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing single-message response bodies.
+
+    Streamed responses (more than one body message) pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size=None):
+        self.app = app
+        self.minimum_size = (
+            minimum_size if minimum_size is not None
+            else int(os.environ.get("GOBLIN_COMPRESS_MIN_SIZE", 1024))
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body is worth compressing
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (message.get("more_body") or len(body) < self.minimum_size
+                    or "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,181 @@
+"""
+Admission control for Goblin Forge task submissions.
+
+Decides whether a submission is accepted, delayed or rejected from the
+current backlog, worker saturation, per-gadget in-flight counts and a
+per-client token bucket, so bursts degrade into 429s with a Retry-After
+hint instead of an ever-growing queue.
+
+Tokens are only taken for submissions that pass the backlog checks, and at
+most ``GOBLIN_ADMISSION_MAX_DELAYED`` delayed submissions (default 50) are
+held back at once; beyond that they are rejected. A submission of more
+tasks than a client's burst (``GOBLIN_CLIENT_BURST``) could never be
+admitted and is rejected as too large, without a Retry-After.
+"""
+import asyncio
+import os
+import time
+
+from goblin_forge.core.minion_manager import celery_app
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, count=1):
+        """Take tokens if available, otherwise return seconds until they are (inf: never)"""
+        self._refill()
+        if self.tokens >= count:
+            self.tokens -= count
+            return 0.0
+        if self.rate <= 0 or count > self.capacity:
+            return float("inf")
+        return (count - self.tokens) / self.rate
+
+
+class AdmissionDecision:
+    """Outcome of an admission check"""
+
+    ACCEPT = "accept"
+    DELAY = "delay"
+    REJECT = "reject"
+
+    def __init__(self, action, reason="", delay=0.0, retry_after=None):
+        self.action = action
+        self.reason = reason
+        self.delay = delay
+        self.retry_after = retry_after
+
+    @property
+    def rejected(self):
+        return self.action == self.REJECT
+
+
+class AdmissionController:
+    """Applies backpressure to task submissions based on MinionManager state"""
+
+    def __init__(self, minion_manager):
+        self.minion_manager = minion_manager
+        # Hard cap on tasks waiting or running before new work is rejected
+        self.max_pending = int(os.environ.get("GOBLIN_MAX_PENDING_TASKS", 500))
+        # Fraction of max_pending above which submissions are slowed down
+        self.delay_threshold = float(os.environ.get("GOBLIN_ADMISSION_DELAY_THRESHOLD", 0.5))
+        self.max_delay = float(os.environ.get("GOBLIN_ADMISSION_MAX_DELAY", 2.0))
+        # Delayed submissions sleeping at once, each holding its request open
+        self.max_delayed = int(os.environ.get("GOBLIN_ADMISSION_MAX_DELAYED", 50))
+        self.delaying = 0
+        self.max_inflight_per_gadget = int(os.environ.get("GOBLIN_MAX_INFLIGHT_PER_GADGET", 100))
+        self.client_rate = float(os.environ.get("GOBLIN_CLIENT_RATE", 2.0))  # Tasks per second
+        self.client_burst = float(os.environ.get("GOBLIN_CLIENT_BURST", 20))
+        self.client_buckets = {}
+        self.max_clients = 10000
+        self.accepted_count = 0
+        self.delayed_count = 0
+        self.rejected_count = 0
+
+    def _bucket(self, client_id):
+        bucket = self.client_buckets.get(client_id)
+        if bucket is None:
+            if len(self.client_buckets) >= self.max_clients:
+                # Forget the longest-idle clients, their buckets would be full again
+                oldest = sorted(self.client_buckets, key=lambda c: self.client_buckets[c].updated)
+                for stale in oldest[:len(oldest) // 2]:
+                    del self.client_buckets[stale]
+            bucket = self.client_buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+        return bucket
+
+    def _worker_capacity(self):
+        """Number of tasks the worker fleet can run at once"""
+        # Last inspected pool sizes of the workers still consuming; paused and draining ones take no tasks
+        reports = self.minion_manager.workers.cached_reports()
+        capacity = sum(report.get("concurrency") or 0 for report in reports.values() if report.get("queues"))
+        if capacity:
+            return capacity
+        return max(1, celery_app.conf.worker_concurrency or 1)
+
+    def _estimate_drain_time(self, backlog):
+        """Seconds until the current backlog is likely to have been worked off"""
+        durations = [
+            t.get("execution_time_seconds") for t in self.minion_manager.completed_tasks.latest(50)
+            if t.get("execution_time_seconds")
+        ]
+        average = sum(durations) / len(durations) if durations else 10.0
+        return max(1, min(300, int(average * max(1, backlog) / self._worker_capacity())))
+
+    def check(self, client_id, gadget_id, task_count=1):
+        """Decide whether a client may submit task_count tasks for a gadget"""
+        return self.check_demand(client_id, {gadget_id: task_count})
+
+    def check_demand(self, client_id, demand):
+        """Decide on a submission of tasks for several gadgets ({gadget_id: count}) as a whole"""
+        task_count = sum(demand.values())
+        if task_count > self.client_burst:
+            return self._reject("too_large")
+
+        pending = self.minion_manager.pending_tasks
+        pending_count = len(pending)
+
+        # Global checks first, so rejected submissions do not use up the client's tokens
+        if pending_count + task_count > self.max_pending:
+            return self._reject("queue_full", self._estimate_drain_time(pending_count))
+
+        for gadget_id, count in demand.items():
+            inflight = pending.count(gadget_id=gadget_id)
+            if inflight + count > self.max_inflight_per_gadget:
+                return self._reject("gadget_saturated", self._estimate_drain_time(inflight))
+
+        # Slow callers down proportionally once the backlog exceeds the workers
+        capacity = self._worker_capacity()
+        soft_limit = max(capacity, int(self.max_pending * self.delay_threshold))
+        delayed = pending_count >= soft_limit
+        if delayed and self.delaying >= self.max_delayed:
+            return self._reject("overloaded", max(1, int(self.max_delay + 0.999)))
+
+        wait = self._bucket(client_id).take(task_count)
+        if wait == float("inf"):
+            return self._reject("rate_limited")
+        if wait:
+            return self._reject("rate_limited", max(1, int(wait + 0.999)))
+
+        if delayed:
+            pressure = (pending_count - soft_limit) / max(1, self.max_pending - soft_limit)
+            self.delayed_count += 1
+            self.delaying += 1
+            return AdmissionDecision(AdmissionDecision.DELAY, "backlog", delay=self.max_delay * min(1.0, pressure))
+
+        self.accepted_count += 1
+        return AdmissionDecision(AdmissionDecision.ACCEPT)
+
+    async def wait(self, decision):
+        """Hold back a delayed submission; it counts against max_delayed until it wakes"""
+        if decision.action != AdmissionDecision.DELAY:
+            return
+        try:
+            await asyncio.sleep(decision.delay)
+        finally:
+            self.delaying -= 1
+
+    def _reject(self, reason, retry_after=None):
+        self.rejected_count += 1
+        return AdmissionDecision(AdmissionDecision.REJECT, reason, retry_after=retry_after)
+
+    def get_metrics(self):
+        """Get admission counters"""
+        return {
+            "accepted": self.accepted_count,
+            "delayed": self.delayed_count,
+            "rejected": self.rejected_count,
+            "delaying": self.delaying,
+            "tracked_clients": len(self.client_buckets),
+        }
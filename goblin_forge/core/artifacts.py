@@ -0,0 +1,243 @@
+"""
+Non-blocking artifact I/O for gadgets.
+
+Gadget execute() methods run on an event loop that may be shared with other
+gadgets (batches, eager or in-process execution), so writing a large result
+with a plain open()/json.dump() stalls every task on it. BaseGadget.artifacts
+hands file writes, copies and JSON serialization to a small thread pool
+shared by the process instead, and publishes every artifact atomically: data
+goes to a hidden ``.<name>.<random>.partial`` file that is renamed into place
+on commit, so readers see either the previous file or the complete new one,
+never a partial write. Streams buffer small writes and pass them to the
+pool in larger chunks. Inputs produced by other nodes are fetched from the
+result store (see core/storage.py) the same way.
+
+Durability: the rename alone protects readers, not a node that loses power.
+Individual artifacts are not fsynced by default, since most are rewritten
+or only matter once the task ends. Instead the Minion syncs a task's result
+directory once, before it writes task_result.json (``sync_tree``). After a
+crash, a result without its task_result.json may be incomplete. One with
+it is complete.
+
+Configuration:
+    GOBLIN_ARTIFACT_IO_THREADS     Threads of the shared I/O pool (default 4)
+    GOBLIN_ARTIFACT_BUFFER_BYTES   Bytes a stream buffers before writing them out (default 262144)
+    GOBLIN_ARTIFACT_FSYNC          Set to 1 to fsync every artifact as it is published (default 0)
+    GOBLIN_RESULT_FSYNC            Set to 0 to skip syncing finished result directories (default 1)
+"""
+import asyncio
+import concurrent.futures
+import functools
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+IO_THREADS = int(os.environ.get("GOBLIN_ARTIFACT_IO_THREADS", 4))
+BUFFER_BYTES = int(os.environ.get("GOBLIN_ARTIFACT_BUFFER_BYTES", 256 * 1024))
+FSYNC = os.environ.get("GOBLIN_ARTIFACT_FSYNC", "0") != "0"
+RESULT_FSYNC = os.environ.get("GOBLIN_RESULT_FSYNC", "1") != "0"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def io_pool():
+    """The process-wide artifact I/O pool, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=IO_THREADS, thread_name_prefix="goblin-artifacts"
+                )
+    return _pool
+
+
+async def _offload(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool(), functools.partial(func, *args, **kwargs))
+
+
+def _partial_path(path):
+    # Unique per write, so concurrent writers of a shared file never mix their data
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.partial")
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def sync_tree(directory):
+    """fsync every file and directory below a directory, once its contents are final"""
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            try:
+                fd = os.open(os.path.join(root, name), os.O_RDONLY)
+            except OSError:
+                continue  # Removed meanwhile
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+        _fsync_dir(root)
+
+
+def _publish(partial, path):
+    """Move a complete partial file into place"""
+    os.replace(partial, path)
+    if FSYNC:
+        _fsync_dir(path.parent)
+
+
+def _write_file(path, data):
+    path.parent.mkdir(exist_ok=True, parents=True)
+    partial = _partial_path(path)
+    with open(partial, "wb") as f:
+        f.write(data)
+        if FSYNC:
+            f.flush()
+            os.fsync(f.fileno())
+    _publish(partial, path)
+    return path
+
+
+def _copy_file(source, path):
+    path.parent.mkdir(exist_ok=True, parents=True)
+    partial = _partial_path(path)
+    shutil.copy2(source, partial)
+    if FSYNC:
+        with open(partial, "rb") as f:
+            os.fsync(f.fileno())
+    _publish(partial, path)
+    return path
+
+
+class ArtifactStream:
+    """
+    Buffered writer of one artifact, published atomically by commit().
+
+    Use it as an async context manager to commit on success and discard the
+    partial file on error.
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.bytes_written = 0
+        self._partial = _partial_path(self.path)
+        self._file = None
+        self._buffer = []
+        self._buffered = 0
+
+    async def write(self, data):
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        self.bytes_written += len(data)
+        if self._buffered >= BUFFER_BYTES:
+            await _offload(self._write_chunk, self._take_buffer())
+
+    def _take_buffer(self):
+        chunk = b"".join(self._buffer)
+        self._buffer, self._buffered = [], 0
+        return chunk
+
+    def _write_chunk(self, chunk):
+        if self._file is None:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            self._file = open(self._partial, "wb")
+        self._file.write(chunk)
+
+    def _commit(self, chunk):
+        self._write_chunk(chunk)
+        if FSYNC:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.close()
+        _publish(self._partial, self.path)
+        return self.path
+
+    def _abort(self):
+        if self._file is not None:
+            self._file.close()
+        self._partial.unlink(missing_ok=True)
+
+    async def commit(self):
+        """Write what is buffered and move the artifact into place"""
+        return await _offload(self._commit, self._take_buffer())
+
+    async def abort(self):
+        self._buffer, self._buffered = [], 0
+        await _offload(self._abort)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.abort()
+
+
+class ArtifactWriter:
+    """Writes a gadget's artifacts through the shared I/O pool, each published atomically"""
+
+    def open(self, path, encoding="utf-8"):
+        """A buffered stream for artifacts written piece by piece"""
+        return ArtifactStream(path, encoding)
+
+    async def write_bytes(self, path, data):
+        return await _offload(_write_file, Path(path), data)
+
+    async def write_text(self, path, text, encoding="utf-8"):
+        return await _offload(_write_file, Path(path), text.encode(encoding))
+
+    async def write_json(self, path, data, indent=2, **kwargs):
+        """Serialize and write a JSON artifact, both off the event loop"""
+        def serialize_and_write():
+            return _write_file(Path(path), json.dumps(data, indent=indent, **kwargs).encode())
+        return await _offload(serialize_and_write)
+
+    async def copy(self, source, path):
+        """Copy a file, with its metadata, to an artifact path"""
+        return await _offload(_copy_file, Path(source), Path(path))
+
+    async def read_text(self, path, encoding="utf-8"):
+        """
+        Read a result artifact given by path through the result store.
+        Anything outside the results tree is refused with ValueError, as
+        such paths come from task parameters.
+        """
+        from goblin_forge.core.storage import get_storage
+        storage = get_storage()
+        key = storage.key_for(path)
+
+        def read():
+            with storage.open_read(key) as f:
+                return f.read().decode(encoding)
+        return await _offload(read)
+
+    async def fetch(self, path):
+        """
+        Make an input artifact written on another node (an upload, an earlier
+        pipeline step) available at its local path. Returns False when the
+        file exists neither locally nor in the result store.
+        """
+        from goblin_forge.core.storage import get_storage
+        return await _offload(get_storage().fetch, Path(path))
@@ -0,0 +1,205 @@
+"""
+Adaptive Minion autoscaler for Goblin Forge.
+
+Grows and shrinks the Celery worker pool between the ``--autoscale`` bounds
+using live CPU, memory and load-average readings, the depth of the broker
+queue and the resource profile of the gadgets currently held by the worker.
+
+The autoscaler hooks into Celery through the public ``maybe_scale()``,
+``scale_up()`` and ``scale_down()``. Celery's ``scale_down()`` waits out
+the keepalive after a scale-up, so critical memory pressure shrinks the pool
+through the private ``_shrink()`` when the installed Celery has it, and
+falls back to ``scale_down()`` otherwise.
+"""
+import importlib
+import os
+import time
+
+import psutil
+from celery.utils.log import get_logger
+from celery.worker import state
+from celery.worker.autoscale import Autoscaler
+
+from goblin_forge.core.capacity import PROFILE_CPU_SLOTS
+
+logger = get_logger(__name__)
+
+# Pool slots consumed by a task, keyed by BaseGadget.resource_profile.
+# I/O-bound tasks (nmap waiting on the network) barely touch a core, so
+# several of them can share one. Declared per-mode costs take precedence.
+RESOURCE_WEIGHTS = PROFILE_CPU_SLOTS
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+class ScalingPolicy:
+    """Decides the target pool size from a snapshot of resource metrics"""
+
+    def __init__(self, cpu_high=None, memory_high=None, memory_critical=None,
+                 load_high=None, cpu_count=None):
+        self.cpu_high = cpu_high if cpu_high is not None else _env_float("GOBLIN_AUTOSCALE_CPU_HIGH", 85)
+        self.memory_high = memory_high if memory_high is not None else _env_float("GOBLIN_AUTOSCALE_MEMORY_HIGH", 85)
+        self.memory_critical = (memory_critical if memory_critical is not None
+                                else _env_float("GOBLIN_AUTOSCALE_MEMORY_CRITICAL", 95))
+        self.load_high = load_high if load_high is not None else _env_float("GOBLIN_AUTOSCALE_LOAD_HIGH", 1.5)
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+
+    def decide(self, procs, min_concurrency, max_concurrency, demand, task_weight,
+               cpu_percent, memory_percent, load_per_cpu):
+        """
+        Return ``(target, reason)`` for the pool.
+
+        ``demand`` is the number of tasks held by the worker plus those still
+        waiting in the broker, ``task_weight`` the average slot weight of the
+        tasks the worker can see.
+        """
+        target = max(min_concurrency, min(max_concurrency, demand))
+        reason = "demand"
+
+        # Only as many tasks as the cores can carry for the current task mix
+        cpu_capacity = max(min_concurrency, int(self.cpu_count / max(task_weight, 0.01)))
+        if target > cpu_capacity:
+            target = cpu_capacity
+            reason = "cpu_capacity"
+
+        if memory_percent >= self.memory_critical:
+            return max(min_concurrency, procs - 1), "memory_critical"
+
+        if target > procs:
+            if cpu_percent >= self.cpu_high:
+                return procs, "cpu_pressure"
+            if memory_percent >= self.memory_high:
+                return procs, "memory_pressure"
+            if load_per_cpu >= self.load_high:
+                return procs, "load_pressure"
+
+        return target, reason
+
+
+class MinionAutoscaler(Autoscaler):
+    """Celery autoscaler that sizes the pool from measured resource usage"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.policy = ScalingPolicy()
+        # Seconds between scaling decisions
+        self.interval = _env_float("GOBLIN_AUTOSCALE_INTERVAL", 5)
+        # Consecutive low-demand decisions required before shrinking
+        self.scale_down_after = int(os.environ.get("GOBLIN_AUTOSCALE_SCALE_DOWN_AFTER", 3))
+        self._last_decision_time = 0
+        self._low_demand_streak = 0
+        self._profiles = {}
+        self.last_decision = {}
+        psutil.cpu_percent(interval=None)  # Prime the non-blocking sampler
+
+    def maybe_scale(self, req=None):
+        if self._resize():
+            self.pool.maintain_pool()
+
+    def _resize(self):
+        """Take a scaling decision if one is due; True when the pool was resized"""
+        now = time.monotonic()
+        if now - self._last_decision_time < self.interval:
+            return False
+        self._last_decision_time = now
+
+        procs = self.processes
+        requests = list(state.reserved_requests)
+        queued = self._queue_depth()
+        weights = [self._task_weight(r) for r in requests]
+        task_weight = sum(weights) / len(weights) if weights else 1.0
+        metrics = {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": psutil.virtual_memory().percent,
+            "load_per_cpu": os.getloadavg()[0] / self.policy.cpu_count if hasattr(os, "getloadavg") else 0.0,
+        }
+
+        target, reason = self.policy.decide(
+            procs, self.min_concurrency, self.max_concurrency,
+            len(requests) + queued, task_weight, **metrics
+        )
+
+        # Hysteresis: grow immediately, shrink only after sustained low demand
+        action = "hold"
+        if target > procs:
+            self._low_demand_streak = 0
+            self.scale_up(target - procs)
+            action = "scale_up"
+        elif target < procs:
+            self._low_demand_streak += 1
+            if reason == "memory_critical":
+                self._shrink_now(procs - target)
+            elif self._low_demand_streak >= self.scale_down_after:
+                self.scale_down(procs - target)
+            # A shrink is skipped within the keepalive or while every process is busy
+            if self.processes < procs:
+                self._low_demand_streak = 0
+                action = "scale_down"
+        else:
+            self._low_demand_streak = 0
+
+        self.last_decision = {
+            "action": action,
+            "reason": reason,
+            "processes": procs,
+            "target": target,
+            "held_tasks": len(requests),
+            "queued_tasks": queued,
+            "task_weight": round(task_weight, 2),
+            "timestamp": time.time(),
+            **metrics,
+        }
+        if action != "hold":
+            logger.info("Autoscaler %s from %s to %s (%s)", action, procs, target, reason)
+        return action != "hold"
+
+    def _shrink_now(self, n):
+        """Shrink without waiting out the keepalive after a scale-up, as memory cannot wait"""
+        shrink = getattr(super(), "_shrink", None)
+        if shrink is None:
+            # Celery without the private helper: the keepalive applies
+            self.scale_down(n)
+        else:
+            shrink(n)
+
+    def _task_weight(self, req):
+        """Slot weight of a task, from its declared cost or its gadget's resource profile"""
+        kwargs = getattr(req, "kwargs", None) or {}
+        if kwargs.get("resource_cost"):
+            return float(kwargs["resource_cost"].get("cpu_slots", 1.0))
+        key = (kwargs.get("gadget_module"), kwargs.get("gadget_class"))
+        if key not in self._profiles:
+            profile = "cpu"
+            module_name, class_name = key
+            if module_name and class_name:
+                if not module_name.startswith("goblin_forge."):
+                    module_name = f"goblin_forge.{module_name}"
+                try:
+                    gadget_class = getattr(importlib.import_module(module_name), class_name)
+                    profile = getattr(gadget_class, "resource_profile", "cpu")
+                except Exception as e:
+                    logger.debug("Could not resolve resource profile for %s: %s", key, e)
+            self._profiles[key] = profile
+        return RESOURCE_WEIGHTS.get(self._profiles[key], 1.0)
+
+    def _queue_depth(self):
+        """Number of tasks still waiting in the broker queue"""
+        if self.worker is None:
+            return 0
+        app = self.worker.app
+        try:
+            with app.connection_for_read() as conn:
+                declared = conn.default_channel.queue_declare(
+                    queue=app.conf.task_default_queue, passive=True
+                )
+                return declared.message_count
+        except Exception as e:
+            logger.debug("Could not read queue depth: %s", e)
+            return 0
+
+    def info(self):
+        info = super().info()
+        info["last_decision"] = self.last_decision
+        return info
@@ -0,0 +1,171 @@
+"""
+Content-addressed storage of result artifacts.
+
+When a task completes, the files of its result directory are hashed and
+stored once per digest under ``GOBLIN_BLOB_DIR`` (default
+``./results/.blobs``), as ``<digest[:2]>/<digest[2:4]>/<digest>``. Each
+result file is then a hardlink to its blob, so gadgets, the API and users
+keep reading the same paths while identical inputs, copies and repeated
+scan outputs take the space of one.
+
+A blob's references are its hardlinks: every result directory holding the
+file adds one, and removing the directory drops it. A blob whose only link
+is the store's own is no longer used by any result, and is freed by the
+retention cleanup. Stored blobs are made read-only, as every result linking
+to them would see an in-place change; artifacts must be replaced (as
+``BaseGadget.artifacts`` does) rather than rewritten.
+
+Hardlinks need the blob directory and the results on one filesystem; where
+linking fails, files are left as they are.
+
+Configuration:
+    GOBLIN_BLOB_DIR         Blob store directory (default ./results/.blobs)
+    GOBLIN_BLOB_MIN_BYTES   Smaller files are not deduplicated (default 4096)
+    GOBLIN_BLOB_DEDUP       Set to 0 to leave result files as they are (default 1)
+"""
+import errno
+import hashlib
+import logging
+import os
+import stat
+import uuid
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MIN_BYTES = int(os.environ.get("GOBLIN_BLOB_MIN_BYTES", 4096))
+DEDUP_ENABLED = os.environ.get("GOBLIN_BLOB_DEDUP", "1") != "0"
+HASH_CHUNK_BYTES = 2**20
+# Files that are rewritten in place or only describe the task
+SKIPPED_FILES = {"checkpoint.json", "task_result.json", "metadata.json"}
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _replace_with_link(source, path):
+    """Atomically make ``path`` a hardlink of ``source``"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.link")
+    os.link(source, tmp_path)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class BlobStore:
+    """Digest-addressed blobs shared by result directories through hardlinks"""
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.environ.get("GOBLIN_BLOB_DIR", "./results/.blobs"))
+        self.root.mkdir(exist_ok=True, parents=True)
+        self._linking_supported = True
+
+    def blob_path(self, digest):
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def ingest(self, result_dir):
+        """
+        Move the files of a result directory into the store, leaving
+        hardlinks in their place. Returns what was stored and saved.
+        """
+        report = {"files": 0, "deduplicated": 0, "stored_bytes": 0, "bytes_saved": 0}
+        if not DEDUP_ENABLED or not self._linking_supported:
+            return report
+        for dirpath, dirnames, filenames in os.walk(result_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if name.startswith(".") or name in SKIPPED_FILES:
+                    continue
+                path = Path(dirpath) / name
+                try:
+                    info = path.lstat()
+                    if not stat.S_ISREG(info.st_mode) or info.st_size < MIN_BYTES or info.st_nlink > 1:
+                        continue  # Links, small files and files already in the store
+                    shared = self._store(path, info)
+                except OSError as e:
+                    if e.errno in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                        self._linking_supported = False
+                        logger.warning("Hardlinks unavailable, result files are not deduplicated", extra={
+                            "blob_dir": str(self.root), "error": str(e)
+                        })
+                        return report
+                    logger.warning("Could not store artifact", extra={"path": str(path), "error": str(e)})
+                    continue
+                report["files"] += 1
+                if shared:
+                    report["deduplicated"] += 1
+                    report["bytes_saved"] += info.st_size
+                else:
+                    report["stored_bytes"] += info.st_size
+        return report
+
+    def _store(self, path, info):
+        """Link a file to its blob, returning True when the blob already existed"""
+        digest = _file_digest(path)
+        blob = self.blob_path(digest)
+        if blob.exists():
+            try:
+                _replace_with_link(blob, path)
+                return True
+            except FileNotFoundError:
+                pass  # Freed meanwhile, store this copy instead
+        blob.parent.mkdir(exist_ok=True, parents=True)
+        os.chmod(path, info.st_mode & READ_ONLY)
+        _replace_with_link(path, blob)
+        return False
+
+    def _blobs(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.startswith("."):
+                    yield Path(dirpath) / name
+
+    def collect_garbage(self):
+        """Free blobs no result directory links to any more"""
+        freed = {"blobs_freed": 0, "bytes_freed": 0}
+        for blob in self._blobs():
+            try:
+                info = blob.stat()
+                if info.st_nlink > 1:
+                    continue
+                blob.unlink()
+            except OSError:
+                continue
+            freed["blobs_freed"] += 1
+            freed["bytes_freed"] += info.st_size
+        if freed["blobs_freed"]:
+            logger.info("Freed unreferenced blobs", extra=freed)
+        return freed
+
+    def stats(self):
+        """Stored blobs, their references and the space deduplication saves"""
+        stats = {"blobs": 0, "references": 0, "unreferenced_blobs": 0,
+                 "stored_bytes": 0, "referenced_bytes": 0, "bytes_saved": 0, "dedup_ratio": 1.0}
+        live_bytes = 0
+        for blob in self._blobs():
+            try:
+                info = blob.stat()
+            except OSError:
+                continue
+            references = info.st_nlink - 1
+            stats["blobs"] += 1
+            stats["stored_bytes"] += info.st_size
+            if references < 1:
+                stats["unreferenced_blobs"] += 1
+                continue
+            live_bytes += info.st_size
+            stats["references"] += references
+            stats["referenced_bytes"] += info.st_size * references
+        # What the results would take without sharing, against what their blobs take
+        stats["bytes_saved"] = stats["referenced_bytes"] - live_bytes
+        if live_bytes:
+            stats["dedup_ratio"] = round(stats["referenced_bytes"] / live_bytes, 3)
+        return stats
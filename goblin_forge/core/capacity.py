@@ -0,0 +1,212 @@
+"""
+Resource-aware task admission for Goblin Forge Minions.
+
+Gadgets declare what a task of each mode costs (CPU slots, memory,
+subprocesses, I/O weight). Every Minion on a node reserves that cost in a
+shared ledger before executing and releases it afterwards; a task whose
+cost does not fit the node's remaining capacity is handed back to the
+broker to be retried later, so light tasks keep flowing past heavy ones.
+
+The ledger is a small JSON file per host guarded by an exclusive file lock,
+which works across the worker's prefork processes as well as threads.
+Reservations of processes that died are dropped the next time it is read
+(a process is identified by its pid and start time, so a reused pid does
+not keep a reservation alive).
+
+A deferred task is recorded as waiting. Once the oldest waiter has waited
+GOBLIN_CAPACITY_AGING_SECONDS, no other task may reserve capacity until it
+runs, so a heavy task is not starved by a steady stream of light ones:
+running tasks drain and it gets the room it needs (or the whole node, if it
+is larger than the node). Waiters that stop retrying are forgotten after
+GOBLIN_CAPACITY_WAITER_TTL seconds.
+
+Configuration:
+    GOBLIN_CAPACITY_DIR          Ledger directory (default ./results/.capacity)
+    GOBLIN_WORKER_CPU_SLOTS      CPU slots per node (default: number of cores)
+    GOBLIN_WORKER_MEMORY_MB      Memory per node (default 80% of physical memory)
+    GOBLIN_WORKER_SUBPROCESSES   Concurrent subprocesses per node (default 4 per core)
+    GOBLIN_WORKER_IO_WEIGHT      Total I/O weight per node (default 4)
+    GOBLIN_CAPACITY_AGING_SECONDS   Wait after which a deferred task blocks new reservations (default 30)
+    GOBLIN_CAPACITY_WAITER_TTL      Seconds a waiter is kept without retrying (default 60)
+"""
+import json
+import os
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import psutil
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+RESOURCES = ("cpu_slots", "memory_mb", "subprocesses", "io_weight")
+AGING_SECONDS = float(os.environ.get("GOBLIN_CAPACITY_AGING_SECONDS", 30))
+WAITER_TTL = float(os.environ.get("GOBLIN_CAPACITY_WAITER_TTL", 60))
+
+# Slots a task occupies by BaseGadget.resource_profile, shared with the autoscaler
+PROFILE_CPU_SLOTS = {
+    "cpu": 1.0,
+    "memory": 1.0,
+    "io": 0.25,
+}
+
+
+def resolve_cost(resource_profile="cpu", binary_name=None, resource_cost=None, mode_costs=None, mode=None):
+    """
+    Cost of one task: profile defaults, overridden by the gadget-wide
+    declaration, overridden by the declaration for the mode.
+    """
+    cost = {
+        "cpu_slots": PROFILE_CPU_SLOTS.get(resource_profile, 1.0),
+        "memory_mb": 512 if resource_profile == "memory" else 128,
+        "subprocesses": 1 if binary_name else 0,
+        "io_weight": 1.0 if resource_profile == "io" else 0.0,
+    }
+    cost.update(resource_cost or {})
+    cost.update((mode_costs or {}).get(mode, {}))
+    return cost
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def node_capacity():
+    """Total capacity of this node, from the environment or the hardware"""
+    cores = os.cpu_count() or 1
+    return {
+        "cpu_slots": _env_float("GOBLIN_WORKER_CPU_SLOTS", float(cores)),
+        "memory_mb": _env_float("GOBLIN_WORKER_MEMORY_MB", psutil.virtual_memory().total * 0.8 / 2**20),
+        "subprocesses": _env_float("GOBLIN_WORKER_SUBPROCESSES", 4.0 * cores),
+        "io_weight": _env_float("GOBLIN_WORKER_IO_WEIGHT", 4.0),
+    }
+
+
+class CapacityLedger:
+    """Reservations of declared task costs against the capacity of one node"""
+
+    def __init__(self, path=None, capacity=None):
+        if path is None:
+            directory = Path(os.environ.get("GOBLIN_CAPACITY_DIR", "./results/.capacity"))
+            path = directory / f"{socket.gethostname()}.json"
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self.capacity = capacity or node_capacity()
+
+    @contextmanager
+    def _locked(self):
+        """Yield the reservations and waiters under an exclusive lock, saving changes on exit"""
+        with open(self.path, "a+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    saved = json.loads(f.read() or "{}")
+                    reservations, waiting = saved.get("reservations", {}), saved.get("waiting", {})
+                except (ValueError, AttributeError):
+                    reservations, waiting = {}, {}
+                now = time.time()
+                # Forget reservations held by Minions that no longer exist, and waiters that gave up
+                reservations = {task_id: entry for task_id, entry in reservations.items() if _holder_alive(entry)}
+                waiting = {task_id: entry for task_id, entry in waiting.items()
+                           if now - entry.get("seen", 0) <= WAITER_TTL and task_id not in reservations}
+                state = {"reservations": reservations, "waiting": waiting}
+                before = json.dumps(state, sort_keys=True)
+                yield state
+                if json.dumps(state, sort_keys=True) != before:
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"capacity": self.capacity, **state}))
+                    f.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def try_acquire(self, task_id, cost):
+        """
+        Reserve a task's cost if it fits the remaining capacity and no task
+        that waited longer than GOBLIN_CAPACITY_AGING_SECONDS comes first.
+
+        A task larger than the whole node is admitted when nothing else is
+        running; as the oldest waiter it keeps others out until then.
+        """
+        with self._locked() as state:
+            reservations, waiting = state["reservations"], state["waiting"]
+            if task_id in reservations:
+                return True
+            now = time.time()
+            oldest = min(waiting, key=lambda waiter: waiting[waiter]["since"], default=None)
+            blocked = (oldest is not None and oldest != task_id
+                       and now - waiting[oldest]["since"] >= AGING_SECONDS)
+            in_use = _summarize(self.capacity, reservations)["in_use"]
+            fits = all(
+                in_use[resource] + cost.get(resource, 0) <= self.capacity[resource] + 1e-9
+                for resource in RESOURCES
+            )
+            if blocked or (not fits and reservations):
+                waiter = waiting.setdefault(task_id, {"cost": cost, "since": now})
+                waiter["seen"] = now
+                return False
+            waiting.pop(task_id, None)
+            reservations[task_id] = {"cost": cost, "acquired_at": now, **_process_identity()}
+            return True
+
+    def release(self, task_id):
+        with self._locked() as state:
+            state["reservations"].pop(task_id, None)
+
+    def snapshot(self):
+        """Capacity, current usage, reservations and waiting tasks of the node"""
+        with self._locked() as state:
+            return _summarize(self.capacity, state["reservations"], state["waiting"])
+
+
+def _process_identity():
+    process = psutil.Process()
+    return {"pid": process.pid, "create_time": process.create_time()}
+
+
+def _holder_alive(entry):
+    """Whether the process that made a reservation still runs, pid reuse notwithstanding"""
+    try:
+        process = psutil.Process(entry.get("pid", 0))
+        created = process.create_time()
+    except (psutil.Error, ValueError):
+        return False
+    return entry.get("create_time") is None or abs(created - entry["create_time"]) < 1e-3
+
+
+def _summarize(capacity, reservations, waiting=None):
+    in_use = {
+        resource: sum(entry["cost"].get(resource, 0) for entry in reservations.values())
+        for resource in RESOURCES
+    }
+    now = time.time()
+    return {
+        "capacity": capacity,
+        "in_use": in_use,
+        "available": {r: capacity.get(r, 0) - in_use[r] for r in RESOURCES},
+        "tasks": {task_id: entry["cost"] for task_id, entry in reservations.items()},
+        "waiting": {task_id: {"cost": entry["cost"], "waited_seconds": round(now - entry["since"], 1)}
+                    for task_id, entry in (waiting or {}).items()},
+    }
+
+
+def read_ledgers(directory=None):
+    """Capacity snapshot of every node sharing the ledger directory, read without locking"""
+    directory = Path(directory or os.environ.get("GOBLIN_CAPACITY_DIR", "./results/.capacity"))
+    nodes = {}
+    for path in sorted(directory.glob("*.json")):
+        try:
+            ledger = json.loads(path.read_text() or "{}")
+        except (OSError, ValueError):
+            continue  # Being rewritten; picked up next time
+        if ledger.get("capacity"):
+            nodes[path.stem] = _summarize(ledger["capacity"], ledger.get("reservations", {}), ledger.get("waiting", {}))
+    return nodes
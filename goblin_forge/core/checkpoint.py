@@ -0,0 +1,115 @@
+"""
+Checkpoints and retry backoff for Goblin Forge tasks.
+
+A gadget records its progress (completed shards, the path of a tool's
+resume file, bytes processed) in ``self.checkpoint``. The Minion keeps the
+checkpoint in the task's result directory, so when the task is retried,
+automatically or through ``/api/retry_task``, it runs in the same directory
+and the gadget picks up from the last checkpoint instead of starting over.
+A checkpoint only applies to a run with the same gadget, mode and inputs,
+and is removed once the task completes. Gadgets await update() and save(),
+which write the file in a thread, so recording progress does not hold up
+the event loop on the disk.
+
+Gadgets raise TransientGadgetError (or ConnectionError/TimeoutError) for
+failures worth retrying; the Minion retries those with exponential backoff
+and full jitter.
+
+Configuration:
+    GOBLIN_CHECKPOINT_INTERVAL    Seconds between checkpoint writes from update() (default 5)
+    GOBLIN_TASK_MAX_RETRIES       Automatic retries of transient failures (default 3)
+    GOBLIN_RETRY_BACKOFF_BASE     Delay before the first retry, in seconds (default 10)
+    GOBLIN_RETRY_BACKOFF_MAX      Longest delay between retries, in seconds (default 600)
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_INTERVAL = float(os.environ.get("GOBLIN_CHECKPOINT_INTERVAL", 5))
+MAX_RETRIES = int(os.environ.get("GOBLIN_TASK_MAX_RETRIES", 3))
+RETRY_BACKOFF_BASE = float(os.environ.get("GOBLIN_RETRY_BACKOFF_BASE", 10))
+RETRY_BACKOFF_MAX = float(os.environ.get("GOBLIN_RETRY_BACKOFF_MAX", 600))
+
+
+class TransientGadgetError(RuntimeError):
+    """Raised by gadgets for failures that may succeed when retried (network, busy resources)"""
+
+
+TRANSIENT_ERRORS = (TransientGadgetError, ConnectionError, TimeoutError)
+
+
+def retry_delay(attempt, base=None, cap=None):
+    """Seconds to wait before retry number ``attempt`` (1-based): full-jitter exponential backoff"""
+    base = RETRY_BACKOFF_BASE if base is None else base
+    cap = RETRY_BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class Checkpoint:
+    """
+    Progress markers of one task, saved atomically to checkpoint.json.
+
+    Without a result directory (a gadget run outside a Minion) nothing is
+    recorded, so gadgets can use it unconditionally.
+    """
+
+    def __init__(self, result_dir=None, key=None):
+        self.path = Path(result_dir) / CHECKPOINT_FILE if result_dir else None
+        self.key = key
+        self.state = {}
+        self._dirty = False
+        self._written_at = 0.0
+        if self.path and self.path.exists():
+            try:
+                saved = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                saved = {}
+            # Progress of different inputs is no use to this run
+            if saved.get("key") == key:
+                self.state = saved.get("state", {})
+        self.resumed = bool(self.state)
+
+    def get(self, name, default=None):
+        return self.state.get(name, default)
+
+    async def update(self, **values):
+        """Record progress, writing it at most every GOBLIN_CHECKPOINT_INTERVAL seconds"""
+        if self.path is None:
+            return
+        self.state.update(values)
+        self._dirty = True
+        if time.monotonic() - self._written_at >= CHECKPOINT_INTERVAL:
+            await asyncio.to_thread(self.flush)
+
+    async def save(self, **values):
+        """Record progress and write it right away"""
+        if self.path is None:
+            return
+        self.state.update(values)
+        self._dirty = True
+        await asyncio.to_thread(self.flush)
+
+    def flush(self):
+        """Write recorded progress now; blocks on the disk, coroutines use update() or save()"""
+        if not self._dirty or self.path is None:
+            return
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"key": self.key, "updated_at": datetime.now().isoformat(), "state": self.state},
+                      f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._written_at = time.monotonic()
+
+    def clear(self):
+        self.state = {}
+        self._dirty = False
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
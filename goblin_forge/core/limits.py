@@ -0,0 +1,176 @@
+"""
+Per-mode limits for gadget subprocesses.
+
+Gadgets declare limits with ``subprocess_limits`` and per mode with
+``mode_limits`` on BaseGadget; ``run_subprocess`` applies them to every
+process it starts:
+
+    timeout_seconds    Wall time before the process is killed
+    cpu_seconds        RLIMIT_CPU (the kernel sends SIGXCPU, then SIGKILL)
+    address_space_mb   RLIMIT_AS
+    file_size_mb       RLIMIT_FSIZE, the largest file the process may write
+    open_files         RLIMIT_NOFILE
+    cgroup_cpus        cgroup v2 cpu.max, in CPUs (e.g. 0.5)
+    cgroup_memory_mb   cgroup v2 memory.max
+
+The cgroup limits need a delegated cgroup v2 directory the Minion may write
+to, given as GOBLIN_CGROUP_ROOT; without one they are skipped. Defaults for
+every gadget come from GOBLIN_SUBPROCESS_LIMITS, e.g.
+"timeout_seconds=3500,open_files=4096".
+"""
+import itertools
+import logging
+import os
+import signal
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+LIMIT_FIELDS = (
+    "timeout_seconds", "cpu_seconds", "address_space_mb", "file_size_mb",
+    "open_files", "cgroup_cpus", "cgroup_memory_mb",
+)
+
+# Task outcomes for processes stopped by a limit, as reported in metrics and results
+TIMEOUT = "timeout"
+CPU_LIMIT = "cpu_limit"
+FILE_SIZE_LIMIT = "file_size_limit"
+MEMORY_LIMIT = "memory_limit"
+
+_RLIMITS = (
+    ("cpu_seconds", "RLIMIT_CPU", 1),
+    ("address_space_mb", "RLIMIT_AS", 2**20),
+    ("file_size_mb", "RLIMIT_FSIZE", 2**20),
+    ("open_files", "RLIMIT_NOFILE", 1),
+)
+_cgroup_ids = itertools.count()
+
+
+def default_limits():
+    """Limits applied to every gadget, from GOBLIN_SUBPROCESS_LIMITS"""
+    limits = {}
+    for part in os.environ.get("GOBLIN_SUBPROCESS_LIMITS", "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() in LIMIT_FIELDS and value.strip():
+            limits[name.strip()] = float(value)
+    return limits
+
+
+def resolve_limits(subprocess_limits=None, mode_limits=None, mode=None):
+    """Defaults, overridden by the gadget's limits, overridden by the mode's"""
+    limits = default_limits()
+    limits.update(subprocess_limits or {})
+    limits.update((mode_limits or {}).get(mode, {}))
+    return {name: value for name, value in limits.items() if value is not None}
+
+
+def _rlimits(limits):
+    rlimits = []
+    if resource is not None:
+        for field, name, scale in _RLIMITS:
+            if limits.get(field):
+                value = int(limits[field] * scale)
+                # Soft CPU limit first (SIGXCPU), hard limit a little later (SIGKILL)
+                hard = value + 5 if field == "cpu_seconds" else value
+                rlimits.append((getattr(resource, name), value, hard))
+    return rlimits
+
+
+def apply_limits(pid, limits, cgroup=None):
+    """
+    Move a started process into its cgroup and apply the rlimits, from the
+    parent. A preexec_fn is not safe in the threaded Minion (and runs the
+    fork hooks in the child), so limits follow the spawn by the few
+    microseconds the child takes to exec.
+    """
+    try:
+        if cgroup is not None:
+            cgroup.add(pid)
+        rlimits = _rlimits(limits)
+        if rlimits and not hasattr(resource, "prlimit"):
+            logger.debug("prlimit unavailable, rlimits not applied", extra={"pid": pid})
+            return
+        for which, soft, hard in rlimits:
+            current_soft, current_hard = resource.prlimit(pid, which)
+            if current_hard != resource.RLIM_INFINITY:
+                soft, hard = min(soft, current_hard), min(hard, current_hard)
+            resource.prlimit(pid, which, (soft, hard))
+    except ProcessLookupError:
+        pass  # Already exited
+    except OSError as e:
+        logger.warning("Could not apply subprocess limits", extra={"pid": pid, "error": str(e)})
+
+
+class Cgroup:
+    """A transient cgroup v2 group holding one subprocess"""
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def create(cls, limits):
+        """Create a group with the cgroup limits, or return None when unavailable"""
+        root = os.environ.get("GOBLIN_CGROUP_ROOT")
+        if not root or not (limits.get("cgroup_cpus") or limits.get("cgroup_memory_mb")):
+            return None
+        path = Path(root) / f"goblin-{os.getpid()}-{next(_cgroup_ids)}"
+        try:
+            path.mkdir()
+            if limits.get("cgroup_cpus"):
+                period = 100000
+                (path / "cpu.max").write_text(f"{int(limits['cgroup_cpus'] * period)} {period}")
+            if limits.get("cgroup_memory_mb"):
+                (path / "memory.max").write_text(str(int(limits["cgroup_memory_mb"] * 2**20)))
+                (path / "memory.swap.max").write_text("0")
+        except OSError as e:
+            logger.warning("cgroup limits unavailable", extra={"cgroup": str(path), "error": str(e)})
+            try:
+                path.rmdir()
+            except OSError:
+                pass
+            return None
+        return cls(path)
+
+    def add(self, pid):
+        (self.path / "cgroup.procs").write_text(str(pid))
+
+    def oom_killed(self):
+        try:
+            for line in (self.path / "memory.events").read_text().splitlines():
+                name, _, value = line.partition(" ")
+                if name == "oom_kill":
+                    return int(value) > 0
+        except OSError:
+            pass
+        return False
+
+    def remove(self):
+        try:
+            self.path.rmdir()
+        except OSError as e:
+            logger.debug("Could not remove cgroup", extra={"cgroup": str(self.path), "error": str(e)})
+
+
+def classify_exit(return_code, limits, timed_out=False, oom_killed=False, cpu_time=None):
+    """Name the limit that stopped a process, or None if it was not stopped by one"""
+    if timed_out:
+        return TIMEOUT
+    if oom_killed:
+        return MEMORY_LIMIT
+    if return_code is None or 0 <= return_code <= 128:
+        return None
+    # Negative for the process itself, 128 + signal when a shell reports a killed child
+    signum = -return_code if return_code < 0 else return_code - 128
+    # The hard CPU limit kills outright, so SIGKILL only counts once the CPU time was used up
+    hit_hard_cpu_limit = (signum == signal.SIGKILL and limits.get("cpu_seconds")
+                          and cpu_time is not None and cpu_time >= limits["cpu_seconds"])
+    if signum == getattr(signal, "SIGXCPU", None) or hit_hard_cpu_limit:
+        return CPU_LIMIT
+    if signum == getattr(signal, "SIGXFSZ", None):
+        return FILE_SIZE_LIMIT
+    return None
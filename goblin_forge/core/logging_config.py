@@ -0,0 +1,235 @@
+"""
+Structured, non-blocking logging for Goblin Forge.
+
+Records from the ``goblin_forge`` loggers are put on a bounded in-memory
+queue and written by a background thread, so a slow stdout never stalls a
+request or a Minion; when the queue is full records are dropped and counted
+rather than blocking. Fields passed with ``extra=`` are emitted as
+structured data, with large values truncated at the call site. High-rate
+events can be sampled: records carrying ``event=<name>`` in ``extra`` are
+kept with the configured probability. Warnings and errors, and records of
+failed or cancelled work (an ``error`` field, or a ``status`` of "error" or
+"cancelled"), are always kept. Prefork Minions flush their backlog on
+``worker_process_shutdown``, as ``atexit`` does not run in them.
+
+Configuration:
+    GOBLIN_LOG_LEVEL       Level of the goblin_forge logger (default INFO)
+    GOBLIN_LOG_LEVELS      Per-logger levels, e.g. "goblin_forge.core.plugin_loader=WARNING"
+    GOBLIN_LOG_FORMAT      "json" (default) or "text"
+    GOBLIN_LOG_SAMPLE      Per-event sample rates, e.g. "task.status=0.1,api.gadgets=0.01"
+    GOBLIN_LOG_MAX_FIELD   Maximum characters per logged value (default 1000)
+    GOBLIN_LOG_QUEUE_SIZE  Records buffered before dropping (default 10000)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import reprlib
+import sys
+import threading
+
+ROOT_LOGGER = "goblin_forge"
+
+# Events logged for every task state change; sampled unless overridden
+DEFAULT_SAMPLE_RATES = {
+    "task.status": 0.1,
+    "task.result": 0.1,
+    "api.gadgets": 0.01,
+}
+
+# Records with one of these statuses are never sampled away
+KEPT_STATUSES = ("error", "cancelled")
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_lock = threading.Lock()
+
+
+def _parse_pairs(value):
+    """Parse ``name=value,...`` from an environment variable"""
+    pairs = {}
+    for part in (value or "").split(","):
+        name, _, setting = part.partition("=")
+        if name.strip() and setting.strip():
+            pairs[name.strip()] = setting.strip()
+    return pairs
+
+
+def _truncate(value, limit):
+    """Bound the size of a logged value without rendering all of it first"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if not isinstance(value, str):
+        short_repr = reprlib.Repr()
+        short_repr.maxstring = short_repr.maxother = limit
+        short_repr.maxdict = short_repr.maxlist = 20
+        value = short_repr.repr(value)
+    if len(value) > limit:
+        return f"{value[:limit]}...[{len(value) - limit} more chars]"
+    return value
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records for high-rate events"""
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(DEFAULT_SAMPLE_RATES)
+        self.rates.update({name: float(rate) for name, rate in (rates or {}).items()})
+        self.dropped = 0
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        if getattr(record, "error", None) or getattr(record, "status", None) in KEPT_STATUSES:
+            return True
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            record.sample_rate = rate
+            return True
+        self.dropped += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue records for the background writer, dropping them when it falls behind"""
+
+    def __init__(self, log_queue, max_field):
+        super().__init__(log_queue)
+        self.max_field = max_field
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Render in the caller's thread so the writer never sees objects that are still changing
+        record = super().prepare(record)
+        record.msg = _truncate(record.msg, self.max_field)
+        for key, value in list(vars(record).items()):
+            if key not in _RECORD_ATTRIBUTES:
+                setattr(record, key, _truncate(value, self.max_field))
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the extra= fields at the top level"""
+
+    def __init__(self, service=None):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        if self.service:
+            entry["service"] = self.service
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines with the extra= fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES
+        )
+        return f"{line} {fields}" if fields else line
+
+
+def configure_logging(service=None, stream=None):
+    """
+    Route the goblin_forge loggers through the queued, structured pipeline.
+
+    Safe to call more than once; only the first call installs handlers.
+    Returns the queue handler so callers can inspect drop counters.
+    """
+    global _listener
+    logger = logging.getLogger(ROOT_LOGGER)
+    with _lock:
+        if _listener is not None:
+            return logger.handlers[0]
+
+        max_field = int(os.environ.get("GOBLIN_LOG_MAX_FIELD", 1000))
+        log_queue = queue.Queue(maxsize=int(os.environ.get("GOBLIN_LOG_QUEUE_SIZE", 10000)))
+        queue_handler = NonBlockingQueueHandler(log_queue, max_field)
+        queue_handler.addFilter(SamplingFilter(_parse_pairs(os.environ.get("GOBLIN_LOG_SAMPLE"))))
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        if os.environ.get("GOBLIN_LOG_FORMAT", "json") == "text":
+            output.setFormatter(TextFormatter())
+        else:
+            output.setFormatter(JsonFormatter(service))
+
+        logger.setLevel(os.environ.get("GOBLIN_LOG_LEVEL", "INFO").upper())
+        for name, level in _parse_pairs(os.environ.get("GOBLIN_LOG_LEVELS")).items():
+            logging.getLogger(name).setLevel(level.upper())
+        logger.handlers = [queue_handler]
+        # Celery and uvicorn configure the root logger; keep our records out of theirs
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return queue_handler
+
+
+def _restart_after_fork():
+    """The writer thread does not survive fork(); give each prefork Minion its own"""
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    handler = logging.getLogger(ROOT_LOGGER).handlers[0]
+    handler.queue = queue.Queue(maxsize=handler.queue.maxsize)
+    _listener = logging.handlers.QueueListener(handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def get_logging_stats():
+    """Counters of records dropped by sampling or a full queue"""
+    handlers = logging.getLogger(ROOT_LOGGER).handlers
+    if not handlers or not isinstance(handlers[0], NonBlockingQueueHandler):
+        return {}
+    handler = handlers[0]
+    sampler = next((f for f in handler.filters if isinstance(f, SamplingFilter)), None)
+    return {
+        "queue_size": handler.queue.qsize(),
+        "dropped_queue_full": handler.dropped,
+        "dropped_sampled": sampler.dropped if sampler else 0,
+    }
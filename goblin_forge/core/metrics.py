@@ -0,0 +1,152 @@
+"""
+Prometheus/OpenMetrics instrumentation for Goblin Forge.
+
+Metrics are recorded in prometheus_client's multiprocess mode so the values
+written by uvicorn workers and Celery Minion processes are aggregated when
+``/metrics`` is scraped. The API and the Minion master call
+``configure_metrics`` on startup. Each gets its own directory below
+``GOBLIN_METRICS_DIR`` (default ``./results/.metrics``, which docker-compose
+shares), and its forked children inherit it. Directories left by earlier
+runs on the same host are removed then, so counters restart with their
+process tree.
+"""
+import glob
+import os
+import shutil
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import psutil
+from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess, values
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.openmetrics import exposition as openmetrics
+
+METRICS_DIR = os.environ.get("GOBLIN_METRICS_DIR") or os.environ.get("PROMETHEUS_MULTIPROC_DIR", "./results/.metrics")
+
+# Buckets sized for gadget runs, from quick encodes to hour-long scans
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 1800, 3600)
+
+API_REQUEST_LATENCY = Histogram(
+    "goblin_api_request_duration_seconds",
+    "API request latency per route",
+    ["method", "route", "status"],
+)
+TASK_QUEUE_WAIT = Histogram(
+    "goblin_task_queue_wait_seconds",
+    "Time a task waited in the broker before a Minion started it",
+    ["gadget", "mode"],
+    buckets=TASK_BUCKETS,
+)
+TASK_EXECUTION_TIME = Histogram(
+    "goblin_task_execution_seconds",
+    "Time spent executing a gadget",
+    ["gadget", "mode"],
+    buckets=TASK_BUCKETS,
+)
+TASK_OUTCOMES = Counter(
+    "goblin_task_outcomes",
+    "Finished tasks by outcome",
+    ["gadget", "mode", "outcome"],
+)
+BROKER_ROUND_TRIP = Histogram(
+    "goblin_broker_round_trip_seconds",
+    "Time to publish a task to the broker",
+    ["operation"],
+)
+PLUGIN_LOAD_TIME = Histogram(
+    "goblin_plugin_load_seconds",
+    "Time to import a plugin module",
+    ["module"],
+)
+TASK_CAPACITY_DEFERRALS = Counter(
+    "goblin_task_capacity_deferrals",
+    "Tasks handed back to the broker because their declared cost did not fit the node",
+    ["gadget", "mode"],
+)
+TASK_RETRIES = Counter(
+    "goblin_task_retries",
+    "Automatic retries of tasks after transient failures",
+    ["gadget", "mode"],
+)
+RESULT_BYTES_DEDUPLICATED = Counter(
+    "goblin_result_bytes_deduplicated",
+    "Bytes of result artifacts stored as links to identical blobs instead of copies",
+    ["gadget", "mode"],
+)
+RESULT_BYTES_WRITTEN = Counter(
+    "goblin_result_bytes_written",
+    "Bytes of result artifacts written by gadgets",
+    ["gadget", "mode"],
+)
+
+
+@contextmanager
+def observe_time(histogram, **labels):
+    """Observe the duration of the wrapped block on a labelled histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+def directory_size(path):
+    """Total size in bytes of the files below a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def configure_metrics(service):
+    """
+    Record this process tree's metrics in its own directory below METRICS_DIR.
+
+    Must run before the first sample is recorded. Directories of process
+    trees on this host that are no longer running are removed.
+    """
+    base = Path(METRICS_DIR).resolve()
+    base.mkdir(exist_ok=True, parents=True)
+    host = socket.gethostname()
+    for stale in base.glob(f"*_{host}_*"):
+        pid = stale.name.rpartition("_")[2]
+        if pid.isdigit() and not psutil.pid_exists(int(pid)):
+            shutil.rmtree(stale, ignore_errors=True)
+
+    directory = base / f"{service}_{host}_{os.getpid()}"
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.mkdir()
+    os.environ["GOBLIN_METRICS_DIR"] = str(base)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(directory)
+    # prometheus_client picks its value backend on import; switch to the mmapped one
+    values.ValueClass = values.get_value_class()
+
+
+def mark_process_dead(pid):
+    """Drop the live gauge samples of an exited child process"""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        multiprocess.mark_process_dead(pid, directory)
+
+
+class _AllProcessesCollector:
+    """Merges the samples of every process tree writing below METRICS_DIR"""
+
+    def collect(self):
+        files = glob.glob(os.path.join(os.path.abspath(METRICS_DIR), "*", "*.db"))
+        return multiprocess.MultiProcessCollector.merge(files, accumulate=True)
+
+
+def render_metrics(accept_header=""):
+    """Render the metrics of all processes, as OpenMetrics if the scraper accepts it"""
+    registry = CollectorRegistry()
+    registry.register(_AllProcessesCollector())
+    if "application/openmetrics-text" in (accept_header or ""):
+        return openmetrics.generate_latest(registry), openmetrics.CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
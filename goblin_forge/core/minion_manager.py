@@ -6,8 +6,40 @@ import json
 import time
 import asyncio
 from celery import Celery
+from celery.signals import task_prerun, worker_init, worker_process_shutdown
+from celery.worker.control import control_command, inspect_command
 from pathlib import Path
 import os
+import hashlib
+import uuid
+import contextvars
+import concurrent.futures
+import logging
+import shutil
+
+from goblin_forge.core.resource_usage import ResourceMonitor
+from goblin_forge.core.capacity import CapacityLedger
+from goblin_forge.core.checkpoint import MAX_RETRIES, TRANSIENT_ERRORS, Checkpoint, retry_delay
+from goblin_forge.core import artifacts, metrics, process_tree, tracing
+from goblin_forge.core.logging_config import configure_logging, shutdown_logging
+from goblin_forge.core.results_manager import ResultsManager
+from goblin_forge.core.task_index import TaskIndex, project_fields
+from goblin_forge.core.worker_inventory import WorkerInventory, worker_report
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack  # noqa: F401  Compact binary encoding for task results
+    DEFAULT_RESULT_SERIALIZER = 'msgpack'
+except ImportError:
+    DEFAULT_RESULT_SERIALIZER = 'json'
+
+RESULT_SERIALIZER = os.environ.get('GOBLIN_RESULT_SERIALIZER', DEFAULT_RESULT_SERIALIZER)
+RESULT_MANIFEST = "task_result.json"  # Full task result, kept next to the gadget's output
+RESULT_PREVIEW_CHARS = int(os.environ.get('GOBLIN_RESULT_PREVIEW_CHARS', 512))
+# Minions reserve each task's declared resource cost before running it (see core/capacity.py)
+CAPACITY_ADMISSION = os.environ.get('GOBLIN_CAPACITY_ADMISSION', '1') != '0'
+CAPACITY_RETRY_SECONDS = float(os.environ.get('GOBLIN_CAPACITY_RETRY_SECONDS', 2))
 
 # Configure Celery
 celery_app = Celery('goblin_forge',
@@ -16,11 +48,48 @@ celery_app = Celery('goblin_forge',
 
 # Configure task concurrency
 celery_app.conf.update(
-    worker_concurrency=5,  # Max 5 concurrent Minions
+    worker_concurrency=int(os.environ.get('GOBLIN_MINION_CONCURRENCY', 5)),  # Used when autoscaling is off
+    # Resource-aware pool sizing, enabled by starting the worker with
+    # --autoscale=<max>,<min> (see core/autoscaler.py)
+    worker_autoscaler='goblin_forge.core.autoscaler:MinionAutoscaler',
     task_time_limit=3600,  # 60 minute timeout
-    task_soft_time_limit=3540  # Soft timeout 59 minutes
+    task_soft_time_limit=3540,  # Soft timeout 59 minutes
+    # Only a compact envelope goes through the result backend (see _run_gadget_task)
+    result_serializer=RESULT_SERIALIZER,
+    result_accept_content=[RESULT_SERIALIZER, 'json'],
+    result_expires=int(os.environ.get('GOBLIN_RESULT_EXPIRES', 3600)),  # The monitor reads results right away
 )
 
+@worker_init.connect
+def _configure_worker_logging(**kwargs):
+    configure_logging(service="minion")
+    # Runs in the worker's main process, before the pool forks
+    metrics.configure_metrics("minion")
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(pid=None, **kwargs):
+    """atexit does not run in prefork children; release their metrics and write out queued records"""
+    metrics.mark_process_dead(pid or os.getpid())
+    shutdown_logging()
+
+@task_prerun.connect
+def _reap_orphaned_processes(**kwargs):
+    """Stop gadget processes left behind by Minion processes that were killed (revoked, hard time limit)"""
+    try:
+        process_tree.reap_orphaned_trees()
+    except Exception as e:
+        logger.warning("Failed to reap orphaned processes", extra={"error": str(e)})
+
+@control_command(args=[("task_id", str)], signature="<task_id>")
+def kill_task_processes(state, task_id):
+    """Worker remote control: stop the process trees a task started on this node"""
+    return {"ok": process_tree.terminate_task_processes(task_id)}
+
+@inspect_command()
+def minion_inventory(state):
+    """Worker remote control: task counts, pool size, consumed queues and process memory of this worker"""
+    return worker_report(state)
+
 class MinionManager:
     """Manages worker processes (Minions) for executing Goblin Gadget tasks"""
     
@@ -34,12 +103,24 @@ class MinionManager:
         self.results_dir = Path(results_dir)
         self.results_dir.mkdir(exist_ok=True, parents=True)
         self.retention_days = retention_days
+        self.results_manager = ResultsManager(self.results_dir, retention_days)  # Deduplicated artifact storage
         self.minion_status = {}
         self.minion_details = {}  # Store detailed info about each minion
-        self.completed_tasks = []  # Track completed tasks
+        self.completed_tasks = TaskIndex()  # Track completed tasks
         self.completed_tasks_max = 100  # Maximum number of completed tasks to store
-        self.pending_tasks = []  # Track pending tasks
-        self.paused_minions = set()  # Track paused minions
+        self.pending_tasks = TaskIndex()  # Track pending tasks
+        # Identical submissions arriving while a matching task is in flight
+        # attach to it instead of running again (0 disables coalescing)
+        self.coalesce_window = float(os.environ.get('GOBLIN_COALESCE_WINDOW', 300))
+        self.inflight_tasks = {}  # fingerprint -> leader task_id
+        self.coalesced_count = 0
+        self.coalesced_seconds_saved = 0.0
+        self.resource_usage = {}  # "gadget:mode" -> aggregated resource accounting
+        # Worker telemetry from heartbeats and inspection, and consumer control (pause/resume/drain)
+        self.workers = WorkerInventory(celery_app)
+        # Callables run as listener(task_id, status, result) when a task finishes
+        self.completion_listeners = []
+        self.batch_items = {}  # task_id -> items of batch tasks
         
     def create_result_directory(self, gadget_name, mode):
         """Create a timestamped directory for results"""
@@ -49,46 +130,123 @@ class MinionManager:
         result_dir.mkdir(exist_ok=True)
         return result_dir
     
-    async def submit_task(self, gadget, mode, params):
-        """Submit a task to be executed by a Minion"""
-        # Create results directory
-        gadget_name = gadget.name.replace(" ", "_").lower()
-        result_dir = self.create_result_directory(gadget_name, mode)
+    def _task_fingerprint(self, gadget, mode, params, items=None):
+        """Build a fingerprint identifying submissions that would do the same work"""
+        normalized = {
+            key: value.strip() if isinstance(value, str) else value
+            for key, value in (params or {}).items()
+            if value not in (None, "", [], {})
+        }
+        payload = json.dumps(
+            [gadget.tab_id, mode, normalized, items], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _find_inflight_task(self, fingerprint):
+        """Return the in-flight task matching a fingerprint within the coalescing window"""
+        if self.coalesce_window <= 0:
+            return None
+        leader_id = self.inflight_tasks.get(fingerprint)
+        leader = self.minion_details.get(leader_id)
+        if not leader or leader["status"] != self.STATUS_BUSY:
+            self.inflight_tasks.pop(fingerprint, None)
+            return None
+        submitted = datetime.fromisoformat(leader["submit_time"])
+        if (datetime.now() - submitted).total_seconds() > self.coalesce_window:
+            return None
+        return leader
+    
+    def _attach_to_task(self, leader, mode, params):
+        """Register a duplicate submission as a follower of an in-flight task"""
+        # Counted per leader rather than from the list, which shrinks when followers cancel
+        leader["follower_count"] = leader.get("follower_count", 0) + 1
+        task_id = f"{leader['task_id']}_dup{leader['follower_count']}"
+        leader.setdefault("followers", []).append(task_id)
+        self.minion_status[task_id] = self.STATUS_BUSY
+        
+        task_info = {
+            "task_id": task_id,
+            "gadget_id": leader.get("gadget_id"),
+            "gadget_name": leader["gadget_name"],
+            "gadget_module": leader.get("gadget_module"),
+            "gadget_class": leader.get("gadget_class"),
+            "mode": mode,
+            "params": params,
+            "result_dir": leader["result_dir"],
+            "submit_time": datetime.now().isoformat(),
+            "status": self.STATUS_BUSY,
+            "coalesced_with": leader["task_id"],
+        }
+        if "celery_task_id" in leader:
+            task_info["celery_task_id"] = leader["celery_task_id"]
+        
+        self.minion_details[task_id] = task_info
+        self.pending_tasks.add(task_info)
+        self.coalesced_count += 1
+        
+        return {
+            "task_id": task_id,
+            "status": self.STATUS_BUSY,
+            "result_dir": leader["result_dir"],
+            "celery_task_id": task_info.get("celery_task_id"),
+            "coalesced_with": leader["task_id"]
+        }
+    
+    async def submit_task(self, gadget, mode, params, result_dir=None, items=None):
+        """
+        Submit a task to be executed by a Minion.
+
+        A caller-provided result_dir (a pipeline step) is used as is, and the
+        task never attaches to other in-flight work, since its output must
+        land in that directory. With items, the Minion runs the gadget's
+        execute_batch over all of them as a single task.
+        """
+        fingerprint = self._task_fingerprint(gadget, mode, params, items)
+        if result_dir is None:
+            # Attach to identical in-flight work instead of running it twice
+            leader = self._find_inflight_task(fingerprint)
+            if leader:
+                return self._attach_to_task(leader, mode, params)
+            
+            # Create results directory
+            gadget_name = gadget.name.replace(" ", "_").lower()
+            result_dir = self.create_result_directory(gadget_name, mode)
+        else:
+            result_dir = Path(result_dir)
+            result_dir.mkdir(exist_ok=True, parents=True)
         
         # Submit task to Celery
-        task_id = f"{gadget.name}_{mode}_{int(time.time())}"
+        # Suffix keeps ids unique when identical submissions land in the same second
+        task_id = f"{gadget.name}_{mode}_{int(time.time())}_{uuid.uuid4().hex[:6]}"
         self.minion_status[task_id] = self.STATUS_BUSY
         
         # Store detailed info about the task
         task_info = {
             "task_id": task_id,
+            "gadget_id": gadget.tab_id,
             "gadget_name": gadget.name,
+            "gadget_module": gadget.__module__,
+            "gadget_class": gadget.__class__.__name__,
             "mode": mode,
             "params": params,
             "result_dir": str(result_dir),
             "submit_time": datetime.now().isoformat(),
             "status": self.STATUS_BUSY,
+            "fingerprint": fingerprint,
+            "traceparent": tracing.current_traceparent(),
+            "resource_cost": gadget.get_resource_cost(mode),
         }
+        if items is not None:
+            # The items themselves stay out of task listings
+            task_info["batch_size"] = len(items)
+            self.batch_items[task_id] = items
         
         self.minion_details[task_id] = task_info
-        self.pending_tasks.append(task_info)
+        self.pending_tasks.add(task_info)
+        self.inflight_tasks[fingerprint] = task_id
         
         try:
-            # Queue task in Celery
-            result = execute_gadget_task.delay(
-                gadget_module=gadget.__module__,
-                gadget_class=gadget.__class__.__name__,
-                mode=mode,
-                params=params,
-                result_dir=str(result_dir),
-                task_id=task_id  # Pass task_id to the Celery task
-            )
-            
-            # Update task info with Celery task ID
-            self.minion_details[task_id]["celery_task_id"] = result.id
-            
-            # Set up an async task to check for completion
-            asyncio.create_task(self._monitor_task(task_id, result))
+            result = self._enqueue(task_info, items)
 
             # Return task info
             return {
@@ -101,45 +259,90 @@ class MinionManager:
             self.minion_status[task_id] = self.STATUS_ERROR
             self.minion_details[task_id]["status"] = self.STATUS_ERROR
             self.minion_details[task_id]["error"] = str(e)
+            self.inflight_tasks.pop(fingerprint, None)
             
             # Move from pending to completed
-            self.pending_tasks = [t for t in self.pending_tasks if t["task_id"] != task_id]
-            self.completed_tasks.insert(0, self.minion_details[task_id])
+            self.pending_tasks.remove(task_id)
+            self.completed_tasks.add(self.minion_details[task_id])
             
             return {
                 "task_id": task_id,
                 "status": self.STATUS_ERROR,
                 "error": str(e)
             }
+    def _enqueue(self, task_info, items=None):
+        """Queue a task for a Minion and start watching for its result"""
+        task_id = task_info["task_id"]
+        # Queue task in Celery, carrying the trace context in the message headers
+        with metrics.observe_time(metrics.BROKER_ROUND_TRIP, operation="publish"), \
+                tracing.start_span("broker.publish", task_id=task_id) as publish_span:
+            result = execute_gadget_task.apply_async(
+                kwargs=dict(
+                    gadget_module=task_info["gadget_module"],
+                    gadget_class=task_info["gadget_class"],
+                    mode=task_info["mode"],
+                    params=task_info["params"],
+                    result_dir=task_info["result_dir"],
+                    task_id=task_id,  # Pass task_id to the Celery task
+                    submitted_at=time.time(),
+                    items=items,
+                    resource_cost=task_info.get("resource_cost")
+                ),
+                headers={"traceparent": publish_span.traceparent}
+            )
+        
+        # Update task info with Celery task ID
+        task_info["celery_task_id"] = result.id
+        
+        # Set up an async task to check for completion
+        asyncio.create_task(self._monitor_task(task_id, result))
+        return result
+
     async def _monitor_task(self, task_id, celery_task):
         """Monitor a Celery task for completion"""
-        try:
-            # Wait for task to complete
-            task_result = await asyncio.to_thread(celery_task.get)
-            
-            print(f"Task {task_id} completed with result: {task_result}")
-            
-            # Update task status based on result
-            if task_result.get("status") == "completed":
-                self.update_task_status(task_id, self.STATUS_IDLE, task_result)
-            else:
-                self.update_task_status(task_id, self.STATUS_ERROR, task_result)
+        traceparent = self.minion_details.get(task_id, {}).get("traceparent")
+        with tracing.start_span("minion.monitor_task", parent=traceparent, task_id=task_id) as span:
+            try:
+                # Wait for task to complete
+                task_result = await asyncio.to_thread(celery_task.get)
                 
-        except Exception as e:
-            print(f"Error monitoring task {task_id}: {e}")
-            self.update_task_status(task_id, self.STATUS_ERROR, {"error": str(e)})
+                logger.info("Task finished", extra={
+                    "event": "task.result", "task_id": task_id, "status": task_result.get("status")
+                })
+                if self.minion_details.get(task_id, {}).get("status") != self.STATUS_BUSY:
+                    return  # Cancelled meanwhile
+                
+                # How long completion went unnoticed after the Minion finished
+                if task_result.get("execution_timestamp"):
+                    finished = datetime.fromisoformat(task_result["execution_timestamp"])
+                    span.set_attribute("notice_delay_seconds", (datetime.now() - finished).total_seconds())
+                
+                # Update task status based on result
+                if task_result.get("status") == "completed":
+                    self.update_task_status(task_id, self.STATUS_IDLE, task_result)
+                else:
+                    span.set_status("error", task_result.get("error"))
+                    self.update_task_status(task_id, self.STATUS_ERROR, task_result)
+                    
+            except Exception as e:
+                if self.minion_details.get(task_id, {}).get("status") != self.STATUS_BUSY:
+                    return  # Cancelled: the revoked task has no result
+                logger.error("Error monitoring task", extra={"task_id": task_id, "error": str(e)})
+                span.set_status("error", str(e))
+                self.update_task_status(task_id, self.STATUS_ERROR, {"error": str(e)})
             
     def update_task_status(self, task_id, status, result=None):
         """Update the status of a task and store results if completed"""
-        print(f"Updating task {task_id} to status {status}")
+        logger.debug("Updating task status", extra={"event": "task.status", "task_id": task_id, "status": status})
         
         self.minion_status[task_id] = status
         
         if task_id in self.minion_details:
             self.minion_details[task_id]["status"] = status
+            self.pending_tasks.reindex(task_id)
             
             if result:
-                print(f"Task {task_id} has result: {result}")
+                logger.debug("Storing task result", extra={"event": "task.result", "task_id": task_id, "result": result})
                 self.minion_details[task_id]["result"] = result
                 self.minion_details[task_id]["completion_time"] = datetime.now().isoformat()
                 
@@ -149,21 +352,122 @@ class MinionManager:
                     completion_time = datetime.fromisoformat(self.minion_details[task_id]["completion_time"])
                     execution_time = (completion_time - submit_time).total_seconds()
                     self.minion_details[task_id]["execution_time_seconds"] = execution_time
+                
+                self._record_resource_usage(task_id, result)
             
             if status in [self.STATUS_IDLE, self.STATUS_ERROR]:
-                print(f"Moving task {task_id} from pending to completed")
+                fields = {"event": "task.status", "task_id": task_id, "status": status}
+                if status == self.STATUS_ERROR:
+                    fields["error"] = (result or {}).get("error") or "unknown"
+                logger.info("Task completed", extra=fields)
                 # Move task from pending to completed
-                self.pending_tasks = [t for t in self.pending_tasks if t["task_id"] != task_id]
-                self.completed_tasks.insert(0, self.minion_details[task_id])
+                self.pending_tasks.remove(task_id)
+                self.completed_tasks.add(self.minion_details[task_id])
                 
-                # Trim completed tasks list if needed
-                if len(self.completed_tasks) > self.completed_tasks_max:
-                    self.completed_tasks = self.completed_tasks[:self.completed_tasks_max]
+                # Trim completed tasks list if needed, forgetting the details
+                # of trimmed tasks so minion_details stays bounded
+                while len(self.completed_tasks) > self.completed_tasks_max:
+                    trimmed = self.completed_tasks.pop_oldest()
+                    if trimmed.get("status") != self.STATUS_BUSY:
+                        self.minion_details.pop(trimmed["task_id"], None)
+                        self.batch_items.pop(trimmed["task_id"], None)
                     
                 # Remove from active minions list
-                if task_id in self.minion_status:
-                    print(f"Removing task {task_id} from minion_status")
-                    del self.minion_status[task_id]
+                self.minion_status.pop(task_id, None)
+                
+                self._complete_followers(task_id, status, result)
+                
+                for listener in list(self.completion_listeners):
+                    try:
+                        listener(task_id, status, result)
+                    except Exception as e:
+                        logger.error("Completion listener failed", extra={"task_id": task_id, "error": str(e)})
+    
+    def _record_resource_usage(self, task_id, result):
+        """Store a task's resource accounting and fold it into the per-gadget/mode totals"""
+        usage = result.get("resource_usage")
+        task_info = self.minion_details[task_id]
+        if not usage or task_info.get("coalesced_with"):
+            return
+
+        task_info["resource_usage"] = usage
+        task_info["queue_wait_seconds"] = result.get("queue_wait_seconds")
+
+        key = f"{task_info['gadget_name']}:{task_info['mode']}"
+        totals = self.resource_usage.setdefault(key, {
+            "tasks": 0,
+            "queue_wait_seconds": 0.0,
+            "run_time_seconds": 0.0,
+            "cpu_seconds": 0.0,
+            "read_bytes": 0,
+            "write_bytes": 0,
+            "peak_rss_bytes_max": 0,
+            "cpu_slots_max": 0.0,
+            "subprocesses_max": 0,
+            "outcomes": {},
+        })
+        totals["tasks"] += 1
+        outcome = result.get("outcome") or result.get("status") or "unknown"
+        totals["outcomes"][outcome] = totals["outcomes"].get(outcome, 0) + 1
+        totals["queue_wait_seconds"] += result.get("queue_wait_seconds") or 0
+        totals["run_time_seconds"] += usage.get("run_time_seconds", 0)
+        task_cpu = sum(usage.get(field, 0) for field in (
+            "cpu_user_seconds", "cpu_system_seconds", "children_cpu_user_seconds", "children_cpu_system_seconds"
+        ))
+        totals["cpu_seconds"] += task_cpu
+        totals["read_bytes"] += usage.get("read_bytes", 0)
+        totals["write_bytes"] += usage.get("write_bytes", 0)
+        totals["peak_rss_bytes_max"] = max(totals["peak_rss_bytes_max"], usage.get("peak_rss_bytes", 0))
+
+        # Observed usage in the units of the declared cost, to check the declarations against
+        if usage.get("run_time_seconds"):
+            totals["cpu_slots_max"] = max(totals["cpu_slots_max"], task_cpu / usage["run_time_seconds"])
+        totals["subprocesses_max"] = max(totals["subprocesses_max"], usage.get("subprocess_count", 0))
+        if task_info.get("resource_cost"):
+            totals["declared_cost"] = task_info["resource_cost"]
+    
+    def get_resource_usage(self):
+        """Get resource accounting aggregated per gadget and mode"""
+        summary = {}
+        for key, totals in self.resource_usage.items():
+            count = max(1, totals["tasks"])
+            summary[key] = {
+                **totals,
+                "avg_queue_wait_seconds": totals["queue_wait_seconds"] / count,
+                "avg_run_time_seconds": totals["run_time_seconds"] / count,
+                "avg_cpu_seconds": totals["cpu_seconds"] / count,
+            }
+            declared = totals.get("declared_cost")
+            if declared:
+                observed = {
+                    "cpu_slots": totals["cpu_seconds"] / totals["run_time_seconds"] if totals["run_time_seconds"] else 0.0,
+                    "memory_mb": totals["peak_rss_bytes_max"] / 2**20,
+                    "subprocesses": totals["subprocesses_max"],
+                }
+                summary[key]["observed_cost"] = observed
+                # Resources the tasks used more of than they declare
+                summary[key]["exceeds_declared"] = sorted(
+                    resource for resource, value in observed.items() if value > declared.get(resource, 0)
+                )
+        return summary
+    
+    def _complete_followers(self, task_id, status, result):
+        """Hand a finished task's result to every submission coalesced onto it"""
+        task_info = self.minion_details[task_id]
+        if self.inflight_tasks.get(task_info.get("fingerprint")) == task_id:
+            del self.inflight_tasks[task_info["fingerprint"]]
+        
+        followers = task_info.get("followers", [])
+        if not followers:
+            return
+        
+        # Worker time the followers would otherwise have spent on their own run
+        run_time = (result or {}).get("execution_time", task_info.get("execution_time_seconds", 0))
+        for follower_id in followers:
+            follower = self.minion_details.get(follower_id)
+            if follower and follower["status"] == self.STATUS_BUSY:
+                self.coalesced_seconds_saved += run_time or 0
+                self.update_task_status(follower_id, status, result)
 
     def get_task_status(self, task_id):
         """Get the status of a task"""
@@ -173,57 +477,157 @@ class MinionManager:
         """Get detailed information about a task"""
         return self.minion_details.get(task_id, {"error": "Task not found"})
     
+    def get_task_result(self, task_id):
+        """Get the full result of a finished task from its result directory"""
+        task_info = self.minion_details.get(task_id)
+        if not task_info:
+            return None
+        # Read through the storage backend, the Minion may have run on another node
+        storage = self.results_manager.storage
+        try:
+            return storage.read_json(storage.key_for(Path(task_info["result_dir"]) / RESULT_MANIFEST))
+        except FileNotFoundError:
+            return None
+    
     def get_completed_tasks(self, limit=50):
         """Get recently completed tasks with their results"""
-        return self.completed_tasks[:limit]
+        return self.completed_tasks.latest(limit)
     
     def get_pending_tasks(self):
         """Get currently pending tasks"""
-        return self.pending_tasks
+        return list(self.pending_tasks)
+    
+    def list_tasks(self, which, limit=50, cursor=None, fields=None, **filters):
+        """
+        Get one page of pending or completed tasks.
+        
+        Completed tasks are listed newest first and pending tasks oldest
+        first. Filters are gadget_id, mode, status and since/until (submit
+        time). Returns (tasks, next_cursor).
+        """
+        index = self.completed_tasks if which == "completed" else self.pending_tasks
+        tasks, next_cursor = index.query(
+            limit=limit, cursor=cursor, descending=which == "completed", **filters
+        )
+        return [project_fields(task, fields) for task in tasks], next_cursor
     
-    def cancel_task(self, task_id):
-        """Cancel a running task"""
+    def list_minion_status(self, limit=50, cursor=None, **filters):
+        """Get one page of the status of active Minions, keyed by task id"""
+        tasks, next_cursor = self.pending_tasks.query(limit=limit, cursor=cursor, **filters)
+        return {
+            task["task_id"]: self.minion_status.get(task["task_id"], task["status"]) for task in tasks
+        }, next_cursor
+    
+    def _stop_task_processes(self, task_id, celery_task_id):
+        """
+        Have the worker running a task stop the subprocess trees it started,
+        returning what was stopped. Tasks not started yet have none; when
+        the worker is unknown, this node's registry is used.
+        """
+        started = celery_app.AsyncResult(celery_task_id)
+        if started.state == "PENDING":
+            return process_tree.merge_reports([])
+        hostname = started.info.get("hostname") if isinstance(started.info, dict) else None
+        if hostname:
+            try:
+                replies = celery_app.control.broadcast(
+                    "kill_task_processes", arguments={"task_id": task_id}, destination=[hostname],
+                    reply=True, limit=1,
+                    timeout=process_tree.KILL_GRACE_SECONDS + process_tree.KILL_CONFIRM_SECONDS + 1,
+                ) or []
+                reports = [
+                    answer["ok"] for reply in replies for answer in reply.values()
+                    if isinstance(answer, dict) and isinstance(answer.get("ok"), dict)
+                ]
+                if reports:
+                    return process_tree.merge_reports(reports)
+            except Exception as e:
+                logger.warning("Failed to reach worker to stop processes", extra={
+                    "task_id": task_id, "worker": hostname, "error": str(e)
+                })
+        return process_tree.terminate_task_processes(task_id)
+
+    async def cancel_task(self, task_id):
+        """
+        Cancel a running task, stopping the subprocesses it started.
+
+        The task's process trees get SIGTERM, then SIGKILL after a grace
+        period; the response reports what was stopped and what it held.
+        """
+        task_info = self.minion_details.get(task_id, {})
+        if task_info.get("coalesced_with") and task_info["status"] == self.STATUS_BUSY:
+            # Detach from the shared run without stopping it for the others
+            leader = self.minion_details.get(task_info["coalesced_with"], {})
+            if task_id in leader.get("followers", []):
+                leader["followers"].remove(task_id)
+            self.update_task_status(task_id, self.STATUS_ERROR, {"error": "Task cancelled by user", "cancelled": True})
+            return {"status": "success", "message": f"Task {task_id} cancelled"}
+
         if task_id in self.minion_details and "celery_task_id" in self.minion_details[task_id]:
             celery_task_id = self.minion_details[task_id]["celery_task_id"]
             try:
-                # Try to revoke the Celery task
+                # Keep a queued task from starting, then stop what a running one spawned:
+                # terminating the Minion alone would leave its subprocesses orphaned
+                celery_app.control.revoke(celery_task_id)
+                self.update_task_status(task_id, self.STATUS_ERROR, {"error": "Task cancelled by user", "cancelled": True})
+                processes = await asyncio.to_thread(self._stop_task_processes, task_id, celery_task_id)
                 celery_app.control.revoke(celery_task_id, terminate=True)
-                self.update_task_status(task_id, self.STATUS_ERROR, {"error": "Task cancelled by user"})
-                return {"status": "success", "message": f"Task {task_id} cancelled"}
+                self.minion_details[task_id]["cancellation"] = processes
+                if processes["survivors"]:
+                    logger.error("Cancelled task left processes running", extra={
+                        "task_id": task_id, "pids": processes["survivors"]
+                    })
+                return {"status": "success", "message": f"Task {task_id} cancelled", "processes": processes}
             except Exception as e:
                 return {"status": "error", "message": f"Failed to cancel task: {str(e)}"}
         return {"status": "error", "message": "Task not found or already completed"}
     
     def pause_minion(self, minion_id):
-        """Pause a minion to prevent it from taking new tasks"""
-        if minion_id not in self.paused_minions:
-            self.paused_minions.add(minion_id)
-            return {"status": "success", "message": f"Minion {minion_id} paused"}
-        return {"status": "error", "message": "Minion already paused"}
+        """Stop a worker (by hostname) from taking new tasks"""
+        return self.workers.pause(minion_id)
+    
+    def drain_minion(self, minion_id):
+        """Pause a worker and let it finish the tasks it holds, e.g. before a deploy"""
+        return self.workers.pause(minion_id, drain=True)
     
     def resume_minion(self, minion_id):
-        """Resume a paused minion"""
-        if minion_id in self.paused_minions:
-            self.paused_minions.remove(minion_id)
-            return {"status": "success", "message": f"Minion {minion_id} resumed"}
-        return {"status": "error", "message": "Minion not paused"}
+        """Resume a paused or draining worker"""
+        return self.workers.resume(minion_id)
+    
+    def get_workers(self):
+        """Per-worker state, load, throughput and memory, with fleet totals"""
+        return self.workers.snapshot()
     
     def get_minion_metrics(self):
         """Get system metrics for minions"""
         metrics = {
             "cpu_percent": psutil.cpu_percent(interval=0.1),
             "memory_percent": psutil.virtual_memory().percent,
-            "active_tasks": len([s for s in self.minion_status.values() if s == self.STATUS_BUSY]),
+            "active_tasks": self.pending_tasks.count(status=self.STATUS_BUSY),
             "total_completed": len(self.completed_tasks),
-            "error_rate": sum(1 for t in self.completed_tasks if t["status"] == self.STATUS_ERROR) / 
+            "error_rate": self.completed_tasks.count(status=self.STATUS_ERROR) / 
                          max(1, len(self.completed_tasks)) * 100,
             "pending_tasks": len(self.pending_tasks),
+            "coalesced_tasks": self.coalesced_count,
+            "coalesced_seconds_saved": round(self.coalesced_seconds_saved, 3),
         }
         return metrics
     
+    def get_autoscaler_status(self):
+        """Get the latest autoscaling decision reported by each worker"""
+        reports = self.workers.reports()
+        if not reports and self.workers.last_error:
+            return {"error": f"Failed to inspect workers: {self.workers.last_error}"}
+        return {
+            worker: report["autoscaler"]
+            for worker, report in reports.items()
+            if isinstance(report.get("autoscaler"), dict)
+        }
+    
     def cleanup_old_results(self):
-        """Clean up results older than retention period"""
+        """Clean up results older than retention period, returning the removed directories"""
         current_time = time.time()
+        removed = []
         for path in self.results_dir.glob("goblinforge_*"):
             if path.is_dir():
                 # Check if folder is older than retention period
@@ -231,78 +635,230 @@ class MinionManager:
                 age_days = (current_time - folder_time) / (60 * 60 * 24)
                 
                 if age_days > self.retention_days:
-                    # Delete folder and contents
+                    # Delete folder and contents (batch items and pipeline steps are nested)
                     try:
-                        for file in path.glob("*"):
-                            file.unlink()
-                        path.rmdir()
+                        shutil.rmtree(path)
+                        removed.append(path)
                     except Exception as e:
-                        print(f"Error cleaning up {path}: {e}")
+                        logger.error("Error cleaning up result directory", extra={"path": str(path), "error": str(e)})
+        # Results published outside the working copy expire there too
+        for path in self.results_manager.cleanup_stored_results():
+            if path not in removed:
+                removed.append(path)
+        # As does state gadgets built from results, e.g. scan baselines
+        self.results_manager.cleanup_stored_state()
+        # Blobs only linked from the removed results are no longer needed
+        self.results_manager.free_unreferenced_blobs()
+        return removed
     
-    def retry_task(self, task_id):
-        """Retry a failed task"""
-        if task_id in self.minion_details and self.minion_details[task_id]["status"] == self.STATUS_ERROR:
-            task_info = self.minion_details[task_id]
-            
-            # Create a new task with the same parameters
-            new_task_id = f"{task_info['gadget_name']}_{task_info['mode']}_{int(time.time())}"
-            self.minion_status[new_task_id] = self.STATUS_BUSY
-            
-            # Copy task info and update
-            new_task_info = task_info.copy()
-            new_task_info["task_id"] = new_task_id
-            new_task_info["submit_time"] = datetime.now().isoformat()
-            new_task_info["status"] = self.STATUS_BUSY
-            new_task_info["is_retry"] = True
-            new_task_info["original_task_id"] = task_id
-            
-            self.minion_details[new_task_id] = new_task_info
-            self.pending_tasks.append(new_task_info)
-            
-            # Queue the task
-            result = execute_gadget_task.delay(
-                gadget_module=task_info.get("gadget_module"),
-                gadget_class=task_info.get("gadget_class"),
-                mode=task_info.get("mode"),
-                params=task_info.get("params"),
-                result_dir=task_info.get("result_dir"),
-                task_id=new_task_id
-            )
-            
-            self.minion_details[new_task_id]["celery_task_id"] = result.id
-            
-            return {
-                "status": "success", 
-                "message": f"Task {task_id} requeued as {new_task_id}",
-                "new_task_id": new_task_id
-            }
+    def get_storage_stats(self):
+        """Blob store usage and the space saved by deduplicating artifacts"""
+        return self.results_manager.get_storage_stats()
+    
+    async def retry_task(self, task_id):
+        """
+        Retry a failed task in its original result directory.
+
+        Gadgets that checkpoint their progress continue from the last
+        checkpoint of the failed run instead of starting over.
+        """
+        task_info = self.minion_details.get(task_id)
+        if not task_info or task_info["status"] != self.STATUS_ERROR:
+            return {"status": "error", "message": "Task not found or not in error state"}
+        if not task_info.get("gadget_module") or not task_info.get("gadget_class"):
+            return {"status": "error", "message": "Task cannot be retried: its gadget is unknown"}
         
-        return {"status": "error", "message": "Task not found or not in error state"}
+        new_task_id = f"{task_info['gadget_name']}_{task_info['mode']}_{int(time.time())}_{uuid.uuid4().hex[:6]}"
+        self.minion_status[new_task_id] = self.STATUS_BUSY
+        
+        # Copy task info and update
+        new_task_info = {
+            key: value for key, value in task_info.items()
+            if key not in ("result", "error", "completion_time", "execution_time_seconds", "resource_usage",
+                           "queue_wait_seconds", "celery_task_id", "followers", "coalesced_with", "cancellation")
+        }
+        new_task_info.update({
+            "task_id": new_task_id,
+            "submit_time": datetime.now().isoformat(),
+            "status": self.STATUS_BUSY,
+            "is_retry": True,
+            "original_task_id": task_id,
+            "traceparent": tracing.current_traceparent(),
+        })
+        items = self.batch_items.get(task_id)
+        if items is not None:
+            self.batch_items[new_task_id] = items
+        
+        self.minion_details[new_task_id] = new_task_info
+        self.pending_tasks.add(new_task_info)
+        
+        try:
+            self._enqueue(new_task_info, items)
+        except Exception as e:
+            self.update_task_status(new_task_id, self.STATUS_ERROR, {"error": str(e)})
+            return {"status": "error", "message": f"Failed to retry task: {str(e)}"}
+        
+        return {
+            "status": "success", 
+            "message": f"Task {task_id} requeued as {new_task_id}",
+            "new_task_id": new_task_id
+        }
+
+def _run_coroutine(coro):
+    """Run a coroutine to completion from synchronous Minion code"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    # Called from inside an event loop (eager mode, in-process execution):
+    # run on a helper thread with its own loop, keeping the trace context
+    context = contextvars.copy_context()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(context.run, asyncio.run, coro).result()
+
+def _request_traceparent(request):
+    """Extract the trace context sent in the Celery message headers"""
+    traceparent = getattr(request, "traceparent", None)
+    if not traceparent and isinstance(getattr(request, "headers", None), dict):
+        traceparent = request.headers.get("traceparent")
+    return traceparent
 
 # Celery task for executing gadget
-@celery_app.task
-def execute_gadget_task(gadget_module, gadget_class, mode, params, result_dir, task_id=None):
-    """Celery task to execute a gadget in a separate process"""
+# Tracking the started state records the worker's hostname, which cancel_task needs
+@celery_app.task(bind=True, track_started=True)
+def execute_gadget_task(self, gadget_module, gadget_class, mode, params, result_dir, task_id=None, submitted_at=None,
+                        items=None, resource_cost=None, attempt=1):
+    """
+    Celery task to execute a gadget in a separate process.
+
+    Transient failures are retried up to GOBLIN_TASK_MAX_RETRIES times with
+    exponential backoff and jitter; each attempt resumes from the gadget's
+    checkpoint.
+    """
+    traceparent = _request_traceparent(self.request)
+    
+    # Run only while the node has room for the declared cost; otherwise hand the
+    # task back so lighter work can use the remaining capacity meanwhile
+    reservation = task_id or self.request.id
+    gated = bool(resource_cost) and CAPACITY_ADMISSION and not self.request.is_eager
+    if gated and not _capacity_ledger().try_acquire(reservation, resource_cost):
+        metrics.TASK_CAPACITY_DEFERRALS.labels(gadget=gadget_class, mode=mode).inc()
+        logger.debug("Task deferred for capacity", extra={"task_id": task_id, "cost": resource_cost})
+        raise self.retry(countdown=CAPACITY_RETRY_SECONDS, max_retries=None)
+    
     try:
+        if submitted_at:
+            tracing.record_span("broker.queue", submitted_at, time.time(), parent=traceparent, task_id=task_id)
+        
+        with tracing.start_span(
+            "worker.execute_gadget_task", parent=traceparent,
+            task_id=task_id, gadget_class=gadget_class, mode=mode
+        ) as span:
+            output = _run_gadget_task(
+                gadget_module, gadget_class, mode, params, result_dir, submitted_at, items, resource_cost,
+                task_id=task_id or self.request.id, attempt=attempt
+            )
+            if output.get("status") != "completed":
+                span.set_status("error", output.get("error"))
+            if output.get("retryable") and attempt <= MAX_RETRIES and not self.request.is_eager:
+                delay = retry_delay(attempt)
+                metrics.TASK_RETRIES.labels(gadget=gadget_class, mode=mode).inc()
+                logger.warning("Retrying task after transient failure", extra={
+                    "task_id": task_id, "attempt": attempt, "delay": round(delay, 1), "error": output.get("error")
+                })
+                raise self.retry(kwargs={**self.request.kwargs, "attempt": attempt + 1}, countdown=delay,
+                                 max_retries=None)
+            if self.request.retries > attempt - 1:
+                output["capacity_deferrals"] = self.request.retries - (attempt - 1)
+            return output
+    finally:
+        if gated:
+            _capacity_ledger().release(reservation)
+
+_ledger = None
+
+def _capacity_ledger():
+    """The node's capacity ledger, opened once per Minion process"""
+    global _ledger
+    if _ledger is None:
+        _ledger = CapacityLedger()
+    return _ledger
+
+_results_manager = None
+
+def _worker_results_manager():
+    """The results manager of this Minion process, created once"""
+    global _results_manager
+    if _results_manager is None:
+        _results_manager = ResultsManager()
+    return _results_manager
+
+def _checkpoint_key(gadget_class, mode, params, items):
+    """Identifies the work a checkpoint belongs to"""
+    payload = json.dumps([gadget_class, mode, params, items], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _run_gadget_task(gadget_module, gadget_class, mode, params, result_dir, submitted_at=None, items=None,
+                     resource_cost=None, task_id=None, attempt=1):
+    """Import, instantiate and execute a gadget inside a Minion (over all items for a batch)"""
+    # Time spent waiting in the broker before a Minion picked the task up
+    queue_wait = max(0.0, time.time() - submitted_at) if submitted_at else None
+    gadget_label = gadget_class
+    gadget = None
+    try:
+        # Files of earlier attempts may have been published from another node
+        with tracing.start_span("worker.restore_results"):
+            _worker_results_manager().restore_results(result_dir)
+
         # Ensure gadget_module has the full path
         if not gadget_module.startswith('goblin_forge.'):
             gadget_module = f'goblin_forge.{gadget_module}'
             
         # Dynamically import the gadget module and class
-        module = __import__(gadget_module, fromlist=[gadget_class])
-        GadgetClass = getattr(module, gadget_class)
-        gadget = GadgetClass()
+        with tracing.start_span("worker.load_gadget", module=gadget_module):
+            module = __import__(gadget_module, fromlist=[gadget_class])
+            GadgetClass = getattr(module, gadget_class)
+            gadget = GadgetClass()
+        gadget_label = getattr(gadget, 'tab_id', gadget_class)
+        gadget.active_mode = mode  # Selects the mode's subprocess limits
+        gadget.active_task_id = task_id  # Registers its subprocesses for cancellation
+        gadget.checkpoint = Checkpoint(result_dir, key=_checkpoint_key(gadget_class, mode, params, items))
         
         # Start time for performance tracking
         start_time = time.time()
         
-        # Create event loop for async execution
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Execute the gadget, accounting for the resources it consumes
+        with ResourceMonitor() as monitor, tracing.start_span("gadget.execute", mode=mode):
+            if items is not None:
+                gadget_result = _run_coroutine(gadget.execute_batch(mode, items, result_dir, params))
+            else:
+                gadget_result = _run_coroutine(gadget.execute(mode, params, result_dir))
+        resource_usage = monitor.stop()
+        resource_usage["subprocesses"] = getattr(gadget, "subprocess_usage", [])
+        
+        # A subprocess stopped by a limit fails the task with that limit as its outcome
+        limit_hits = [usage["limit_exceeded"] for usage in resource_usage["subprocesses"] if usage.get("limit_exceeded")]
+        outcome = limit_hits[0] if limit_hits else gadget_result.get("status", "unknown")
+        failed = bool(limit_hits) or gadget_result.get("status") == "error"
+        # Progress is only worth keeping for a retry of work that did not complete
+        storage = None
+        if failed:
+            gadget.checkpoint.flush()
+        else:
+            gadget.checkpoint.clear()
+            # Completed artifacts are final: share identical ones through the blob store.
+            # Failed results stay writable, as a retry resumes in their directory
+            with tracing.start_span("worker.store_artifacts"):
+                storage = _worker_results_manager().store_artifacts(result_dir)
+            metrics.RESULT_BYTES_DEDUPLICATED.labels(gadget=gadget_label, mode=mode).inc(storage["bytes_saved"])
         
-        # Execute the gadget
-        gadget_result = loop.run_until_complete(
-            gadget.execute(mode, params, result_dir)
+        if queue_wait is not None:
+            metrics.TASK_QUEUE_WAIT.labels(gadget=gadget_label, mode=mode).observe(queue_wait)
+        metrics.TASK_EXECUTION_TIME.labels(gadget=gadget_label, mode=mode).observe(resource_usage["run_time_seconds"])
+        metrics.TASK_OUTCOMES.labels(gadget=gadget_label, mode=mode, outcome=outcome).inc()
+        metrics.RESULT_BYTES_WRITTEN.labels(gadget=gadget_label, mode=mode).inc(
+            metrics.directory_size(result_dir)
         )
         
         # End time for performance tracking
@@ -317,38 +873,128 @@ def execute_gadget_task(gadget_module, gadget_class, mode, params, result_dir, t
         if result_file and not result_preview and os.path.exists(result_file):
             try:
                 with open(result_file, 'r') as f:
-                    content = f.read(1000)  # Read first 1000 chars
-                    result_preview = content + ('...' if len(content) >= 1000 else '')
+                    result_preview = f.read(RESULT_PREVIEW_CHARS + 1)
             except Exception as e:
-                print(f"Error creating result preview: {e}")
+                logger.warning("Error creating result preview", extra={"result_file": result_file, "error": str(e)})
         
-        # Add more metadata to the result
-        output = {
-            "status": "completed",
+        # The full result stays on disk; only the envelope goes through the backend
+        manifest = _write_result_manifest(result_dir, {
+            "status": "error" if failed else "completed",
+            "outcome": outcome,
+            "error": f"Subprocess stopped by {limit_hits[0]}" if limit_hits else gadget_result.get("error"),
             "gadget_name": getattr(gadget, 'name', 'Unknown'),
             "gadget_module": gadget_module,
             "gadget_class": gadget_class,
             "mode": mode,
             "params": params,
             "result": gadget_result,  # Include original gadget result
-            "result_file": result_file,  # Also include direct references to important fields
-            "result_preview": result_preview,
+            "result_file": result_file,
             "result_dir": result_dir,
             "execution_time": execution_time,
             "execution_timestamp": datetime.now().isoformat(),
-        }
+            "queue_wait_seconds": queue_wait,
+            "resource_usage": resource_usage,
+            "resource_cost": resource_cost,
+            "attempt": attempt,
+            "resumed": gadget.checkpoint.resumed,
+            "retryable": failed and bool(gadget_result.get("retryable")),
+            "storage": storage,
+        })
+        manifest = _publish_results(result_dir, manifest)
+        envelope = _result_envelope(manifest)
+        envelope["result_preview"] = _truncate_preview(result_preview)
         
-        print(f"Task executed successfully. Result: {output}")
-        return output
+        logger.info("Task executed", extra={
+            "event": "task.result", "gadget": gadget_label, "mode": mode, "status": manifest["status"],
+            "execution_time": execution_time, "result_dir": str(result_dir),
+        })
+        return envelope
     except Exception as e:
         error_msg = f"Error executing task: {str(e)}"
-        print(error_msg)
-        return {
+        logger.exception("Task failed", extra={"gadget": gadget_label, "mode": mode, "result_dir": str(result_dir)})
+        metrics.TASK_OUTCOMES.labels(gadget=gadget_label, mode=mode, outcome="exception").inc()
+        if gadget is not None:
+            try:
+                gadget.checkpoint.flush()
+            except OSError as checkpoint_error:
+                logger.warning("Error saving checkpoint", extra={"result_dir": str(result_dir), "error": str(checkpoint_error)})
+        manifest = _write_result_manifest(result_dir, {
             "status": "error",
+            "outcome": "exception",
             "error": error_msg,
+            "retryable": isinstance(e, TRANSIENT_ERRORS),
+            "attempt": attempt,
             "result_dir": result_dir,
             "gadget_name": "Unknown",
             "gadget_module": gadget_module,
             "gadget_class": gadget_class,
-            "mode": mode
-        }
\ No newline at end of file
+            "mode": mode,
+            "params": params,
+            "execution_timestamp": datetime.now().isoformat(),
+            "queue_wait_seconds": queue_wait,
+        })
+        return _result_envelope(_publish_results(result_dir, manifest))
+
+def _truncate_preview(preview):
+    """Cap a result preview so large outputs stay out of the result backend"""
+    if not isinstance(preview, str):
+        return preview
+    if len(preview) > RESULT_PREVIEW_CHARS:
+        return preview[:RESULT_PREVIEW_CHARS] + '...'
+    return preview
+
+def _write_result_manifest(result_dir, manifest):
+    """Write the full task result to the result directory, after syncing the artifacts it describes"""
+    try:
+        manifest_path = Path(result_dir) / RESULT_MANIFEST
+        if artifacts.RESULT_FSYNC:
+            artifacts.sync_tree(result_dir)
+        tmp_path = manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+            if artifacts.RESULT_FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, manifest_path)
+        if artifacts.RESULT_FSYNC:
+            artifacts._fsync_dir(result_dir)
+        manifest["result_manifest"] = str(manifest_path)
+    except Exception as e:
+        logger.error("Error writing result manifest", extra={"result_dir": str(result_dir), "error": str(e)})
+    return manifest
+
+def _publish_results(result_dir, manifest):
+    """Publish the result directory to the storage backend; results that cannot be kept fail the task"""
+    try:
+        with tracing.start_span("worker.publish_results"):
+            published = _worker_results_manager().publish_results(result_dir)
+        if published["files"]:
+            logger.info("Results published", extra={"result_dir": str(result_dir), **published})
+    except Exception as e:
+        logger.exception("Error publishing results", extra={"result_dir": str(result_dir)})
+        manifest.update({
+            "status": "error",
+            "outcome": "storage_error",
+            "error": f"Error publishing results: {e}",
+            "retryable": True,
+        })
+        _write_result_manifest(result_dir, manifest)
+    return manifest
+
+def _result_envelope(manifest):
+    """Reduce a full task result to what the coordinator needs"""
+    envelope = {
+        key: manifest.get(key) for key in (
+            "status", "outcome", "error", "gadget_name", "mode", "result_dir", "result_file",
+            "result_manifest", "execution_time", "execution_timestamp", "queue_wait_seconds",
+            "attempt", "resumed", "retryable",
+        ) if manifest.get(key) is not None
+    }
+    usage = manifest.get("resource_usage")
+    if usage:
+        # Per-subprocess accounting is only kept in the manifest
+        envelope["resource_usage"] = {
+            **{key: value for key, value in usage.items() if key != "subprocesses"},
+            "subprocess_count": len(usage.get("subprocesses", [])),
+        }
+    return envelope
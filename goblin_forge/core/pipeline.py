@@ -0,0 +1,338 @@
+"""
+Multi-step gadget pipelines.
+
+A pipeline is a DAG of steps, each one gadget mode. All steps write into
+one shared pipeline directory (``<pipeline_dir>/<step_id>``), and a step
+consumes the artifacts of earlier steps by reference instead of copying
+them. Parameters may contain placeholders such as::
+
+    ${steps.analyze.result_file}
+    ${steps.analyze.result_dir}/analysis_results.json
+    ${pipeline.result_dir}
+
+A placeholder makes the step depend on the referenced step, in addition to
+any listed in ``depends_on``. Each step is submitted as an ordinary Minion
+task as soon as all of its own dependencies have completed, so independent
+branches run in parallel and no step waits for unrelated work.
+
+The pipeline record, including each step's status and result, is kept in
+``pipeline.json`` in the pipeline directory and rewritten when the pipeline
+finishes. Only the most recent ``GOBLIN_MAX_PIPELINES`` (default 100)
+pipelines stay in memory; older finished ones are read back from their
+``pipeline.json``.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import uuid
+from datetime import datetime
+
+from goblin_forge.core import tracing
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_PATTERN = re.compile(r"\$\{(steps\.([A-Za-z0-9_\-]+)|pipeline)\.([A-Za-z0-9_]+)\}")
+PIPELINE_FILE = "pipeline.json"
+STEP_ID_PATTERN = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+# Step states
+WAITING = "waiting"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "error"
+SKIPPED = "skipped"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, SKIPPED, CANCELLED)
+
+MAX_PIPELINES = int(os.environ.get("GOBLIN_MAX_PIPELINES", 100))
+
+
+class PipelineError(ValueError):
+    """Raised for pipeline definitions that cannot be run"""
+
+
+def _references(value):
+    """Step ids referenced by placeholders anywhere in a parameter value"""
+    if isinstance(value, str):
+        return {match.group(2) for match in REFERENCE_PATTERN.finditer(value) if match.group(2)}
+    if isinstance(value, dict):
+        return set().union(*(_references(v) for v in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(_references(v) for v in value)) if value else set()
+    return set()
+
+
+class PipelineManager:
+    """Validates pipelines and submits their steps to the MinionManager as dependencies complete"""
+
+    def __init__(self, minion_manager, plugin_loader):
+        self.minion_manager = minion_manager
+        self.plugin_loader = plugin_loader
+        self.pipelines = {}
+        self._step_by_task = {}  # task_id -> (pipeline_id, step_id)
+        minion_manager.completion_listeners.append(self._on_task_finished)
+
+    def validate(self, steps):
+        """
+        Check a pipeline definition and return its steps in dependency order.
+
+        Raises PipelineError for unknown gadgets or modes, references to
+        unknown steps and dependency cycles.
+        """
+        if not steps:
+            raise PipelineError("A pipeline needs at least one step")
+
+        by_id = {}
+        for step in steps:
+            step_id = step.get("id")
+            if not step_id or not STEP_ID_PATTERN.match(step_id):
+                raise PipelineError(f"Invalid step id: {step_id!r}")
+            if step_id in by_id:
+                raise PipelineError(f"Duplicate step id: {step_id}")
+            spec = self.plugin_loader.get_spec(step.get("gadget_id"))
+            if spec is None:
+                raise PipelineError(f"Step {step_id}: gadget {step.get('gadget_id')} not found")
+            if step.get("mode") not in {mode["id"] for mode in spec.modes}:
+                raise PipelineError(f"Step {step_id}: gadget {spec.tab_id} has no mode {step.get('mode')}")
+            by_id[step_id] = step
+
+        dependencies = {}
+        for step_id, step in by_id.items():
+            needed = set(step.get("depends_on") or []) | _references(step.get("parameters") or {})
+            unknown = needed - set(by_id)
+            if unknown:
+                raise PipelineError(f"Step {step_id} depends on unknown steps: {sorted(unknown)}")
+            dependencies[step_id] = needed
+
+        # Kahn's algorithm: a leftover step means a cycle
+        order = []
+        remaining = {step_id: set(needed) for step_id, needed in dependencies.items()}
+        ready = [step_id for step_id, needed in remaining.items() if not needed]
+        while ready:
+            step_id = ready.pop(0)
+            order.append(step_id)
+            for other, needed in remaining.items():
+                if step_id in needed:
+                    needed.discard(step_id)
+                    if not needed and other not in order and other not in ready:
+                        ready.append(other)
+        if len(order) != len(by_id):
+            raise PipelineError(f"Dependency cycle between steps: {sorted(set(by_id) - set(order))}")
+
+        return [dict(by_id[step_id], depends_on=sorted(dependencies[step_id])) for step_id in order]
+
+    async def submit_pipeline(self, name, steps):
+        """Create the shared pipeline directory and start every step without dependencies"""
+        ordered = self.validate(steps)
+        safe_name = re.sub(r"[^A-Za-z0-9_\-]+", "_", name or "pipeline").strip("_").lower() or "pipeline"
+        pipeline_id = f"pipeline_{safe_name}_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:6]}"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        result_dir = self.minion_manager.results_dir / f"goblinforge_{timestamp}_{pipeline_id}"
+        result_dir.mkdir(exist_ok=True, parents=True)
+
+        pipeline = {
+            "pipeline_id": pipeline_id,
+            "name": name,
+            "status": RUNNING,
+            "result_dir": str(result_dir),
+            "submit_time": datetime.now().isoformat(),
+            "traceparent": tracing.current_traceparent(),
+            "steps": {
+                step["id"]: {
+                    "id": step["id"],
+                    "gadget_id": step["gadget_id"],
+                    "mode": step["mode"],
+                    "parameters": step.get("parameters") or {},
+                    "depends_on": step["depends_on"],
+                    "result_dir": str(result_dir / step["id"]),
+                    "status": WAITING,
+                    "task_id": None,
+                }
+                for step in ordered
+            },
+        }
+        self.pipelines[pipeline_id] = pipeline
+        # Marks the directory as a pipeline's, so gadgets can use sibling artifacts in place.
+        # Steps may run on other nodes, so it is published with the directory
+        await asyncio.to_thread(self._save, pipeline)
+        logger.info("Pipeline submitted", extra={"pipeline_id": pipeline_id, "steps": len(ordered)})
+
+        await self._start_ready_steps(pipeline)
+        return pipeline
+
+    async def _start_ready_steps(self, pipeline):
+        """Submit each waiting step whose dependencies have all completed"""
+        for step in pipeline["steps"].values():
+            if step["status"] != WAITING:
+                continue
+            states = [pipeline["steps"][dep]["status"] for dep in step["depends_on"]]
+            if any(state in (FAILED, SKIPPED, CANCELLED) for state in states):
+                step["status"] = SKIPPED
+            elif all(state == COMPLETED for state in states):
+                await self._start_step(pipeline, step)
+        await self._update_pipeline_status(pipeline)
+
+    async def _start_step(self, pipeline, step):
+        step["status"] = RUNNING
+        try:
+            params = self._resolve(step["parameters"], pipeline)
+            gadget = self.plugin_loader.instantiate_gadget(step["gadget_id"])
+            with tracing.start_span(
+                "pipeline.step", parent=pipeline.get("traceparent"),
+                pipeline_id=pipeline["pipeline_id"], step=step["id"]
+            ):
+                task_info = await self.minion_manager.submit_task(
+                    gadget, step["mode"], params, result_dir=step["result_dir"]
+                )
+        except Exception as e:
+            logger.error("Pipeline step failed to start", extra={
+                "pipeline_id": pipeline["pipeline_id"], "step": step["id"], "error": str(e)
+            })
+            step["status"] = FAILED
+            step["error"] = str(e)
+            return
+
+        step["task_id"] = task_info["task_id"]
+        step["resolved_parameters"] = params
+        if task_info["status"] == self.minion_manager.STATUS_ERROR:
+            step["status"] = FAILED
+            step["error"] = task_info.get("error")
+        else:
+            self._step_by_task[task_info["task_id"]] = (pipeline["pipeline_id"], step["id"])
+
+    def _resolve(self, value, pipeline):
+        """Replace ${...} placeholders with the outputs of completed steps"""
+        if isinstance(value, dict):
+            return {key: self._resolve(item, pipeline) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(item, pipeline) for item in value]
+        if not isinstance(value, str):
+            return value
+
+        def lookup(match):
+            _, step_id, field = match.groups()
+            if step_id is None:
+                source = pipeline
+            else:
+                step = pipeline["steps"][step_id]
+                source = {"result_dir": step["result_dir"], "task_id": step["task_id"], **step.get("result", {})}
+            if source.get(field) is None:
+                where = f"step {step_id}" if step_id else "the pipeline"
+                raise PipelineError(f"{where} has no output {field!r}")
+            return str(source[field])
+
+        return REFERENCE_PATTERN.sub(lookup, value)
+
+    def _on_task_finished(self, task_id, status, result):
+        """MinionManager completion listener: record the step outcome and start its dependents"""
+        owner = self._step_by_task.pop(task_id, None)
+        if owner is None:
+            return
+        pipeline = self.pipelines.get(owner[0])
+        if pipeline is None:
+            return
+        step = pipeline["steps"][owner[1]]
+        if step["status"] != RUNNING:
+            return
+        step["result"] = result or {}
+        if status == self.minion_manager.STATUS_IDLE:
+            step["status"] = COMPLETED
+        elif step["result"].get("cancelled"):
+            # Stopped by cancel_pipeline or by cancelling the step's task
+            step["status"] = CANCELLED
+        else:
+            step["status"] = FAILED
+            step["error"] = step["result"].get("error")
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            loop.create_task(self._start_ready_steps(pipeline))
+        else:
+            asyncio.run(self._start_ready_steps(pipeline))
+
+    async def _update_pipeline_status(self, pipeline):
+        states = [step["status"] for step in pipeline["steps"].values()]
+        if "completion_time" in pipeline or not all(state in FINISHED_STATES for state in states):
+            return
+        if pipeline["status"] != CANCELLED:
+            pipeline["status"] = COMPLETED if all(state == COMPLETED for state in states) else FAILED
+        pipeline["completion_time"] = datetime.now().isoformat()
+        logger.info("Pipeline finished", extra={
+            "pipeline_id": pipeline["pipeline_id"], "status": pipeline["status"]
+        })
+        try:
+            await asyncio.to_thread(self._save, pipeline)
+        except Exception as e:
+            logger.error("Failed to save pipeline record", extra={
+                "pipeline_id": pipeline["pipeline_id"], "error": str(e)
+            })
+        self._trim()
+
+    def _save(self, pipeline):
+        """Write the pipeline record into its directory and publish it"""
+        result_dir = pipeline["result_dir"]
+        with open(os.path.join(result_dir, PIPELINE_FILE), "w") as f:
+            json.dump(pipeline, f, indent=2, default=str)
+        self.minion_manager.results_manager.publish_results(result_dir)
+
+    def _trim(self):
+        """Drop the oldest finished pipelines from memory; pipeline.json keeps their record"""
+        finished = [pid for pid, p in self.pipelines.items() if "completion_time" in p]
+        excess = len(self.pipelines) - MAX_PIPELINES
+        for pipeline_id in finished[:max(excess, 0)]:
+            self.pipelines.pop(pipeline_id)
+
+    async def cancel_pipeline(self, pipeline_id):
+        """Cancel the running steps of a pipeline and skip the ones not started yet"""
+        pipeline = self.pipelines.get(pipeline_id)
+        if pipeline is None:
+            return {"status": "error", "message": "Pipeline not found"}
+        if pipeline["status"] != RUNNING:
+            return {"status": "error", "message": f"Pipeline already {pipeline['status']}"}
+
+        pipeline["status"] = CANCELLED
+        for step in pipeline["steps"].values():
+            if step["status"] == WAITING:
+                step["status"] = CANCELLED
+            elif step["status"] == RUNNING and step["task_id"]:
+                await self.minion_manager.cancel_task(step["task_id"])
+        await self._update_pipeline_status(pipeline)
+        return {"status": "success", "message": f"Pipeline {pipeline_id} cancelled"}
+
+    async def get_pipeline(self, pipeline_id):
+        """A pipeline from memory, or from its pipeline.json once it has been trimmed"""
+        pipeline = self.pipelines.get(pipeline_id)
+        if pipeline is None:
+            pipeline = await asyncio.to_thread(self._load, pipeline_id)
+        return pipeline
+
+    def _load(self, pipeline_id):
+        storage = self.minion_manager.results_manager.storage
+        for name in storage.list_prefixes():
+            if not name.endswith(f"_{pipeline_id}"):
+                continue
+            try:
+                return storage.read_json(f"{name}/{PIPELINE_FILE}")
+            except (OSError, ValueError):
+                return None
+        return None
+
+    def list_pipelines(self, limit=50):
+        """Most recent pipelines first, without per-step results"""
+        recent = list(self.pipelines.values())[-limit:]
+        return [
+            {
+                "pipeline_id": p["pipeline_id"],
+                "name": p["name"],
+                "status": p["status"],
+                "submit_time": p["submit_time"],
+                "result_dir": p["result_dir"],
+                "steps": {step_id: step["status"] for step_id, step in p["steps"].items()},
+            }
+            for p in reversed(recent)
+        ]
@@ -1,73 +1,334 @@
 import os
+import ast
+import json
+import hashlib
 import importlib
 import importlib.util
 import inspect
+import logging
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, List, Type
+from typing import Dict, List, Optional, Type
 
 # Import base gadget class
 from goblin_forge.plugins.base_gadget import BaseGadget
+from goblin_forge.core.metrics import PLUGIN_LOAD_TIME, observe_time
+from goblin_forge.core.capacity import resolve_cost
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 2
+
+# Class attributes read from the source without importing the plugin
+STATIC_ATTRIBUTES = (
+    "name", "description", "tab_id", "binary_name", "binary_path",
+    "resource_profile", "resource_cost", "mode_costs", "modes", "form_schemas",
+)
+
+
+class GadgetSpec:
+    """Manifest entry describing a gadget; the module is only imported by load()"""
+
+    def __init__(self, entry: dict, loader: "PluginLoader"):
+        self.tab_id = entry["tab_id"]
+        self.name = entry["name"]
+        self.description = entry.get("description", "")
+        self.module = entry["module"]
+        self.class_name = entry["class_name"]
+        self.file = entry["file"]
+        self.binary_name = entry.get("binary_name")
+        self.resource_profile = entry.get("resource_profile", "cpu")
+        self.modes = entry.get("modes", [])
+        self.entry = entry
+        self._loader = loader
+
+    def load(self) -> Type[BaseGadget]:
+        """Import the gadget module (once) and return the gadget class"""
+        module = self._loader._import_module(Path(self.file), self.module)
+        return getattr(module, self.class_name)
+
+    def describe_modes(self) -> List[dict]:
+        """Modes with their form schemas, asking the gadget once for schemas its source does not declare"""
+        if any("form_schema" not in mode for mode in self.modes):
+            self._loader._fill_form_schemas(self)
+        return self.modes
+
 
 class PluginLoader:
     """Loads and manages Goblin Gadget plugins"""
-    
-    def __init__(self, plugin_dir: str = "goblin_forge/plugins"):
+
+    def __init__(self, plugin_dir: str = "goblin_forge/plugins", manifest_path: Optional[str] = None):
         self.plugin_dir = Path(plugin_dir)
-        self.gadgets: Dict[str, Type[BaseGadget]] = {}
-        
-    def discover_gadgets(self) -> List[Type[BaseGadget]]:
+        # Cached plugin metadata, invalidated per file by content hash
+        self.manifest_path = Path(manifest_path or os.environ.get(
+            "GOBLIN_PLUGIN_MANIFEST", "./results/.plugin_manifest.json"
+        ))
+        self.gadgets: Dict[str, GadgetSpec] = {}
+        self._manifest = None
+        self._modules = {}
+        self._classes: Dict[str, Type[BaseGadget]] = {}
+        # Scans and form schema filling run in API threads
+        self._lock = threading.RLock()
+
+    def discover_gadgets(self) -> List[GadgetSpec]:
         """Discover all Goblin Gadget plugins in the plugin directory"""
-        print(f"Scanning for gadgets in {self.plugin_dir}")
-        # Skip if we're looking at the base module itself
-        self._scan_directory(self.plugin_dir)
-        print(f"Found {len(self.gadgets)} gadgets: {list(self.gadgets.keys())}")
-        return list(self.gadgets.values())
-    
-    def _scan_directory(self, directory: Path) -> None:
-        """Recursively scan directory for Python modules containing gadgets"""
+        logger.debug("Scanning for gadgets", extra={"plugin_dir": str(self.plugin_dir)})
+        with self._lock:
+            manifest = self._load_manifest()
+            seen = set()
+            changed = False
+            for file_path in self._scan_directory(self.plugin_dir):
+                key = str(file_path.resolve())
+                seen.add(key)
+                changed |= self._refresh_manifest_entry(manifest, key, file_path)
+
+            # Forget plugins whose files were removed
+            for key in set(manifest["files"]) - seen:
+                self._evict(manifest["files"].pop(key)["module"])
+                changed = True
+            if changed:
+                self._save_manifest(manifest)
+
+            gadgets = {}
+            for key in sorted(seen):
+                for entry in manifest["files"][key]["gadgets"]:
+                    gadgets[entry["tab_id"]] = GadgetSpec(entry, self)
+            self.gadgets = gadgets
+        logger.debug("Found gadgets", extra={"gadgets": list(gadgets.keys())})
+        return list(gadgets.values())
+
+    def _evict(self, module_name: str) -> None:
+        """Forget an imported plugin module and its gadget classes, so the next use imports the new code"""
+        self._modules.pop(module_name, None)
+        for gadget_id in [g for g, cls in self._classes.items() if cls.__module__ == module_name]:
+            del self._classes[gadget_id]
+
+    def _scan_directory(self, directory: Path) -> List[Path]:
+        """Recursively scan directory for Python modules that may contain gadgets"""
+        files = []
         for item in directory.iterdir():
             # Skip __pycache__ and similar directories
-            if item.name.startswith('__'):
+            if item.name.startswith('__') or item.name.startswith('.'):
                 continue
-                
+
             if item.is_dir():
                 # Check if this is a Python package (has __init__.py)
                 if (item / "__init__.py").exists():
-                    self._scan_directory(item)
+                    files.extend(self._scan_directory(item))
             elif item.suffix == '.py' and item.name != "base_gadget.py":
-                self._load_gadget_from_file(item)
-    
-    def _load_gadget_from_file(self, file_path: Path) -> None:
-        """Load gadgets from a Python file"""
-        # Create module name from file path
+                files.append(item)
+        return files
+
+    def _module_name(self, file_path: Path) -> str:
         relative_path = file_path.relative_to(self.plugin_dir.parent)
-        module_name = '.'.join(relative_path.with_suffix('').parts)
-        
+        return '.'.join(relative_path.with_suffix('').parts)
+
+    def _load_manifest(self) -> dict:
+        if self._manifest is None:
+            self._manifest = {"version": MANIFEST_VERSION, "files": {}}
+            if self.manifest_path.exists():
+                try:
+                    with open(self.manifest_path, 'r') as f:
+                        cached = json.load(f)
+                    if cached.get("version") == MANIFEST_VERSION:
+                        self._manifest = cached
+                except (OSError, ValueError) as e:
+                    logger.warning("Ignoring unreadable plugin manifest", extra={
+                        "path": str(self.manifest_path), "error": str(e)
+                    })
+        return self._manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
         try:
-            # Import the module
-            spec = importlib.util.spec_from_file_location(module_name, file_path)
-            if spec is None or spec.loader is None:
-                print(f"Failed to load spec for {file_path}")
-                return
-                
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            
-            # Find all gadget classes in the module
-            for name, obj in inspect.getmembers(module):
-                if (inspect.isclass(obj) and 
-                    issubclass(obj, BaseGadget) and 
-                    obj is not BaseGadget):
-                    gadget_id = obj.tab_id
-                    self.gadgets[gadget_id] = obj
-                    print(f"Loaded gadget: {obj.name} ({gadget_id})")
+            self.manifest_path.parent.mkdir(exist_ok=True, parents=True)
+            # API and Minion processes may write at once; each renames its own temp file into place
+            with tempfile.NamedTemporaryFile(
+                'w', dir=self.manifest_path.parent, prefix=f".{self.manifest_path.name}.",
+                suffix=".tmp", delete=False
+            ) as f:
+                json.dump(manifest, f)
+            try:
+                os.replace(f.name, self.manifest_path)
+            except OSError:
+                os.unlink(f.name)
+                raise
+        except OSError as e:
+            logger.warning("Could not write plugin manifest", extra={"path": str(self.manifest_path), "error": str(e)})
+
+    def _refresh_manifest_entry(self, manifest: dict, key: str, file_path: Path) -> bool:
+        """Rebuild the manifest entry for a file if its content changed; returns True if it did"""
+        stat = file_path.stat()
+        cached = manifest["files"].get(key)
+        # Plugins that failed are retried: the cause may be outside the file, e.g. a missing package
+        if cached and cached["error"]:
+            cached = None
+        if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return False
+
+        source = file_path.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()
+        if cached and cached["sha256"] == digest:
+            # Touched but unchanged
+            cached["mtime_ns"], cached["size"] = stat.st_mtime_ns, stat.st_size
+            return True
+
+        module_name = self._module_name(file_path)
+        # The file changed (or failed before): drop the module imported from its old content
+        self._evict(module_name)
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "module": module_name,
+            "gadgets": [],
+            "error": None,
+        }
+        try:
+            gadgets = self._static_manifest(source, file_path, module_name)
+            if gadgets is None:
+                gadgets = self._introspect_manifest(file_path, module_name)
+            entry["gadgets"] = gadgets
+            for gadget in gadgets:
+                logger.info("Loaded gadget", extra={"gadget": gadget["tab_id"], "gadget_name": gadget["name"]})
         except Exception as e:
-            print(f"Error loading gadget from {file_path}: {e}")
-    
-    def get_gadget(self, gadget_id: str) -> Type[BaseGadget]:
-        """Get a specific gadget by ID"""
+            entry["error"] = str(e)
+            logger.error("Error loading gadget", extra={"file": str(file_path), "error": str(e)})
+        manifest["files"][key] = entry
+        return True
+
+    def _static_manifest(self, source: bytes, file_path: Path, module_name: str) -> Optional[List[dict]]:
+        """
+        Build manifest entries from the source alone.
+
+        Returns None when the gadgets cannot be described without importing
+        the module, e.g. because their modes are computed. Form schemas
+        computed by get_form_schema() are left out and filled in by
+        GadgetSpec.describe_modes() when first needed.
+        """
+        tree = ast.parse(source, filename=str(file_path))
+        classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+        gadgets = []
+        for node in classes:
+            base_names = {
+                base.id if isinstance(base, ast.Name) else getattr(base, "attr", None)
+                for base in node.bases
+            }
+            if base_names != {"BaseGadget"}:
+                return None
+
+            attributes = {}
+            for statement in node.body:
+                if (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                        and isinstance(statement.targets[0], ast.Name)
+                        and statement.targets[0].id in STATIC_ATTRIBUTES):
+                    try:
+                        attributes[statement.targets[0].id] = ast.literal_eval(statement.value)
+                    except (ValueError, TypeError, SyntaxError):
+                        return None
+
+            overrides = {
+                statement.name for statement in node.body
+                if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef))
+            }
+            if "get_modes" in overrides or "tab_id" not in attributes or "modes" not in attributes:
+                return None
+
+            modes = [dict(mode) for mode in attributes["modes"]]
+            if "get_form_schema" not in overrides:
+                form_schemas = attributes.get("form_schemas", {})
+                for mode in modes:
+                    mode["form_schema"] = form_schemas.get(mode["id"], {})
+            gadgets.append(self._manifest_entry(
+                attributes, node.name, module_name, file_path, source="static", modes=modes
+            ))
+        return gadgets
+
+    def _introspect_manifest(self, file_path: Path, module_name: str) -> List[dict]:
+        """Build manifest entries by importing the module and asking each gadget"""
+        module = self._import_module(file_path, module_name)
+        gadgets = []
+        for name, obj in inspect.getmembers(module):
+            if (inspect.isclass(obj) and
+                issubclass(obj, BaseGadget) and
+                obj is not BaseGadget and
+                obj.__module__ == module.__name__):
+                # Skip __init__ so a missing binary does not hide the gadget from the catalog
+                gadget = obj.__new__(obj)
+                modes = [
+                    {**mode, "form_schema": gadget.get_form_schema(mode["id"])}
+                    for mode in gadget.get_modes()
+                ]
+                attributes = {attr: getattr(obj, attr, None) for attr in STATIC_ATTRIBUTES}
+                gadgets.append(self._manifest_entry(
+                    attributes, name, module_name, file_path, source="import", modes=modes
+                ))
+        return gadgets
+
+    def _manifest_entry(self, attributes, class_name, module_name, file_path, source, modes) -> dict:
+        return {
+            "tab_id": attributes["tab_id"],
+            "name": attributes.get("name") or class_name,
+            "description": attributes.get("description") or "",
+            "class_name": class_name,
+            "module": module_name,
+            "file": str(file_path.resolve()),
+            "binary_name": attributes.get("binary_name"),
+            "binary_path": attributes.get("binary_path"),
+            "resource_profile": attributes.get("resource_profile") or "cpu",
+            # Declared per-task cost of each mode, for capacity-aware scheduling
+            "modes": [
+                {**mode, "resource_cost": resolve_cost(
+                    attributes.get("resource_profile") or "cpu", attributes.get("binary_name"),
+                    attributes.get("resource_cost"), attributes.get("mode_costs"), mode["id"]
+                )}
+                for mode in modes
+            ],
+            "source": source,
+        }
+
+    def _fill_form_schemas(self, spec: GadgetSpec) -> None:
+        """
+        Ask a gadget for its computed form schemas and keep them in the
+        manifest. Imports the module and writes the manifest: callers on the
+        event loop run this in a thread.
+        """
+        with self._lock:
+            gadget_class = spec.load()
+            # Skip __init__ so a missing binary does not hide the gadget from the catalog
+            gadget = gadget_class.__new__(gadget_class)
+            for mode in spec.modes:
+                mode.setdefault("form_schema", gadget.get_form_schema(mode["id"]))
+            self._save_manifest(self._load_manifest())
+
+    def _import_module(self, file_path: Path, module_name: str):
+        """Import a plugin module from its file, at most once per loader"""
+        if module_name in self._modules:
+            return self._modules[module_name]
+
+        spec = importlib.util.spec_from_file_location(module_name, file_path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Failed to load spec for {file_path}")
+
+        module = importlib.util.module_from_spec(spec)
+        with observe_time(PLUGIN_LOAD_TIME, module=module_name):
+            spec.loader.exec_module(module)
+        self._modules[module_name] = module
+        return module
+
+    def get_spec(self, gadget_id: str) -> Optional[GadgetSpec]:
+        """Get the manifest entry of a gadget by ID"""
         return self.gadgets.get(gadget_id)
-    
+
+    def get_gadget(self, gadget_id: str) -> Type[BaseGadget]:
+        """Get a specific gadget class by ID, importing its module on first use"""
+        if gadget_id not in self._classes:
+            spec = self.gadgets.get(gadget_id)
+            if spec is None:
+                return None
+            self._classes[gadget_id] = spec.load()
+        return self._classes[gadget_id]
+
     def instantiate_gadget(self, gadget_id: str) -> BaseGadget:
         """Instantiate a gadget by ID"""
         gadget_class = self.get_gadget(gadget_id)
@@ -0,0 +1,227 @@
+"""
+Process trees of gadget subprocesses.
+
+Every process started by BaseGadget.run_subprocess leads its own session,
+so it and everything it spawns share one process group that can be
+signalled as a whole. While it runs, the group is recorded under the task
+that started it, in a small file per process below
+``GOBLIN_PROCESS_DIR/<hostname>/`` (default ``./results/.processes``). Any
+process on the node can then find and stop a task's processes, including
+the worker's main process answering a cancel request and Minions sweeping
+up after a sibling that was killed.
+
+Stopping a tree sends SIGTERM to the group, waits ``GOBLIN_KILL_GRACE_SECONDS``
+(default 5), sends SIGKILL to whatever is left, and reports which processes
+exited, which had to be killed, any that survived, and the memory, open
+files and sockets they held.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from pathlib import Path
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+KILL_GRACE_SECONDS = float(os.environ.get("GOBLIN_KILL_GRACE_SECONDS", 5))
+KILL_CONFIRM_SECONDS = 2.0
+
+
+def _registry_dir():
+    directory = Path(os.environ.get("GOBLIN_PROCESS_DIR", "./results/.processes")) / socket.gethostname()
+    directory.mkdir(exist_ok=True, parents=True)
+    return directory
+
+
+def _entry_path(task_id, pid):
+    safe_task = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(task_id))
+    return _registry_dir() / f"{safe_task}.{pid}.json"
+
+
+def register(task_id, pid, command):
+    """Record a process group started for a task"""
+    try:
+        created = psutil.Process(pid).create_time()
+    except psutil.Error:
+        return  # Already gone
+    entry = {"task_id": task_id, "pgid": pid, "created": created, "owner": os.getpid(), "command": command}
+    path = _entry_path(task_id, pid)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(entry))
+    os.replace(tmp_path, path)
+
+
+def unregister(task_id, pid):
+    try:
+        _entry_path(task_id, pid).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _entries():
+    for path in _registry_dir().glob("*.json"):
+        try:
+            yield path, json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # Being written or removed
+
+
+def _members(pgid, created):
+    """Live processes of a group, skipping any that only reuse its ids"""
+    members = {}
+    try:
+        leader = psutil.Process(pgid)
+        if abs(leader.create_time() - created) < 0.01:
+            members[leader.pid] = leader
+            members.update((child.pid, child) for child in leader.children(recursive=True))
+    except psutil.Error:
+        pass
+    # Descendants orphaned by an exited leader keep the group but leave the parent chain
+    for process in psutil.process_iter():
+        try:
+            if process.pid not in members and os.getpgid(process.pid) == pgid \
+                    and process.create_time() >= created - 0.01:
+                members[process.pid] = process
+        except (psutil.Error, OSError):
+            continue
+    # Zombies have exited already and hold nothing but their process table entry
+    return [process for process in members.values() if not _exited(process)]
+
+
+def _held_resources(processes):
+    held = {"memory_mb": 0.0, "open_files": 0, "sockets": 0, "threads": 0, "cpu_seconds": 0.0}
+    for process in processes:
+        try:
+            with process.oneshot():
+                held["memory_mb"] += process.memory_info().rss / 2**20
+                held["threads"] += process.num_threads()
+                cpu = process.cpu_times()
+                held["cpu_seconds"] += cpu.user + cpu.system
+                held["open_files"] += process.num_fds() if hasattr(process, "num_fds") else len(process.open_files())
+                held["sockets"] += len(process.net_connections() if hasattr(process, "net_connections")
+                                       else process.connections())
+        except psutil.Error:
+            continue
+    held["memory_mb"] = round(held["memory_mb"], 1)
+    held["cpu_seconds"] = round(held["cpu_seconds"], 3)
+    return held
+
+
+def _signal_group(pgid, processes, signum):
+    try:
+        os.killpg(pgid, signum)
+    except (ProcessLookupError, PermissionError):
+        pass
+    # Members that started a session of their own no longer share the group
+    for process in processes:
+        try:
+            process.send_signal(signum)
+        except psutil.Error:
+            pass
+
+
+def _exited(process):
+    try:
+        return not process.is_running() or process.status() == psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return True
+
+
+def _wait_exited(processes, timeout):
+    """
+    Wait for processes to exit and return (exited, alive). Polls instead of
+    reaping, so the parent keeps the exit status of its own children.
+    """
+    deadline = time.monotonic() + timeout
+    alive = list(processes)
+    while True:
+        alive = [process for process in alive if not _exited(process)]
+        if not alive or time.monotonic() >= deadline:
+            break
+        time.sleep(0.05)
+    return [process for process in processes if process not in alive], alive
+
+
+def terminate_tree(pgid, created=None, grace=None):
+    """
+    Stop every process of a group: SIGTERM, then SIGKILL after the grace
+    period. Returns a report of what was stopped and what it held.
+    """
+    grace = KILL_GRACE_SECONDS if grace is None else grace
+    if created is None:
+        try:
+            created = psutil.Process(pgid).create_time()
+        except psutil.Error:
+            created = 0.0
+    processes = _members(pgid, created)
+    report = {
+        "pgid": pgid,
+        "processes": len(processes),
+        "terminated": 0,
+        "killed": 0,
+        "survivors": [],
+        "reclaimed": _held_resources(processes),
+    }
+    if not processes:
+        return report
+
+    start_time = time.monotonic()
+    _signal_group(pgid, processes, signal.SIGTERM)
+    exited, alive = _wait_exited(processes, grace)
+    report["terminated"] = len(exited)
+    if alive:
+        _signal_group(pgid, alive, signal.SIGKILL)
+        exited, alive = _wait_exited(alive, KILL_CONFIRM_SECONDS)
+        report["killed"] = len(exited)
+    report["survivors"] = [process.pid for process in alive]
+    report["seconds"] = round(time.monotonic() - start_time, 3)
+    if report["survivors"]:
+        logger.error("Processes survived SIGKILL", extra={"pgid": pgid, "pids": report["survivors"]})
+    else:
+        logger.info("Process tree stopped", extra={
+            "pgid": pgid, "terminated": report["terminated"], "killed": report["killed"],
+            "reclaimed": report["reclaimed"],
+        })
+    return report
+
+
+def merge_reports(reports):
+    """Combine termination reports of several groups (or of several nodes)"""
+    total = {"groups": 0, "processes": 0, "terminated": 0, "killed": 0, "survivors": [], "reclaimed": {}}
+    for report in reports:
+        total["groups"] += report.get("groups", 1)
+        for field in ("processes", "terminated", "killed"):
+            total[field] += report.get(field, 0)
+        total["survivors"].extend(report.get("survivors", []))
+        for resource, value in report.get("reclaimed", {}).items():
+            total["reclaimed"][resource] = round(total["reclaimed"].get(resource, 0) + value, 3)
+    return total
+
+
+def terminate_task_processes(task_id, grace=None):
+    """Stop every process tree registered for a task on this node"""
+    reports = []
+    for path, entry in _entries():
+        if entry.get("task_id") != task_id:
+            continue
+        reports.append(terminate_tree(entry["pgid"], entry.get("created"), grace))
+        path.unlink(missing_ok=True)
+    return merge_reports(reports)
+
+
+def reap_orphaned_trees(grace=None):
+    """Stop process trees whose Minion process died without cleaning them up"""
+    reports = []
+    for path, entry in _entries():
+        if psutil.pid_exists(entry.get("owner", 0)):
+            continue
+        logger.warning("Stopping orphaned gadget processes", extra={
+            "task_id": entry.get("task_id"), "pgid": entry["pgid"], "command": entry.get("command")
+        })
+        reports.append(terminate_tree(entry["pgid"], entry.get("created"), grace))
+        path.unlink(missing_ok=True)
+    return merge_reports(reports)
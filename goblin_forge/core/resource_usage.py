@@ -0,0 +1,113 @@
+"""
+Resource accounting for Goblin Forge tasks.
+
+Measures CPU time (including child processes), peak resident memory and
+storage I/O consumed while a gadget executes.
+"""
+import threading
+import time
+
+import psutil
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def _io_counters(process):
+    """Return (read_bytes, write_bytes) for a process, or None if unsupported"""
+    try:
+        counters = process.io_counters()
+        return counters.read_bytes, counters.write_bytes
+    except (AttributeError, psutil.Error, NotImplementedError):
+        return None
+
+
+class ResourceMonitor:
+    """Measures resources used by the current process and its children while active"""
+
+    def __init__(self, sample_interval=0.2):
+        self.sample_interval = sample_interval
+        self.peak_rss_bytes = 0
+        self._process = psutil.Process()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._child_io = {}  # pid -> last seen (read_bytes, write_bytes)
+        self._usage = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """Take the starting snapshot and begin sampling memory"""
+        self._start_time = time.monotonic()
+        self._self_start = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+        self._children_start = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+        self._io_start = _io_counters(self._process)
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="goblin-resource-monitor", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.sample_interval):
+            self._sample()
+
+    def _sample(self):
+        """Record current RSS of the process tree and the I/O of live children"""
+        try:
+            rss = self._process.memory_info().rss
+            for child in self._process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                    counters = _io_counters(child)
+                    if counters:
+                        self._child_io[child.pid] = counters
+                except psutil.Error:
+                    continue
+        except psutil.Error:
+            return
+        self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+
+    def stop(self):
+        """Stop sampling and compute the usage summary"""
+        if self._usage is not None:
+            return self._usage
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+
+        usage = {
+            "run_time_seconds": time.monotonic() - self._start_time,
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+        if resource:
+            self_end = resource.getrusage(resource.RUSAGE_SELF)
+            children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+            usage.update({
+                "cpu_user_seconds": self_end.ru_utime - self._self_start.ru_utime,
+                "cpu_system_seconds": self_end.ru_stime - self._self_start.ru_stime,
+                "children_cpu_user_seconds": children_end.ru_utime - self._children_start.ru_utime,
+                "children_cpu_system_seconds": children_end.ru_stime - self._children_start.ru_stime,
+            })
+
+        io_end = _io_counters(self._process)
+        if io_end and self._io_start:
+            read_bytes = io_end[0] - self._io_start[0]
+            write_bytes = io_end[1] - self._io_start[1]
+            # Children that already exited are only known from their last sample
+            for child_read, child_write in self._child_io.values():
+                read_bytes += child_read
+                write_bytes += child_write
+            usage["read_bytes"] = read_bytes
+            usage["write_bytes"] = write_bytes
+
+        self._usage = usage
+        return usage
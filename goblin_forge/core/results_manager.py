@@ -2,6 +2,10 @@
 Results manager for Goblin Forge.
 
 Handles the creation, organization, and cleanup of result directories.
+Artifact bodies are deduplicated through a content-addressed blob store
+(see core/blob_store.py), freed once no retained result references them.
+Result directories are published to and restored from the configured
+storage backend (see core/storage.py).
 """
 import os
 import shutil
@@ -10,6 +14,9 @@ from datetime import datetime, timedelta
 import json
 import logging
 
+from goblin_forge.core.blob_store import BlobStore
+from goblin_forge.core.storage import KEEP_LOCAL, STATE_PREFIX, get_storage
+
 logger = logging.getLogger(__name__)
 
 class ResultsManager:
@@ -28,6 +35,8 @@ class ResultsManager:
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(exist_ok=True, parents=True)
         self.retention_days = retention_days
+        self.blob_store = BlobStore(os.environ.get("GOBLIN_BLOB_DIR") or self.base_dir / ".blobs")
+        self.storage = get_storage(self.base_dir)
         
     def create_result_directory(self, gadget_name, mode):
         """
@@ -100,16 +109,150 @@ class ResultsManager:
                 dir_time = datetime.fromtimestamp(item.stat().st_mtime)
                 if dir_time < cutoff_date:
                     # Log before removal
-                    logger.info(f"Removing old result directory: {item}")
+                    logger.info("Removing old result directory", extra={"result_dir": str(item)})
                     
                     # Delete recursively
                     shutil.rmtree(item)
                     count += 1
             except Exception as e:
-                logger.error(f"Error while trying to remove directory {item}: {e}")
-                
+                logger.error("Error removing result directory", extra={"result_dir": str(item), "error": str(e)})
+        
+        count += len(self.cleanup_stored_results())
+        self.cleanup_stored_state()
+        self.free_unreferenced_blobs()
         return count
     
+    def cleanup_stored_results(self):
+        """
+        Remove result directories older than the retention period from a
+        storage backend kept outside the working copy.
+        
+        Their age comes from the timestamp in their name, as object stores
+        have no directory times.
+        
+        Returns:
+            list: Working copy paths of the removed directories
+        """
+        if self.storage.in_place:
+            return []
+        cutoff_date = datetime.now() - timedelta(days=self.retention_days)
+        removed = []
+        for name in self.storage.list_prefixes():
+            if not name.startswith("goblinforge_"):
+                continue
+            try:
+                created = datetime.strptime(name[len("goblinforge_"):][:15], "%Y%m%d_%H%M%S")
+            except ValueError:
+                continue
+            if created < cutoff_date:
+                try:
+                    self.storage.delete_prefix(name)
+                    removed.append(self.base_dir / name)
+                except Exception as e:
+                    logger.error("Error removing stored results", extra={"result_dir": name, "error": str(e)})
+        if removed:
+            logger.info("Removed stored results", extra={"results": len(removed)})
+        return removed
+    
+    def cleanup_stored_state(self):
+        """
+        Remove state gadgets keep across tasks, such as scan baselines, that
+        was not updated within the retention period.
+        
+        Returns:
+            int: Number of files removed
+        """
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).timestamp()
+        removed = 0
+        for info in list(self.storage.list(STATE_PREFIX)):
+            if info.mtime >= cutoff:
+                continue
+            try:
+                self.storage.delete(info.key)
+                removed += 1
+            except Exception as e:
+                logger.error("Error removing gadget state", extra={"key": info.key, "error": str(e)})
+        if removed:
+            logger.info("Removed expired gadget state", extra={"files": removed})
+        return removed
+    
+    def publish_results(self, result_dir):
+        """
+        Publish a result directory to the storage backend.
+        
+        With GOBLIN_STORAGE_KEEP_LOCAL=0 the working copy is removed once it
+        is stored elsewhere.
+        
+        Args:
+            result_dir (str or Path): Path to the result directory
+            
+        Returns:
+            dict: Files and bytes stored
+        """
+        try:
+            report = self.storage.publish(result_dir)
+        except ValueError:
+            # Only directories below base_dir have a place in the backend
+            logger.warning("Result directory outside the results tree, not published", extra={
+                "result_dir": str(result_dir), "results_dir": str(self.base_dir)
+            })
+            return {"files": 0, "bytes": 0, "removed": 0}
+        if not self.storage.in_place and not KEEP_LOCAL:
+            shutil.rmtree(result_dir, ignore_errors=True)
+        return report
+    
+    def restore_results(self, result_dir):
+        """
+        Bring a result directory's stored files into the working copy.
+        
+        A task retried or continued on another node finds the files (and
+        checkpoint) of earlier attempts in place.
+        
+        Args:
+            result_dir (str or Path): Path to the result directory
+            
+        Returns:
+            int: Number of files downloaded
+        """
+        Path(result_dir).mkdir(exist_ok=True, parents=True)
+        return self.storage.restore(result_dir)
+    
+    def store_artifacts(self, result_dir):
+        """
+        Deduplicate the files of a completed result directory.
+        
+        Each file is stored once per content digest in the blob store and
+        replaced by a hardlink to its blob.
+        
+        Args:
+            result_dir (str or Path): Path to the result directory
+            
+        Returns:
+            dict: Files stored, how many were already present and the bytes saved
+        """
+        if not self.storage.in_place:
+            # The stored copy is what is kept, the working copy is scratch
+            return {"files": 0, "deduplicated": 0, "stored_bytes": 0, "bytes_saved": 0}
+        return self.blob_store.ingest(result_dir)
+    
+    def free_unreferenced_blobs(self):
+        """
+        Free blobs that no remaining result directory links to.
+        
+        Returns:
+            dict: Number of blobs and bytes freed
+        """
+        return self.blob_store.collect_garbage()
+    
+    def get_storage_stats(self):
+        """
+        Report blob store usage, the space saved by deduplication and the storage backend.
+        
+        Returns:
+            dict: Blob and reference counts, stored and referenced bytes, bytes saved, dedup ratio and backend
+        """
+        return {**self.blob_store.stats(), "backend": self.storage.describe()}
+    
     def get_result_info(self, result_dir):
         """
         Get information about a result directory.
@@ -196,6 +339,6 @@ class ResultsManager:
                         "age_days": (datetime.now() - created).days
                     })
             except Exception as e:
-                logger.error(f"Error processing result directory {path}: {e}")
+                logger.error("Error processing result directory", extra={"result_dir": str(path), "error": str(e)})
                 
         return results
\ No newline at end of file
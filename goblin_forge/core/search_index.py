@@ -0,0 +1,342 @@
+"""
+Full-text search over result artifacts.
+
+Every line of the text files in a finished task's result directory goes
+into a SQLite FTS5 table with the trigram tokenizer, so any substring of
+three or more characters (a host, a banner, a hash prefix) is found without
+reading the results tree. Indexing is incremental: the index registers as a
+MinionManager completion listener and indexes each result directory when
+its task finishes, re-reading only files whose size or mtime changed (a
+retry in the same directory). Result directories removed by cleanup, or
+moved out of the results tree, are dropped from the index. All writes go
+through one background thread, so searches never wait for indexing. Files
+are listed and read through the storage backend (see core/storage.py), so
+results published by Minions on other nodes are indexed too.
+
+Configuration:
+    GOBLIN_SEARCH_INDEX            Path of the index database (default <results>/.search_index.sqlite)
+    GOBLIN_SEARCH_MAX_FILE_BYTES   Bytes indexed per file, the rest is skipped (default 8388608)
+"""
+import concurrent.futures
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path, PurePosixPath
+
+logger = logging.getLogger(__name__)
+
+MAX_FILE_BYTES = int(os.environ.get("GOBLIN_SEARCH_MAX_FILE_BYTES", 8 * 2**20))
+MAX_LINE_CHARS = 2000  # Longer lines are indexed up to here
+SNIPPET_CHARS = 240
+MIN_QUERY_CHARS = 3  # Shortest substring the trigram tokenizer can look up
+SKIPPED_FILES = {"checkpoint.json"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    result_dir TEXT UNIQUE NOT NULL,
+    task_id TEXT,
+    gadget_id TEXT,
+    mode TEXT,
+    status TEXT,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    result_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    first_row INTEGER,
+    last_row INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_result ON files(result_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(
+    text, file_id UNINDEXED, line UNINDEXED, offset UNINDEXED, tokenize='trigram'
+);
+"""
+
+
+class SearchIndex:
+    """Incremental full-text index of result directories"""
+
+    def __init__(self, minion_manager, path=None):
+        self.minion_manager = minion_manager
+        self.results_dir = Path(minion_manager.results_dir)
+        self.storage = minion_manager.results_manager.storage
+        self.path = Path(path or os.environ.get("GOBLIN_SEARCH_INDEX")
+                         or self.results_dir / ".search_index.sqlite")
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        # One writer thread owns the write connection and orders all updates
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="goblin-search-index")
+        self._write_conn = None
+        # Updates queued or running; counted by request threads and the writer
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        minion_manager.completion_listeners.append(self._on_task_finished)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _submit(self, func, *args):
+        with self._pending_lock:
+            self._pending += 1
+        return self._writer.submit(self._run_write, func, *args)
+
+    def _run_write(self, func, *args):
+        try:
+            if self._write_conn is None:
+                self._write_conn = self._connect()
+            return func(self._write_conn, *args)
+        except Exception as e:
+            logger.error("Search index update failed", extra={"operation": func.__name__, "error": str(e)})
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def _on_task_finished(self, task_id, status, result):
+        """MinionManager completion listener: index the task's result directory"""
+        task_info = self.minion_manager.minion_details.get(task_id, {})
+        result_dir = (result or {}).get("result_dir") or task_info.get("result_dir")
+        if not result_dir:
+            return
+        self.schedule_index(result_dir, task_id=task_id, gadget_id=task_info.get("gadget_id"),
+                            mode=task_info.get("mode"), status=(result or {}).get("status"))
+
+    def schedule_index(self, result_dir, task_id=None, gadget_id=None, mode=None, status=None):
+        """Index a result directory in the background"""
+        return self._submit(self._index_result, str(Path(result_dir)), task_id, gadget_id, mode, status)
+
+    def schedule_remove(self, result_dirs):
+        """Drop result directories (and everything below them) from the index in the background"""
+        return self._submit(self._remove_results, [str(Path(d)) for d in result_dirs])
+
+    def schedule_sync(self):
+        """Catch up with the results tree: index new result directories, drop vanished ones"""
+        return self._submit(self._sync)
+
+    def _index_result(self, conn, result_dir, task_id=None, gadget_id=None, mode=None, status=None):
+        start_time = time.perf_counter()
+        try:
+            key = self.storage.key_for(result_dir)
+            files = [info for info in self.storage.list(key) if _searchable(info.key)]
+        except (ValueError, FileNotFoundError):
+            files = []
+        if not files:
+            self._remove_results(conn, [result_dir])
+            return
+        if mode is None:
+            mode, status = self._describe_result(key, status)
+
+        with conn:
+            conn.execute(
+                "INSERT INTO results (result_dir, task_id, gadget_id, mode, status, indexed_at) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(result_dir) DO UPDATE SET task_id=coalesce(excluded.task_id, task_id),"
+                " gadget_id=coalesce(excluded.gadget_id, gadget_id), mode=coalesce(excluded.mode, mode),"
+                " status=coalesce(excluded.status, status), indexed_at=excluded.indexed_at",
+                (result_dir, task_id, gadget_id, mode, status, time.time()),
+            )
+            result_id = conn.execute("SELECT id FROM results WHERE result_dir = ?", (result_dir,)).fetchone()[0]
+            known = {
+                path: (file_id, size, mtime, first_row, last_row)
+                for file_id, path, size, mtime, first_row, last_row in conn.execute(
+                    "SELECT id, path, size, mtime, first_row, last_row FROM files WHERE result_id = ?", (result_id,)
+                )
+            }
+            indexed = lines = 0
+            for info in files:
+                # Paths as the rest of the API names them, below the given result directory
+                path = str(Path(result_dir) / PurePosixPath(info.key).relative_to(key))
+                previous = known.pop(path, None)
+                if previous and previous[1] == info.size and previous[2] == info.mtime:
+                    continue
+                if previous:
+                    file_id, _, _, first_row, last_row = previous
+                    _delete_file(conn, file_id, first_row, last_row)
+                lines += self._index_file(conn, result_id, path, info)
+                indexed += 1
+            # Files that disappeared since the last indexing
+            for file_id, _, _, first_row, last_row in known.values():
+                _delete_file(conn, file_id, first_row, last_row)
+
+        logger.debug("Indexed result", extra={
+            "result_dir": result_dir, "files": indexed, "lines": lines,
+            "seconds": round(time.perf_counter() - start_time, 3),
+        })
+
+    def _index_file(self, conn, result_id, path, info):
+        """Add a file's lines under consecutive rowids, so they can be deleted as a range"""
+        rows = []
+        try:
+            with self.storage.open_read(info.key) as f:
+                if b"\0" in f.peek(8192)[:8192]:
+                    return 0  # Binary
+                offset = 0
+                for number, raw in enumerate(f, 1):
+                    if offset >= MAX_FILE_BYTES:
+                        break
+                    text = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                    if text.strip():
+                        rows.append((text[:MAX_LINE_CHARS], number, offset))
+                    offset += len(raw)
+        except OSError as e:
+            logger.warning("Could not index file", extra={"path": path, "error": str(e)})
+            return 0
+        if not rows:
+            return 0
+
+        last = conn.execute("SELECT rowid FROM lines ORDER BY rowid DESC LIMIT 1").fetchone()
+        first_row = (last[0] if last else 0) + 1
+        file_id = conn.execute(
+            "INSERT INTO files (result_id, path, size, mtime, first_row, last_row) VALUES (?, ?, ?, ?, ?, ?)",
+            (result_id, path, info.size, info.mtime, first_row, first_row + len(rows) - 1),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO lines (rowid, text, file_id, line, offset) VALUES (?, ?, ?, ?, ?)",
+            ((first_row + i, text, file_id, number, offset) for i, (text, number, offset) in enumerate(rows)),
+        )
+        return len(rows)
+
+    def _remove_results(self, conn, result_dirs):
+        removed = 0
+        with conn:
+            for result_dir in result_dirs:
+                for result_id, in conn.execute(
+                    "SELECT id FROM results WHERE result_dir = ? OR result_dir LIKE ? ESCAPE '\\'",
+                    (result_dir, _like_prefix(result_dir)),
+                ).fetchall():
+                    for file_id, first_row, last_row in conn.execute(
+                        "SELECT id, first_row, last_row FROM files WHERE result_id = ?", (result_id,)
+                    ).fetchall():
+                        _delete_file(conn, file_id, first_row, last_row)
+                    conn.execute("DELETE FROM results WHERE id = ?", (result_id,))
+                    removed += 1
+        if removed:
+            logger.info("Removed results from search index", extra={"results": removed})
+        return removed
+
+    def _sync(self, conn):
+        indexed = [row[0] for row in conn.execute("SELECT result_dir FROM results")]
+        present = {name for name in self.storage.list_prefixes() if name.startswith("goblinforge_")}
+
+        # Results are grouped by their top-level directory (pipeline steps live below the pipeline's)
+        covered = set()
+        vanished = []
+        for result_dir in indexed:
+            try:
+                top = Path(result_dir).relative_to(self.results_dir).parts[0]
+            except (ValueError, IndexError):
+                if not Path(result_dir).is_dir():
+                    vanished.append(result_dir)
+                continue
+            covered.add(top)
+            if top not in present:
+                vanished.append(result_dir)
+        if vanished:
+            self._remove_results(conn, vanished)
+
+        added = 0
+        for name in sorted(present - covered):
+            self._index_result(conn, str(self.results_dir / name))
+            added += 1
+        logger.info("Search index synced", extra={"added": added, "removed": len(vanished)})
+
+    def _describe_result(self, key, status):
+        """Mode and status from a result's manifest, for directories found by sync"""
+        try:
+            manifest = self.storage.read_json(f"{key}/task_result.json")
+        except (OSError, ValueError):
+            return None, status
+        return manifest.get("mode"), status or manifest.get("status")
+
+    def search(self, query, limit=50, cursor=None, gadget_id=None, mode=None, result_dir=None):
+        """
+        Return one page of lines containing ``query`` (case-insensitive),
+        newest indexed first, and the cursor of the next page.
+        """
+        query = query.strip()
+        if len(query) < MIN_QUERY_CHARS:
+            raise ValueError(f"Search for at least {MIN_QUERY_CHARS} characters")
+        sql = [
+            "SELECT lines.rowid, lines.text, lines.line, lines.offset, files.path,"
+            " results.result_dir, results.task_id, results.gadget_id, results.mode, results.status"
+            " FROM lines JOIN files ON files.id = lines.file_id JOIN results ON results.id = files.result_id"
+            " WHERE lines MATCH ?"
+        ]
+        args = ['"' + query.replace('"', '""') + '"']  # A phrase, so the query is matched literally
+        if cursor:
+            sql.append("AND lines.rowid < ?")
+            args.append(int(cursor))
+        for column, value in (("gadget_id", gadget_id), ("mode", mode)):
+            if value is not None:
+                sql.append(f"AND results.{column} = ?")
+                args.append(value)
+        if result_dir is not None:
+            sql.append("AND (results.result_dir = ? OR results.result_dir LIKE ? ESCAPE '\\')")
+            args.extend([str(Path(result_dir)), _like_prefix(str(Path(result_dir)))])
+        sql.append("ORDER BY lines.rowid DESC LIMIT ?")
+        args.append(limit + 1)
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            rows = conn.execute(" ".join(sql), args).fetchall()
+        finally:
+            conn.close()
+
+        matches = []
+        for rowid, text, line, offset, path, found_dir, task_id, found_gadget, found_mode, status in rows[:limit]:
+            column = text.lower().find(query.lower())
+            matches.append({
+                "result_dir": found_dir,
+                "task_id": task_id,
+                "gadget_id": found_gadget,
+                "mode": found_mode,
+                "status": status,
+                "file": path,
+                "line": line,
+                "column": column + 1 if column >= 0 else None,
+                "offset": offset,
+                "text": _snippet(text, column, len(query)),
+            })
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        return matches, next_cursor
+
+    def stats(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            results, = conn.execute("SELECT count(*) FROM results").fetchone()
+            files, = conn.execute("SELECT count(*) FROM files").fetchone()
+        finally:
+            conn.close()
+        size = sum(os.path.getsize(p) for p in (self.path, Path(f"{self.path}-wal")) if os.path.exists(p))
+        return {"results": results, "files": files, "index_bytes": size, "pending_updates": self._pending}
+
+
+def _searchable(key):
+    """Files worth searching (storage listings already leave out hidden and partial files)"""
+    return PurePosixPath(key).name not in SKIPPED_FILES
+
+
+def _delete_file(conn, file_id, first_row, last_row):
+    conn.execute("DELETE FROM lines WHERE rowid BETWEEN ? AND ?", (first_row, last_row))
+    conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+
+def _like_prefix(directory):
+    escaped = directory.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "/%"
+
+
+def _snippet(text, column, length):
+    """The matched line, cut down to a window around the match"""
+    if len(text) <= SNIPPET_CHARS or column < 0:
+        return text[:SNIPPET_CHARS]
+    start = max(0, min(column - (SNIPPET_CHARS - length) // 2, len(text) - SNIPPET_CHARS))
+    return ("..." if start else "") + text[start:start + SNIPPET_CHARS] + ("..." if start + SNIPPET_CHARS < len(text) else "")
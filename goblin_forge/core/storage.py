@@ -0,0 +1,522 @@
+"""
+Result storage backends.
+
+Minions run gadgets in a local working copy of the results tree (``./results``)
+and publish each result directory to the configured backend once the task
+ends; the API, the search index and later tasks read results through it.
+Artifacts are addressed by keys relative to the results tree, so
+``results/goblinforge_<...>/scan_results.txt`` is stored under
+``goblinforge_<...>/scan_results.txt``.
+
+The local backend keeps results on a filesystem. By default that is the
+working copy itself and publishing costs nothing, as with a single node or
+workers sharing one results volume. The s3 backend keeps them in an S3
+bucket or any S3-compatible object store (MinIO, Ceph RGW, ...), so workers
+on separate nodes need no shared volume: files are uploaded in streamed
+multipart parts and read back as streams, never held in memory whole. A task
+retried on another node restores its directory (and checkpoint) from the
+store first, and gadgets fetch inputs written elsewhere on first use.
+
+Configuration:
+    GOBLIN_STORAGE_BACKEND      local (default) or s3
+    GOBLIN_STORAGE_ROOT         Directory of the local backend (default ./results, the working copy)
+    GOBLIN_STORAGE_KEEP_LOCAL   Set to 0 to remove working copies once published elsewhere (default 1)
+    GOBLIN_STATE_PREFIX         Key prefix of state gadgets keep across tasks (default gadget_state)
+    GOBLIN_S3_BUCKET            Bucket of the s3 backend
+    GOBLIN_S3_PREFIX            Key prefix inside the bucket (default results)
+    GOBLIN_S3_ENDPOINT_URL      Endpoint of an S3-compatible store, e.g. http://minio:9000
+    GOBLIN_S3_REGION            Region of the bucket
+    GOBLIN_S3_PART_BYTES        Multipart part size in bytes, at least 5 MiB (default 8388608)
+
+The s3 backend needs boto3; credentials come from the usual AWS variables
+or configuration files.
+"""
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple
+
+from goblin_forge.core.artifacts import FSYNC, RESULT_FSYNC, _fsync_dir, _partial_path, _publish
+
+logger = logging.getLogger(__name__)
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+RESULTS_DIR = Path("./results")
+BACKEND = os.environ.get("GOBLIN_STORAGE_BACKEND", "local")
+KEEP_LOCAL = os.environ.get("GOBLIN_STORAGE_KEEP_LOCAL", "1") != "0"
+# State gadgets keep across tasks (scan baselines), expired with the results it came from
+STATE_PREFIX = os.environ.get("GOBLIN_STATE_PREFIX", "gadget_state")
+MIN_PART_BYTES = 5 * 2**20  # Smallest part S3 accepts, except for the last one
+PART_BYTES = max(MIN_PART_BYTES, int(os.environ.get("GOBLIN_S3_PART_BYTES", 8 * 2**20)))
+CHUNK_BYTES = 2**20
+DELETE_BATCH = 1000  # Keys per DeleteObjects request
+
+
+class ObjectInfo(NamedTuple):
+    key: str
+    size: int
+    mtime: float
+
+
+def _is_hidden(key):
+    # Partial writes, the blob store and indexes are not results
+    return any(part.startswith(".") for part in PurePosixPath(key).parts)
+
+
+class StorageBackend:
+    """
+    Where result artifacts are kept, addressed by keys relative to the
+    results tree. Backends implement open_read, open_write, stat, list,
+    list_prefixes and delete_prefix; moving whole result directories
+    between the working copy and the backend is shared.
+    """
+
+    name = None
+    in_place = False  # The backend's files are the working copy's own
+
+    def __init__(self, results_dir=RESULTS_DIR):
+        self.results_dir = Path(results_dir)
+
+    def key_for(self, path):
+        """The key of a path in the results tree; ValueError for anything else"""
+        try:
+            relative = Path(os.path.abspath(path)).relative_to(os.path.abspath(self.results_dir))
+        except ValueError:
+            raise ValueError(f"{path} is not in the results directory") from None
+        key = relative.as_posix()
+        if key == "." or _is_hidden(key):
+            raise ValueError(f"{path} is not a result artifact")
+        return key
+
+    def local_path(self, key):
+        """Where a key lives in the working copy"""
+        return self.results_dir / key
+
+    def open_read(self, key):
+        """A binary stream of an artifact; FileNotFoundError when there is none"""
+        raise NotImplementedError
+
+    def open_write(self, key):
+        """A binary stream storing an artifact, committed when closed as a context manager"""
+        raise NotImplementedError
+
+    def stat(self, key):
+        """ObjectInfo of an artifact, or None"""
+        raise NotImplementedError
+
+    def list(self, prefix):
+        """ObjectInfo of every artifact below a key prefix"""
+        raise NotImplementedError
+
+    def list_prefixes(self):
+        """Names of the top-level result directories"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove an artifact, if it exists"""
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        """Remove every artifact below a key prefix"""
+        raise NotImplementedError
+
+    def describe(self):
+        return {"backend": self.name}
+
+    def exists(self, key):
+        return self.stat(key) is not None
+
+    def read_json(self, key):
+        with self.open_read(key) as f:
+            return json.load(f)
+
+    def put_file(self, key, path):
+        """Store a local file as an artifact, streamed in chunks"""
+        with open(path, "rb") as source, self.open_write(key) as target:
+            shutil.copyfileobj(source, target, CHUNK_BYTES)
+
+    def get_file(self, key, path):
+        """Download an artifact to a local file, published atomically"""
+        path = Path(path)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        partial = _partial_path(path)
+        try:
+            with self.open_read(key) as source, open(partial, "wb") as target:
+                shutil.copyfileobj(source, target, CHUNK_BYTES)
+                if FSYNC:
+                    target.flush()
+                    os.fsync(target.fileno())
+            _publish(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return path
+
+    def publish_file(self, path):
+        """Store one file of the working copy"""
+        if not self.in_place:
+            self.put_file(self.key_for(path), path)
+
+    def publish(self, result_dir):
+        """
+        Store every file of a local result directory and drop stored files it
+        no longer has (a cleared checkpoint), returning the files and bytes
+        stored. ValueError for a directory outside the results tree.
+        """
+        report = {"files": 0, "bytes": 0, "removed": 0}
+        if self.in_place:
+            return report
+        prefix = self.key_for(result_dir)
+        published = set()
+        for dirpath, dirnames, filenames in os.walk(result_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                path = Path(dirpath) / name
+                key = self.key_for(path)
+                self.put_file(key, path)
+                published.add(key)
+                report["files"] += 1
+                report["bytes"] += path.stat().st_size
+        for info in list(self.list(prefix)):
+            if info.key not in published:
+                self.delete(info.key)
+                report["removed"] += 1
+        return report
+
+    def restore(self, result_dir):
+        """Download the stored files of a result directory missing from the working copy"""
+        restored = 0
+        if self.in_place:
+            return restored
+        try:
+            prefix = self.key_for(result_dir)
+        except ValueError:
+            return restored  # Nothing outside the results tree is stored
+        for info in self.list(prefix):
+            path = self.local_path(info.key)
+            if not path.exists():
+                self.get_file(info.key, path)
+                restored += 1
+        return restored
+
+    def fetch(self, path):
+        """Make a stored artifact available at its local path; False when it is nowhere"""
+        path = Path(path)
+        if path.exists():
+            return True
+        if self.in_place:
+            return False
+        try:
+            key = self.key_for(path)
+        except ValueError:
+            return False
+        try:
+            self.get_file(key, path)
+        except FileNotFoundError:
+            return False
+        return True
+
+
+class _Upload(io.RawIOBase):
+    """A writable stream stored by commit(); closed without committing, what it got is discarded"""
+
+    _finished = False
+
+    def writable(self):
+        return True
+
+    def commit(self):
+        raise NotImplementedError
+
+    def abort(self):
+        raise NotImplementedError
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and not self._finished:
+                self._finished = True
+                try:
+                    self.commit()
+                except BaseException:
+                    self.abort()
+                    raise
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.closed and not self._finished:
+            self._finished = True
+            self.abort()
+        super().close()
+
+
+class _LocalWriter(_Upload):
+    """Writes a file under a partial name and moves it into place on commit"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._partial = _partial_path(self.path)
+        self._file = open(self._partial, "wb")
+
+    def write(self, data):
+        return self._file.write(data)
+
+    def commit(self):
+        # The store keeps finished results, so they are synced like the working copy's
+        if RESULT_FSYNC:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._partial, self.path)
+        if RESULT_FSYNC:
+            _fsync_dir(self.path.parent)
+
+    def abort(self):
+        self._file.close()
+        self._partial.unlink(missing_ok=True)
+
+
+class LocalStorage(StorageBackend):
+    """Results on a local or mounted filesystem"""
+
+    name = "local"
+
+    def __init__(self, root=None, results_dir=RESULTS_DIR):
+        super().__init__(results_dir)
+        self.root = Path(root or os.environ.get("GOBLIN_STORAGE_ROOT") or results_dir)
+        self.root.mkdir(exist_ok=True, parents=True)
+        self.in_place = self.root.resolve() == self.results_dir.resolve()
+
+    def _path(self, key):
+        path = self.root / key
+        # A symlink in the results tree must not lead outside it
+        if not os.path.realpath(path).startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(f"{key} is not a result artifact")
+        return path
+
+    def open_read(self, key):
+        return open(self._path(key), "rb")
+
+    def open_write(self, key):
+        return _LocalWriter(self._path(key))
+
+    def stat(self, key):
+        try:
+            info = self._path(key).stat()
+        except (OSError, ValueError):
+            return None
+        return ObjectInfo(key, info.st_size, info.st_mtime)
+
+    def list(self, prefix):
+        for dirpath, dirnames, filenames in os.walk(self._path(prefix)):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if name.startswith("."):
+                    continue
+                path = Path(dirpath) / name
+                try:
+                    info = path.stat()
+                except OSError:
+                    continue
+                yield ObjectInfo(path.relative_to(self.root).as_posix(), info.st_size, info.st_mtime)
+
+    def list_prefixes(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def delete(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+    def delete_prefix(self, prefix):
+        shutil.rmtree(self._path(prefix), ignore_errors=True)
+
+    def describe(self):
+        return {"backend": self.name, "root": str(self.root), "in_place": self.in_place}
+
+
+class _BodyReader(io.RawIOBase):
+    """Raw stream over a GetObject body, for buffered and line-by-line reading"""
+
+    def __init__(self, body):
+        self._body = body
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._body.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._body.close()
+        super().close()
+
+
+class _MultipartWriter(_Upload):
+    """
+    Streams an object to S3 in PART_BYTES parts. Objects smaller than one
+    part are stored with a single PutObject; an upload that fails or is
+    left unfinished is aborted, so no parts are left behind.
+    """
+
+    def __init__(self, client, bucket, key, part_bytes=PART_BYTES):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_bytes = part_bytes
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.part_bytes:
+            self._upload_part(bytes(self._buffer[:self.part_bytes]))
+            del self._buffer[:self.part_bytes]
+        return len(data)
+
+    def _upload_part(self, body):
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)["UploadId"]
+        number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=number, Body=body
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+    def commit(self):
+        if self._upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        self._buffer = bytearray()
+
+    def abort(self):
+        self._buffer = bytearray()
+        if self._upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            except ClientError as e:
+                logger.warning("Could not abort multipart upload", extra={"key": self.key, "error": str(e)})
+
+
+def _not_found(error):
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+class S3Storage(StorageBackend):
+    """Results in an S3 bucket or S3-compatible object store"""
+
+    name = "s3"
+
+    def __init__(self, bucket=None, prefix=None, endpoint_url=None, region=None, results_dir=RESULTS_DIR):
+        if boto3 is None:
+            raise RuntimeError("The s3 storage backend needs boto3 (pip install boto3)")
+        super().__init__(results_dir)
+        self.bucket = bucket or os.environ.get("GOBLIN_S3_BUCKET")
+        if not self.bucket:
+            raise RuntimeError("GOBLIN_S3_BUCKET must be set for the s3 storage backend")
+        self.prefix = (prefix if prefix is not None else os.environ.get("GOBLIN_S3_PREFIX", "results")).strip("/")
+        self.endpoint_url = endpoint_url or os.environ.get("GOBLIN_S3_ENDPOINT_URL") or None
+        # boto3 clients are thread-safe, one serves the API and every pool thread
+        self.client = boto3.client(
+            "s3", endpoint_url=self.endpoint_url, region_name=region or os.environ.get("GOBLIN_S3_REGION") or None
+        )
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _key(self, object_key):
+        return object_key[len(self.prefix) + 1:] if self.prefix else object_key
+
+    def open_read(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if _not_found(e):
+                raise FileNotFoundError(key) from None
+            raise
+        return io.BufferedReader(_BodyReader(response["Body"]), buffer_size=CHUNK_BYTES)
+
+    def open_write(self, key):
+        return _MultipartWriter(self.client, self.bucket, self._object_key(key))
+
+    def stat(self, key):
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if _not_found(e):
+                return None
+            raise
+        return ObjectInfo(key, response["ContentLength"], response["LastModified"].timestamp())
+
+    def _pages(self, prefix, **kwargs):
+        paginator = self.client.get_paginator("list_objects_v2")
+        return paginator.paginate(Bucket=self.bucket, Prefix=prefix, **kwargs)
+
+    def list(self, prefix):
+        for page in self._pages(self._object_key(prefix.rstrip("/") + "/")):
+            for item in page.get("Contents", []):
+                key = self._key(item["Key"])
+                if not _is_hidden(key):
+                    yield ObjectInfo(key, item["Size"], item["LastModified"].timestamp())
+
+    def list_prefixes(self):
+        names = []
+        for page in self._pages(self._object_key(""), Delimiter="/"):
+            for common in page.get("CommonPrefixes", []):
+                name = self._key(common["Prefix"]).rstrip("/")
+                if not name.startswith("."):
+                    names.append(name)
+        return sorted(names)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def delete_prefix(self, prefix):
+        keys = [self._object_key(info.key) for info in self.list(prefix)]
+        for start in range(0, len(keys), DELETE_BATCH):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                "Objects": [{"Key": key} for key in keys[start:start + DELETE_BATCH]], "Quiet": True,
+            })
+
+    def describe(self):
+        return {"backend": self.name, "bucket": self.bucket, "prefix": self.prefix,
+                "endpoint_url": self.endpoint_url, "part_bytes": PART_BYTES}
+
+
+BACKENDS = {"local": LocalStorage, "s3": S3Storage}
+
+_storages = {}
+_storage_lock = threading.Lock()
+
+
+def get_storage(results_dir=RESULTS_DIR):
+    """The storage backend selected by GOBLIN_STORAGE_BACKEND for a results tree, created once per process"""
+    results_dir = os.path.abspath(results_dir)
+    with _storage_lock:
+        if results_dir not in _storages:
+            if BACKEND not in BACKENDS:
+                raise RuntimeError(f"Unknown GOBLIN_STORAGE_BACKEND {BACKEND!r}, expected one of {sorted(BACKENDS)}")
+            storage = BACKENDS[BACKEND](results_dir=results_dir)
+            logger.info("Result storage ready", extra=storage.describe())
+            _storages[results_dir] = storage
+        return _storages[results_dir]
@@ -0,0 +1,180 @@
+"""
+Indexed task collections for the MinionManager.
+
+Tasks are stored in insertion order under a monotonically increasing
+sequence number, with a sorted secondary index per filterable field. A
+listing picks the most selective index, seeks to the cursor with bisect and
+stops as soon as the page is full, so polling a large collection costs a
+page of work rather than a scan and copy of every task.
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+
+class TaskIndex:
+    """Ordered task_info dicts with per-field indexes and cursor pagination"""
+
+    INDEXED_FIELDS = ("gadget_id", "mode", "status")
+
+    def __init__(self):
+        self._next_seq = 0
+        self._tasks = {}  # seq -> task_info
+        self._seqs = {}  # task_id -> seq
+        self._order = []  # all seqs, ascending
+        self._keys = {}  # seq -> indexed field values, as last indexed
+        self._times = {}  # seq -> submit time (epoch seconds)
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}  # field -> value -> seqs
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        """Iterate over tasks, oldest first"""
+        return (self._tasks[seq] for seq in list(self._order))
+
+    def __contains__(self, task_id):
+        return task_id in self._seqs
+
+    def get(self, task_id):
+        seq = self._seqs.get(task_id)
+        return self._tasks.get(seq)
+
+    def add(self, task_info):
+        """Append a task (replacing an existing entry with the same task_id)"""
+        self.remove(task_info["task_id"])
+        self._next_seq += 1
+        seq = self._next_seq
+        self._tasks[seq] = task_info
+        self._seqs[task_info["task_id"]] = seq
+        self._order.append(seq)
+        self._times[seq] = parse_timestamp(task_info.get("submit_time"))
+        self._index(seq, task_info)
+
+    def remove(self, task_id):
+        """Remove a task, returning its task_info if it was present"""
+        seq = self._seqs.pop(task_id, None)
+        if seq is None:
+            return None
+        self._unindex(seq)
+        _discard(self._order, seq)
+        del self._times[seq]
+        return self._tasks.pop(seq)
+
+    def reindex(self, task_id):
+        """Refresh the indexes after indexed fields of a stored task_info changed"""
+        seq = self._seqs.get(task_id)
+        if seq is not None:
+            self._unindex(seq)
+            self._index(seq, self._tasks[seq])
+
+    def pop_oldest(self):
+        """Remove and return the oldest task"""
+        if not self._order:
+            return None
+        return self.remove(self._tasks[self._order[0]]["task_id"])
+
+    def latest(self, limit=50):
+        """The most recently added tasks, newest first"""
+        return [self._tasks[seq] for seq in reversed(self._order[-limit:])] if limit > 0 else []
+
+    def count(self, **filters):
+        """Number of tasks matching the filters"""
+        active = {field: value for field, value in filters.items() if value is not None}
+        if not active:
+            return len(self._order)
+        if len(active) == 1:
+            (field, value), = active.items()
+            return len(self._indexes[field].get(value, ()))
+        candidates = self._candidates(active)
+        return sum(1 for _ in self._matches(candidates, range(len(candidates)), active))
+
+    def query(self, limit=50, cursor=None, descending=False, since=None, until=None, **filters):
+        """
+        Return one page of tasks and the cursor of the next page.
+
+        Pages are ordered by insertion, oldest first unless descending.
+        since/until bound the submit time (epoch seconds). The cursor is
+        None once there are no further tasks.
+        """
+        if limit <= 0:
+            return [], None
+        active = {field: value for field, value in filters.items() if value is not None}
+        candidates = self._candidates(active)
+        position = int(cursor) if cursor not in (None, "") else None
+        if descending:
+            end = bisect_left(candidates, position) if position is not None else len(candidates)
+            positions = range(end - 1, -1, -1)
+        else:
+            start = bisect_right(candidates, position) if position is not None else 0
+            positions = range(start, len(candidates))
+
+        items = []
+        for seq in self._matches(candidates, positions, active, since, until):
+            if len(items) == limit:
+                return items, str(last_seq)
+            items.append(self._tasks[seq])
+            last_seq = seq
+        return items, None
+
+    def _candidates(self, active):
+        """The smallest index list covering the filters"""
+        candidates = self._order
+        for field, value in active.items():
+            if field not in self._indexes:
+                raise ValueError(f"Cannot filter tasks by {field}")
+            seqs = self._indexes[field].get(value, [])
+            if len(seqs) < len(candidates):
+                candidates = seqs
+        return candidates
+
+    def _matches(self, candidates, positions, active, since=None, until=None):
+        for position in positions:
+            seq = candidates[position]
+            keys = self._keys[seq]
+            if any(keys[field] != value for field, value in active.items()):
+                continue
+            submitted = self._times[seq]
+            if since is not None and (submitted is None or submitted < since):
+                continue
+            if until is not None and (submitted is None or submitted > until):
+                continue
+            yield seq
+
+    def _index(self, seq, task_info):
+        keys = {field: task_info.get(field) for field in self.INDEXED_FIELDS}
+        self._keys[seq] = keys
+        for field, value in keys.items():
+            insort(self._indexes[field].setdefault(value, []), seq)
+
+    def _unindex(self, seq):
+        for field, value in self._keys.pop(seq).items():
+            seqs = self._indexes[field].get(value)
+            if seqs is not None:
+                _discard(seqs, seq)
+                if not seqs:
+                    del self._indexes[field][value]
+
+
+def _discard(sorted_seqs, seq):
+    position = bisect_left(sorted_seqs, seq)
+    if position < len(sorted_seqs) and sorted_seqs[position] == seq:
+        del sorted_seqs[position]
+
+
+def parse_timestamp(value):
+    """Accept epoch seconds or an ISO 8601 string, returning epoch seconds"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def project_fields(task_info, fields):
+    """Keep only the requested top-level fields of a task"""
+    if not fields:
+        return task_info
+    return {field: task_info[field] for field in fields if field in task_info}
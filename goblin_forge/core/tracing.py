@@ -0,0 +1,227 @@
+"""
+Lightweight tracing for Goblin Forge.
+
+Spans follow a task from the API handler through the broker into the Minion
+and back to the monitor that notices completion. Trace context travels
+between processes as a W3C ``traceparent`` string (in the Celery message
+headers for tasks). Finished spans are handed to a pluggable exporter; the
+default appends one JSON object per span to ``GOBLIN_TRACE_FILE``.
+
+Configuration:
+    GOBLIN_TRACE_EXPORTER    "jsonl" (default), "none" or "package.module:Class"
+    GOBLIN_TRACE_FILE        JSON-lines output (default ./results/.traces/spans.jsonl)
+    GOBLIN_TRACE_SAMPLE_RATE Fraction of new traces to record (default 1.0)
+"""
+import contextvars
+import importlib
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar("goblin_current_span", default=None)
+
+
+class SpanContext:
+    """Identifies a span so children can be attached to it, possibly in another process"""
+
+    def __init__(self, trace_id, span_id, sampled=True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value):
+    """Parse a W3C traceparent header, returning None if it is malformed"""
+    try:
+        _, trace_id, span_id, flags = value.strip().split("-")
+    except (AttributeError, ValueError):
+        return None
+    if len(trace_id) != 32 or len(span_id) != 16:
+        return None
+    return SpanContext(trace_id, span_id, sampled=flags == "01")
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(self, name, context, parent_id=None, attributes=None, start_time=None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = "ok"
+        self.status_message = None
+        self.start_time = start_time if start_time is not None else time.time()
+        self.end_time = None
+
+    @property
+    def traceparent(self):
+        return self.context.traceparent
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, **attributes):
+        self.events.append({"name": name, "time": time.time(), "attributes": attributes})
+
+    def set_status(self, status, message=None):
+        self.status = status
+        self.status_message = message
+
+    def end(self, end_time=None):
+        if self.end_time is not None:
+            return
+        self.end_time = end_time if end_time is not None else time.time()
+        if self.context.sampled:
+            try:
+                get_exporter().export(self.to_dict())
+            except Exception as e:
+                # Tracing must never break the traced operation
+                logger.warning("Error exporting span", extra={"span": self.name, "error": str(e)})
+
+    def to_dict(self):
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round((self.end_time - self.start_time) * 1000, 3),
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": self.attributes,
+            "events": self.events,
+            "pid": os.getpid(),
+        }
+
+
+class SpanExporter:
+    """Interface for span exporters"""
+
+    def export(self, span):
+        raise NotImplementedError("Subclasses must implement export()")
+
+
+class NullExporter(SpanExporter):
+    """Discards all spans"""
+
+    def export(self, span):
+        pass
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends spans as JSON lines to a file shared by all processes"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or os.environ.get("GOBLIN_TRACE_FILE", "./results/.traces/spans.jsonl"))
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span, default=str) + "\n"
+        # One append-mode write per span keeps lines whole across processes
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+_exporter = None
+
+
+def _load_exporter():
+    name = os.environ.get("GOBLIN_TRACE_EXPORTER", "jsonl")
+    if name == "jsonl":
+        return JsonLinesExporter()
+    if name == "none":
+        return NullExporter()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_exporter():
+    """Return the active span exporter, creating it from the environment on first use"""
+    global _exporter
+    if _exporter is None:
+        _exporter = _load_exporter()
+    return _exporter
+
+
+def set_exporter(exporter):
+    """Replace the active span exporter"""
+    global _exporter
+    _exporter = exporter
+
+
+def _new_context(parent):
+    if parent is not None:
+        return SpanContext(parent.trace_id, secrets.token_hex(8), parent.sampled)
+    sample_rate = float(os.environ.get("GOBLIN_TRACE_SAMPLE_RATE", 1.0))
+    return SpanContext(secrets.token_hex(16), secrets.token_hex(8), random.random() < sample_rate)
+
+
+def _resolve_parent(parent):
+    """Accept a Span, SpanContext or traceparent string as parent, defaulting to the current span"""
+    if parent is None:
+        current = _current_span.get()
+        return current.context if current else None
+    if isinstance(parent, Span):
+        return parent.context
+    if isinstance(parent, str):
+        return parse_traceparent(parent)
+    return parent
+
+
+@contextmanager
+def start_span(name, parent=None, **attributes):
+    """Run the wrapped block inside a new span, made current for nested spans"""
+    parent_context = _resolve_parent(parent)
+    span = Span(
+        name, _new_context(parent_context),
+        parent_id=parent_context.span_id if parent_context else None,
+        attributes=attributes,
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_status("error", str(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def record_span(name, start_time, end_time, parent=None, **attributes):
+    """Record a span for an interval that has already elapsed, such as broker queueing"""
+    parent_context = _resolve_parent(parent)
+    span = Span(
+        name, _new_context(parent_context),
+        parent_id=parent_context.span_id if parent_context else None,
+        attributes=attributes, start_time=start_time,
+    )
+    span.end(end_time)
+    return span
+
+
+def current_span():
+    """Return the span active in this context, if any"""
+    return _current_span.get()
+
+
+def current_traceparent():
+    """Return the traceparent of the current span, if any"""
+    span = _current_span.get()
+    return span.traceparent if span else None
@@ -0,0 +1,316 @@
+"""
+Inventory of the Minion workers consuming from the broker.
+
+Workers announce themselves with Celery worker events (online, a heartbeat
+every few seconds carrying their active and processed task counts,
+offline). A background receiver in the API records them as they arrive,
+which gives each worker's liveness, tasks per second and busy ratio over
+GOBLIN_WORKER_RATE_WINDOW seconds. What heartbeats lack (reserved tasks,
+pool size, consumed queues, memory of the worker's processes) comes from a
+single broadcast of the ``minion_inventory`` remote control command, cached
+for GOBLIN_WORKER_INVENTORY_TTL seconds so dashboards polling the API do
+not add broker round-trips.
+
+Pausing a worker cancels its queue consumers: it finishes the tasks it
+holds and takes no new ones, while the rest of the fleet keeps consuming.
+Resuming adds the consumers back. Draining pauses the worker and reports
+it as ``drained`` once it holds no more tasks, so it can be stopped for a
+deploy without losing work.
+
+Configuration:
+    GOBLIN_WORKER_INVENTORY_TTL   Seconds to reuse inspected worker details (default 5)
+    GOBLIN_WORKER_RATE_WINDOW     Seconds of heartbeats behind tasks/sec and busy ratio (default 60)
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_TTL = float(os.environ.get("GOBLIN_WORKER_INVENTORY_TTL", 5))
+RATE_WINDOW = float(os.environ.get("GOBLIN_WORKER_RATE_WINDOW", 60))
+REPLY_TIMEOUT = 1.0
+# A worker missing this many heartbeats in a row is considered gone
+MISSED_HEARTBEATS = 3
+
+ACTIVE = "active"
+PAUSED = "paused"
+DRAINING = "draining"
+DRAINED = "drained"
+OFFLINE = "offline"
+
+
+def worker_report(state):
+    """Body of the minion_inventory control command, run inside the worker"""
+    from celery.worker import state as worker_state
+
+    consumer = state.consumer
+    stats = consumer.controller.stats()
+    active = state.tset(worker_state.active_requests)
+    reserved = state.tset(worker_state.reserved_requests) - active
+    queues = [queue.name for queue in consumer.task_consumer.queues] if consumer.task_consumer else []
+    return {
+        "pid": stats.get("pid"),
+        "uptime_seconds": stats.get("uptime"),
+        "concurrency": (stats.get("pool") or {}).get("max-concurrency"),
+        "active": len(active),
+        "reserved": len(reserved),
+        "processed": sum((stats.get("total") or {}).values()),
+        "queues": queues,
+        "autoscaler": stats.get("autoscaler"),
+        "processes": _process_memory(),
+    }
+
+
+def _process_memory():
+    """RSS of the worker process and everything below it (pool processes, gadget subprocesses)"""
+    main = psutil.Process()
+    processes = []
+    for process in [main] + main.children(recursive=True):
+        try:
+            with process.oneshot():
+                processes.append({
+                    "pid": process.pid,
+                    "ppid": process.ppid(),
+                    "name": process.name(),
+                    "rss_mb": round(process.memory_info().rss / 2**20, 1),
+                })
+        except psutil.Error:
+            continue
+    return processes
+
+
+class WorkerInventory:
+    """Live per-worker telemetry and consumer control for a Celery app"""
+
+    def __init__(self, app):
+        self.app = app
+        self._heartbeats = {}  # hostname -> latest worker event and rate samples
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._reports = {}  # hostname -> minion_inventory reply
+        self._reported_at = 0.0
+        self.last_error = None
+        self._paused_queues = {}  # hostname -> queues to consume again on resume
+        self._draining = set()
+        self._receiver = None
+        self._thread = None
+
+    def start(self):
+        """Start receiving worker events in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._receive_events, name="goblin-worker-events", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._receiver is not None:
+            self._receiver.should_stop = True
+
+    def _receive_events(self):
+        delay = 1.0
+        while True:
+            try:
+                with self.app.connection_for_read() as connection:
+                    self._receiver = self.app.events.Receiver(connection, handlers={
+                        "worker-online": self._on_event,
+                        "worker-heartbeat": self._on_event,
+                        "worker-offline": self._on_event,
+                    })
+                    delay = 1.0
+                    self._receiver.capture(limit=None, timeout=None, wakeup=False)
+                    if self._receiver.should_stop:
+                        return
+            except Exception as e:
+                if delay == 1.0:
+                    logger.warning("Worker event stream interrupted", extra={"error": str(e)})
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def _on_event(self, event):
+        hostname = event.get("hostname")
+        if not hostname:
+            return
+        now = time.time()
+        with self._lock:
+            worker = self._heartbeats.setdefault(hostname, {"samples": deque()})
+            if event["type"] == "worker-online":
+                # A restarted worker consumes its queues again
+                worker["samples"].clear()
+                self._paused_queues.pop(hostname, None)
+                self._draining.discard(hostname)
+            worker.update({
+                "online": event["type"] != "worker-offline",
+                "last_event": now,
+                "freq": event.get("freq") or 2.0,
+                "loadavg": event.get("loadavg"),
+                "software": " ".join(filter(None, (event.get("sw_ident"), event.get("sw_ver")))) or None,
+            })
+            if event["type"] == "worker-heartbeat":
+                samples = worker["samples"]
+                samples.append((now, event.get("processed", 0), event.get("active", 0)))
+                while samples and samples[0][0] < now - RATE_WINDOW:
+                    samples.popleft()
+
+    def _online_hostnames(self, now):
+        return [
+            hostname for hostname, worker in self._heartbeats.items()
+            if worker["online"] and now - worker["last_event"] <= worker["freq"] * MISSED_HEARTBEATS
+        ]
+
+    def reports(self, max_age=None):
+        """minion_inventory replies per worker, refreshed when older than max_age"""
+        max_age = INVENTORY_TTL if max_age is None else max_age
+        with self._refresh_lock:
+            if time.time() - self._reported_at < max_age:
+                return self._reports
+            with self._lock:
+                expected = len(self._online_hostnames(time.time()))
+            try:
+                # With the workers known from heartbeats, stop waiting once they all replied
+                replies = self.app.control.broadcast(
+                    "minion_inventory", reply=True, timeout=REPLY_TIMEOUT, limit=expected or None
+                ) or []
+                self._reports = {hostname: body for reply in replies for hostname, body in reply.items()
+                                 if isinstance(body, dict) and "error" not in body}
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("Failed to inspect workers", extra={"error": str(e)})
+            self._reported_at = time.time()
+            return self._reports
+
+    def cached_reports(self):
+        """The last minion_inventory replies, without asking the workers"""
+        return self._reports
+
+    def _expire(self):
+        self._reported_at = 0.0
+
+    def snapshot(self):
+        """Every known worker with its state, load and rates, plus fleet totals"""
+        reports = self.reports()
+        now = time.time()
+        with self._lock:
+            heartbeats = {hostname: {**worker, "samples": list(worker["samples"])}
+                          for hostname, worker in self._heartbeats.items()}
+            online = set(self._online_hostnames(now))
+            draining = set(self._draining)
+
+        workers = []
+        for hostname in sorted(set(reports) | set(heartbeats)):
+            report = reports.get(hostname, {})
+            heartbeat = heartbeats.get(hostname, {})
+            samples = heartbeat.get("samples", [])
+            concurrency = report.get("concurrency")
+            active = report.get("active", samples[-1][2] if samples else None)
+            reserved = report.get("reserved")
+            is_online = hostname in online or hostname in reports
+
+            if not is_online:
+                state = OFFLINE
+            elif hostname in draining:
+                state = DRAINED if report and not (active or reserved) else DRAINING
+            elif report and not report.get("queues"):
+                state = PAUSED
+            else:
+                state = ACTIVE
+
+            tasks_per_second = busy_ratio = None
+            if len(samples) >= 2 and samples[-1][0] > samples[0][0]:
+                # processed restarts from zero with the worker
+                tasks_per_second = round(max(0, samples[-1][1] - samples[0][1]) / (samples[-1][0] - samples[0][0]), 3)
+            if concurrency:
+                loads = [sample[2] for sample in samples] or ([active] if active is not None else [])
+                if loads:
+                    busy_ratio = round(min(1.0, sum(loads) / len(loads) / concurrency), 3)
+
+            processes = report.get("processes", [])
+            workers.append({
+                "hostname": hostname,
+                "state": state,
+                "last_heartbeat": datetime.fromtimestamp(heartbeat["last_event"]).isoformat()
+                if heartbeat.get("last_event") else None,
+                "heartbeat_age_seconds": round(now - heartbeat["last_event"], 1) if heartbeat.get("last_event") else None,
+                "concurrency": concurrency,
+                "active": active,
+                "reserved": reserved,
+                "busy_ratio": busy_ratio,
+                "tasks_per_second": tasks_per_second,
+                "processed": report.get("processed", samples[-1][1] if samples else None),
+                "queues": report.get("queues"),
+                "loadavg": heartbeat.get("loadavg"),
+                "uptime_seconds": report.get("uptime_seconds"),
+                "rss_mb": round(sum(process["rss_mb"] for process in processes), 1) if processes else None,
+                "processes": processes,
+                "software": heartbeat.get("software"),
+            })
+
+        serving = [worker for worker in workers if worker["state"] != OFFLINE]
+        capacity = sum(worker["concurrency"] or 0 for worker in serving)
+        busy = sum(worker["active"] or 0 for worker in serving)
+        totals = {
+            "workers": len(serving),
+            "consuming": sum(1 for worker in serving if worker["state"] == ACTIVE),
+            "concurrency": capacity,
+            "active": busy,
+            "reserved": sum(worker["reserved"] or 0 for worker in serving),
+            "busy_ratio": round(busy / capacity, 3) if capacity else None,
+            "tasks_per_second": round(sum(worker["tasks_per_second"] or 0 for worker in serving), 3),
+            "rss_mb": round(sum(worker["rss_mb"] or 0 for worker in serving), 1),
+        }
+        return {
+            "workers": workers,
+            "totals": totals,
+            "inspected_at": datetime.fromtimestamp(self._reported_at).isoformat() if self._reported_at else None,
+            "events_connected": self._receiver is not None and self._thread is not None and self._thread.is_alive(),
+            "error": self.last_error,
+        }
+
+    def _control(self, command, hostname, queue):
+        replies = getattr(self.app.control, command)(
+            queue, destination=[hostname], reply=True, timeout=REPLY_TIMEOUT, limit=1
+        ) or []
+        return any(hostname in reply for reply in replies)
+
+    def pause(self, hostname, drain=False):
+        """Stop a worker consuming new tasks; with drain, report it drained once it holds none"""
+        report = self.reports().get(hostname)
+        if report is None:
+            return {"status": "error", "message": f"Minion {hostname} not found"}
+        queues = report.get("queues") or []
+        if not queues and not drain:
+            return {"status": "error", "message": "Minion already paused"}
+        for queue in queues:
+            if not self._control("cancel_consumer", hostname, queue):
+                return {"status": "error", "message": f"Minion {hostname} did not answer"}
+        with self._lock:
+            if queues:
+                self._paused_queues[hostname] = queues
+            if drain:
+                self._draining.add(hostname)
+        self._expire()
+        logger.info("Minion paused", extra={"hostname": hostname, "queues": queues, "drain": drain})
+        action = "draining" if drain else "paused"
+        return {"status": "success", "message": f"Minion {hostname} {action}", "queues": queues}
+
+    def resume(self, hostname):
+        """Let a paused or draining worker consume its queues again"""
+        report = self.reports().get(hostname)
+        if report is None:
+            return {"status": "error", "message": f"Minion {hostname} not found"}
+        if report.get("queues"):
+            return {"status": "error", "message": "Minion not paused"}
+        with self._lock:
+            queues = self._paused_queues.pop(hostname, None) or [self.app.conf.task_default_queue]
+            self._draining.discard(hostname)
+        for queue in queues:
+            if not self._control("add_consumer", hostname, queue):
+                return {"status": "error", "message": f"Minion {hostname} did not answer"}
+        self._expire()
+        logger.info("Minion resumed", extra={"hostname": hostname, "queues": queues})
+        return {"status": "success", "message": f"Minion {hostname} resumed", "queues": queues}
@@ -22,17 +22,51 @@
 # base_gadget.py - The interface all Goblin Gadgets must implement
 import shutil
 import os
+import time
+import json
+import asyncio
+import logging
 from pathlib import Path
 
+from goblin_forge.core import process_tree, tracing
+from goblin_forge.core.artifacts import ArtifactWriter
+from goblin_forge.core.capacity import resolve_cost
+from goblin_forge.core.checkpoint import Checkpoint
+from goblin_forge.core.limits import Cgroup, apply_limits, classify_exit, resolve_limits
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
 class BaseGadget:
     name = "Base Gadget"  # Display name
     description = "Base class for all Goblin Gadgets"
     tab_id = "base"  # Unique ID for the tab
     binary_path = None  # Path to the binary (if applicable)
     binary_name = None  # Name of the binary executable
+    resource_profile = "cpu"  # Dominant resource used by execute(): "cpu", "io" or "memory"
+    # What one task costs a Minion node: {"cpu_slots", "memory_mb", "subprocesses", "io_weight"}.
+    # Unset fields default from resource_profile; mode_costs overrides them per mode.
+    resource_cost = {}
+    mode_costs = {}
+    # Limits for every subprocess started by run_subprocess() (see core/limits.py):
+    # timeout_seconds, cpu_seconds, address_space_mb, file_size_mb, open_files,
+    # cgroup_cpus, cgroup_memory_mb. mode_limits overrides them per mode.
+    subprocess_limits = {}
+    mode_limits = {}
+    modes = []  # Optional static mode list, read by the plugin manifest without importing the gadget
+    form_schemas = {}  # Optional static form schema per mode id
 
     def __init__(self):
         """Initialize the gadget and validate binary if specified"""
+        self.subprocess_usage = []  # Per-process accounting filled by run_subprocess()
+        self.active_mode = None  # Mode being executed, set by the Minion; selects mode_limits
+        self.active_task_id = None  # Task being executed, set by the Minion; owns the subprocesses
+        # Progress to resume from when the task is retried, set by the Minion (see core/checkpoint.py)
+        self.checkpoint = Checkpoint()
+        # Writes result files off the event loop, each published atomically (see core/artifacts.py)
+        self.artifacts = ArtifactWriter()
         if self.binary_name:
             self._validate_binary()
 
@@ -53,6 +87,11 @@ class BaseGadget:
             raise FileNotFoundError(f"Binary '{self.binary_name}' not found in PATH")
         return binary_in_path
 
+    @property
+    def logger(self):
+        """Logger routed through the Goblin Forge logging pipeline"""
+        return logging.getLogger(f"goblin_forge.gadgets.{self.tab_id}")
+
     def get_binary_path(self):
         """Get the full path to the binary"""
         if not self.binary_name:
@@ -63,17 +102,168 @@ class BaseGadget:
             
         return shutil.which(self.binary_name)
 
+    def get_subprocess_limits(self, mode):
+        """Limits applied to the subprocesses of a mode"""
+        return resolve_limits(self.subprocess_limits, self.mode_limits, mode)
+
+    def get_resource_cost(self, mode):
+        """Declared resources a task of this mode holds while it runs"""
+        return resolve_cost(self.resource_profile, self.binary_name, self.resource_cost, self.mode_costs, mode)
+
     # Define available execution modes
     def get_modes(self):
         """Return a list of available execution modes"""
-        return []
+        return list(self.modes)
     
     # Define form schema for each mode
     def get_form_schema(self, mode):
         """Return JSON schema for form inputs for the given mode"""
-        return {}
+        return self.form_schemas.get(mode, {})
     
     # Execute the binary with given mode and parameters
     async def execute(self, mode, params, result_dir):
         """Execute the binary with specified mode and parameters"""
-        raise NotImplementedError("Subclasses must implement execute()")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement execute()")
+
+    # Execute many inputs in one invocation
+    async def execute_batch(self, mode, items, result_dir, params=None):
+        """
+        Execute a mode once per item, each item's fields overriding params.
+
+        Per-item results are written as one JSON object per line to
+        batch_results.ndjson. This default runs execute() for each item in
+        its own subdirectory; gadgets that can process many inputs at once
+        override it. Finished items are checkpointed, so a retried batch
+        only runs the items that had not yet succeeded.
+        """
+        result_dir = Path(result_dir)
+        result_dir.mkdir(exist_ok=True, parents=True)
+        done = {
+            record["index"]: record for record in self.checkpoint.get("batch_records", [])
+            if record.get("status") != "error" and not record.get("error")
+        }
+        records = []
+        for index, item in enumerate(items):
+            if index in done:
+                records.append(done[index])
+                continue
+            item_dir = result_dir / "items" / f"{index:06d}"
+            item_dir.mkdir(exist_ok=True, parents=True)
+            try:
+                result = await self.execute(mode, {**(params or {}), **item}, item_dir)
+            except Exception as e:
+                result = {"status": "error", "error": str(e)}
+            records.append({"index": index, **result})
+            await self.checkpoint.update(batch_records=records)
+        return await self.write_batch_results(result_dir, records)
+
+    async def write_batch_results(self, result_dir, records):
+        """Write per-item records to batch_results.ndjson and summarize them"""
+        output_file = Path(result_dir) / "batch_results.ndjson"
+        async with self.artifacts.open(output_file) as f:
+            for record in records:
+                await f.write(json.dumps(record, default=str) + "\n")
+        failed = sum(1 for record in records if record.get("error") or record.get("status") == "error")
+        return {
+            "status": "completed",
+            "result_file": str(output_file),
+            "items": len(records),
+            "failed": failed,
+        }
+
+    # Run an external command on behalf of execute()
+    async def run_subprocess(self, cmd, **kwargs):
+        """
+        Run a command to completion and capture its output.
+
+        Returns (return_code, stdout, stderr). The process leads a session of
+        its own, registered under the active task, so it can be stopped with
+        everything it spawned (see core/process_tree.py). The limits of the
+        active mode are applied to it; on timeout, cancellation or error the
+        whole tree is stopped, as are descendants left behind once it exits.
+        Wall time, CPU time and any limit hit are appended to
+        self.subprocess_usage for task accounting.
+        """
+        limits = self.get_subprocess_limits(getattr(self, "active_mode", None))
+        cgroup = Cgroup.create(limits)
+        kwargs.setdefault("start_new_session", True)
+        timed_out = False
+        stopped = None
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+        start_time = time.monotonic()
+
+        with tracing.start_span("gadget.subprocess", command=os.path.basename(str(cmd[0]))) as span:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    **kwargs
+                )
+                apply_limits(process.pid, limits, cgroup)
+                span.add_event("start", pid=process.pid)
+                if self.active_task_id:
+                    process_tree.register(self.active_task_id, process.pid, os.path.basename(str(cmd[0])))
+                try:
+                    communicate = asyncio.ensure_future(process.communicate())
+                    try:
+                        stdout, stderr = await asyncio.wait_for(
+                            asyncio.shield(communicate), timeout=limits.get("timeout_seconds")
+                        )
+                    except asyncio.TimeoutError:
+                        timed_out = True
+                        stopped = await asyncio.to_thread(process_tree.terminate_tree, process.pid)
+                        # Keep whatever the processes wrote before they were stopped
+                        stdout, stderr = await communicate
+                    if kwargs["start_new_session"] and stopped is None and _group_alive(process.pid):
+                        # Background descendants outliving the command
+                        stopped = await asyncio.to_thread(process_tree.terminate_tree, process.pid)
+                except BaseException:
+                    # Cancelled or failed while waiting: leave no processes behind
+                    if process.returncode is None or _group_alive(process.pid):
+                        await asyncio.to_thread(process_tree.terminate_tree, process.pid)
+                    raise
+                finally:
+                    if self.active_task_id:
+                        process_tree.unregister(self.active_task_id, process.pid)
+                span.add_event("exit", return_code=process.returncode)
+            finally:
+                oom_killed = cgroup.oom_killed() if cgroup else False
+                if cgroup:
+                    cgroup.remove()
+
+        usage = {
+            "command": os.path.basename(str(cmd[0])),
+            "pid": process.pid,
+            "return_code": process.returncode,
+            "wall_seconds": time.monotonic() - start_time,
+            "stdout_bytes": len(stdout or b""),
+            "stderr_bytes": len(stderr or b""),
+        }
+        if children_before:
+            children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            usage["cpu_user_seconds"] = children_after.ru_utime - children_before.ru_utime
+            usage["cpu_system_seconds"] = children_after.ru_stime - children_before.ru_stime
+        limit_hit = classify_exit(
+            process.returncode, limits, timed_out, oom_killed,
+            cpu_time=usage.get("cpu_user_seconds", 0) + usage.get("cpu_system_seconds", 0) if children_before else None
+        )
+        if stopped and stopped["processes"]:
+            usage["stopped"] = {key: stopped[key] for key in ("processes", "terminated", "killed", "survivors", "reclaimed")}
+        if limit_hit:
+            usage["limit_exceeded"] = limit_hit
+            self.logger.warning("Subprocess stopped by limit", extra={
+                "command": usage["command"], "limit": limit_hit, "limits": limits
+            })
+        self.subprocess_usage.append(usage)
+
+        return process.returncode, stdout, stderr
+
+
+def _group_alive(pgid):
+    """Whether any process is left in a process group"""
+    try:
+        os.killpg(pgid, 0)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
@@ -12,60 +12,82 @@ from pathlib import Path
 
 from goblin_forge.plugins.base_gadget import BaseGadget
 
+# Text-to-text operation behind each mode
+OPERATIONS = {
+    "base64_encode": lambda text: base64.b64encode(text.encode()).decode(),
+    "base64_decode": lambda text: base64.b64decode(text.encode()).decode(),
+    "hex_encode": lambda text: text.encode().hex(),
+    "hex_decode": lambda text: bytes.fromhex(text).decode(),
+    "url_encode": urllib.parse.quote,
+    "url_decode": urllib.parse.unquote,
+    "hash_md5": lambda text: hashlib.md5(text.encode()).hexdigest(),
+    "hash_sha256": lambda text: hashlib.sha256(text.encode()).hexdigest(),
+}
+
 class EncoderGadget(BaseGadget):
     """Example encoder/decoder gadget"""
     name = "Encoder & Decoder"
     description = "Encodes and decodes text in various formats"
     tab_id = "encoder"
+    resource_cost = {"cpu_slots": 0.5, "memory_mb": 64}  # Short, in-process string operations
     # This gadget doesn't use an external binary, so we don't set binary_name
     
-    def get_modes(self):
-        """Return available encoding/decoding modes"""
-        return [
-            {
-                "id": "base64_encode",
-                "name": "Base64 Encode",
-                "description": "Encode text to Base64"
-            },
-            {
-                "id": "base64_decode",
-                "name": "Base64 Decode",
-                "description": "Decode Base64 to text"
-            },
-            {
-                "id": "hex_encode",
-                "name": "Hex Encode",
-                "description": "Encode text to hexadecimal"
-            },
-            {
-                "id": "hex_decode",
-                "name": "Hex Decode",
-                "description": "Decode hexadecimal to text"
-            },
-            {
-                "id": "url_encode",
-                "name": "URL Encode",
-                "description": "Encode text for URLs"
-            },
-            {
-                "id": "url_decode",
-                "name": "URL Decode",
-                "description": "Decode URL-encoded text"
-            },
-            {
-                "id": "hash_md5",
-                "name": "Hash (MD5)",
-                "description": "Generate MD5 hash of text"
-            },
-            {
-                "id": "hash_sha256",
-                "name": "Hash (SHA-256)",
-                "description": "Generate SHA-256 hash of text"
-            }
-        ]
+    modes = [
+        {
+            "id": "base64_encode",
+            "name": "Base64 Encode",
+            "description": "Encode text to Base64"
+        },
+        {
+            "id": "base64_decode",
+            "name": "Base64 Decode",
+            "description": "Decode Base64 to text"
+        },
+        {
+            "id": "hex_encode",
+            "name": "Hex Encode",
+            "description": "Encode text to hexadecimal"
+        },
+        {
+            "id": "hex_decode",
+            "name": "Hex Decode",
+            "description": "Decode hexadecimal to text"
+        },
+        {
+            "id": "url_encode",
+            "name": "URL Encode",
+            "description": "Encode text for URLs"
+        },
+        {
+            "id": "url_decode",
+            "name": "URL Decode",
+            "description": "Decode URL-encoded text"
+        },
+        {
+            "id": "hash_md5",
+            "name": "Hash (MD5)",
+            "description": "Generate MD5 hash of text"
+        },
+        {
+            "id": "hash_sha256",
+            "name": "Hash (SHA-256)",
+            "description": "Generate SHA-256 hash of text"
+        }
+    ]
     
     def get_form_schema(self, mode):
         """Return form schema for the specified mode"""
+        schema = self._input_schema(mode)
+        schema["input_file"] = {
+            "type": "text",
+            "label": "Input File",
+            "required": False,
+            "placeholder": "results/<result_dir>/result.txt",
+            "description": "Read the text from a result file instead (e.g. an earlier pipeline step's result_file)"
+        }
+        return schema
+    
+    def _input_schema(self, mode):
         if "decode" in mode:
             return {
                 "input": {
@@ -108,22 +130,13 @@ class EncoderGadget(BaseGadget):
         
         # Process based on mode
         try:
-            if mode == "base64_encode":
-                result = base64.b64encode(input_text.encode()).decode()
-            elif mode == "base64_decode":
-                result = base64.b64decode(input_text.encode()).decode()
-            elif mode == "hex_encode":
-                result = input_text.encode().hex()
-            elif mode == "hex_decode":
-                result = bytes.fromhex(input_text).decode()
-            elif mode == "url_encode":
-                result = urllib.parse.quote(input_text)
-            elif mode == "url_decode":
-                result = urllib.parse.unquote(input_text)
-            elif mode == "hash_md5":
-                result = hashlib.md5(input_text.encode()).hexdigest()
-            elif mode == "hash_sha256":
-                result = hashlib.sha256(input_text.encode()).hexdigest()
+            if not input_text and params.get("input_file"):
+                # Read by reference, e.g. the output of an earlier pipeline step
+                input_text = await self.artifacts.read_text(params["input_file"])
+            
+            operation = OPERATIONS.get(mode)
+            if operation:
+                result = operation(input_text)
             else:
                 error = f"Unknown mode: {mode}"
         except Exception as e:
@@ -132,8 +145,7 @@ class EncoderGadget(BaseGadget):
         
         # Save result
         output_file = result_dir / "result.txt"
-        with open(output_file, 'w') as f:
-            f.write(result)
+        await self.artifacts.write_text(output_file, result)
         
         # Save metadata
         metadata = {
@@ -144,8 +156,7 @@ class EncoderGadget(BaseGadget):
         }
         
         metadata_file = result_dir / "metadata.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        await self.artifacts.write_json(metadata_file, metadata)
         
         return {
             "status": "completed" if not error else "error",
@@ -154,6 +165,29 @@ class EncoderGadget(BaseGadget):
             "error": error
         }
 
+    async def execute_batch(self, mode, items, result_dir, params=None):
+        """Run one operation over every item's input in a single loop, with no per-item files"""
+        result_dir = Path(result_dir)
+        result_dir.mkdir(exist_ok=True, parents=True)
+        operation = OPERATIONS.get(mode)
+        if operation is None:
+            return {"status": "error", "error": f"Unknown mode: {mode}"}
+        
+        default_input = (params or {}).get("input", "")
+        records = []
+        for index, item in enumerate(items):
+            input_text = item.get("input", default_input)
+            try:
+                records.append({"index": index, "output": operation(input_text)})
+            except Exception as e:
+                records.append({"index": index, "error": f"Error processing {mode}: {str(e)}"})
+        
+        summary = await self.write_batch_results(result_dir, records)
+        summary["result_preview"] = "\n".join(
+            str(record.get("output", record.get("error"))) for record in records[:5]
+        )
+        return summary
+
     async def get_result_details(self, result_dir):
         """Get detailed information about the result"""
         result_dir = Path(result_dir)
@@ -8,7 +8,6 @@ import os
 import asyncio
 import json
 from pathlib import Path
-import shutil
 import logging
 
 from goblin_forge.plugins.base_gadget import BaseGadget
@@ -19,21 +18,21 @@ class FileProcessorGadget(BaseGadget):
     name = "File Processor"  # Display name
     description = "Process uploaded files with various operations"
     tab_id = "file_processor"  # Unique ID for the tab
+    resource_profile = "io"  # Dominated by file copies
+    resource_cost = {"cpu_slots": 0.25, "memory_mb": 128, "io_weight": 1.0}
         
-    def get_modes(self):
-        """Return available file processing modes"""
-        return [
-            {
-                "id": "file_analyzer",
-                "name": "File Analyzer",
-                "description": "Analyze uploaded files and provide basic information"
-            },
-            {
-                "id": "file_converter",
-                "name": "File Converter",
-                "description": "Convert files between different formats"
-            }
-        ]
+    modes = [
+        {
+            "id": "file_analyzer",
+            "name": "File Analyzer",
+            "description": "Analyze uploaded files and provide basic information"
+        },
+        {
+            "id": "file_converter",
+            "name": "File Converter",
+            "description": "Convert files between different formats"
+        }
+    ]
         
     def get_form_schema(self, mode):
         """Return form schema for the specified mode"""
@@ -84,14 +83,14 @@ class FileProcessorGadget(BaseGadget):
         input_file = params.get("input_file")
         if input_file:
             input_path = Path(input_file)
-            if input_path.exists():
-                # Create an 'input' subdirectory in the result directory
-                input_dir = Path(result_dir) / "input"
-                input_dir.mkdir(exist_ok=True)
-                
-                # Copy the file to the input directory
-                new_path = input_dir / input_path.name
-                shutil.copy2(input_file, new_path)
+            # Artifacts of earlier steps in the same pipeline directory are used in place
+            pipeline_dir = Path(result_dir).resolve().parent
+            in_pipeline = (pipeline_dir in input_path.resolve().parents
+                           and await self.artifacts.fetch(pipeline_dir / "pipeline.json"))
+            if await self.artifacts.fetch(input_path) and not in_pipeline:
+                # Copy the file to an 'input' subdirectory of the result directory
+                new_path = Path(result_dir) / "input" / input_path.name
+                await self.artifacts.copy(input_file, new_path)
                 
                 # Update the input file path in params
                 params["input_file"] = str(new_path)
@@ -128,10 +127,10 @@ class FileProcessorGadget(BaseGadget):
             }
             
         # Save the analysis results
-        with open(os.path.join(result_dir, "analysis_results.json"), "w") as f:
-            json.dump(result, f, indent=2)
+        results_file = os.path.join(result_dir, "analysis_results.json")
+        await self.artifacts.write_json(results_file, result)
             
-        return {"status": "success", "message": "File analysis completed"}
+        return {"status": "success", "message": "File analysis completed", "result_file": results_file}
         
     async def _convert_file(self, parameters, result_dir):
         """Convert file to different format"""
@@ -141,21 +140,21 @@ class FileProcessorGadget(BaseGadget):
         if not input_file or not os.path.exists(input_file):
             return {"error": "Input file not found"}
             
-        # Create an 'output' subdirectory in the result directory
+        # Converted files go to an 'output' subdirectory of the result directory
         output_dir = Path(result_dir) / "output"
-        output_dir.mkdir(exist_ok=True)
             
         # In a real implementation, you would perform the actual conversion here
         # For this example, we'll just copy the file with a new extension
         input_path = Path(input_file)
         output_path = output_dir / f"{input_path.stem}.{output_format}"
         
-        shutil.copy2(input_file, output_path)
+        await self.artifacts.copy(input_file, output_path)
         
         return {
             "status": "success",
             "message": f"File converted to {output_format}",
-            "output_file": str(output_path)
+            "output_file": str(output_path),
+            "result_file": str(output_path)
         }
     
     def _human_readable_size(self, size_bytes):
@@ -6,13 +6,21 @@ Provides network scanning capabilities via a user-friendly interface.
 import os
 import asyncio
 import subprocess
+import hashlib
+import re
+import time
+from datetime import datetime
 from pathlib import Path
 import json
-import logging
 
+from goblin_forge.core.checkpoint import TRANSIENT_ERRORS, TransientGadgetError
+from goblin_forge.core.storage import STATE_PREFIX, get_storage
 from goblin_forge.plugins.base_gadget import BaseGadget
 
-logger = logging.getLogger(__name__)
+# Latest full scan state per target set, used as the baseline of incremental scans.
+# Kept in the result store, so Minions on every node scan against the same one,
+# until the retention cleanup expires baselines that were not updated
+BASELINE_PREFIX = f"{STATE_PREFIX}/scan_baselines"
 
 class ScannerGadget(BaseGadget):
     """Example scanner gadget that demonstrates the Goblin Gadget interface"""
@@ -20,41 +28,64 @@ class ScannerGadget(BaseGadget):
     description = "Scans networks and hosts for open ports and services"
     tab_id = "scanner"
     binary_name = "nmap"  # Executable name (will search in PATH)
+    resource_profile = "io"  # Mostly waiting on the network
+    resource_cost = {"cpu_slots": 0.25, "memory_mb": 64, "subprocesses": 1, "io_weight": 1.0}
+    mode_costs = {
+        # Service/OS detection and NSE scripts hold many sockets and far more memory
+        "full_scan": {"cpu_slots": 0.5, "memory_mb": 256, "io_weight": 2.0},
+        "vuln_scan": {"cpu_slots": 1.0, "memory_mb": 512, "io_weight": 2.0},
+        "os_detection": {"memory_mb": 128, "io_weight": 1.5},
+        "incremental_scan": {"memory_mb": 128, "io_weight": 1.5},
+    }
+    subprocess_limits = {
+        "timeout_seconds": 1800, "cpu_seconds": 900, "address_space_mb": 4096,
+        "file_size_mb": 512, "open_files": 4096,
+    }
+    mode_limits = {
+        "quick_scan": {"timeout_seconds": 300, "cpu_seconds": 120},
+        "vuln_scan": {"timeout_seconds": 3300, "cpu_seconds": 1800},
+        # Arbitrary user arguments: keep a runaway scan from starving the node
+        "custom_scan": {"timeout_seconds": 900, "cpu_seconds": 300, "address_space_mb": 1024,
+                        "cgroup_cpus": 1.0, "cgroup_memory_mb": 1024},
+    }
     
-    def get_modes(self):
-        """Return available scanning modes"""
-        return [
-            {
-                "id": "quick_scan",
-                "name": "Quick Scan",
-                "description": "Fast scan of common ports on a target"
-            },
-            {
-                "id": "full_scan",
-                "name": "Full Scan",
-                "description": "Complete port scan with service detection"
-            },
-            {
-                "id": "vuln_scan",
-                "name": "Vulnerability Scan",
-                "description": "Scan for common vulnerabilities"
-            },
-            {
-                "id": "stealth_scan",
-                "name": "Stealth Scan",
-                "description": "Perform a quiet, stealthy scan"
-            },
-            {
-                "id": "os_detection",
-                "name": "OS Detection",
-                "description": "Detect operating system of target"
-            },
-            {
-                "id": "custom_scan",
-                "name": "Custom Scan",
-                "description": "Scan with custom parameters"
-            }
-        ]
+    modes = [
+        {
+            "id": "quick_scan",
+            "name": "Quick Scan",
+            "description": "Fast scan of common ports on a target"
+        },
+        {
+            "id": "full_scan",
+            "name": "Full Scan",
+            "description": "Complete port scan with service detection"
+        },
+        {
+            "id": "vuln_scan",
+            "name": "Vulnerability Scan",
+            "description": "Scan for common vulnerabilities"
+        },
+        {
+            "id": "stealth_scan",
+            "name": "Stealth Scan",
+            "description": "Perform a quiet, stealthy scan"
+        },
+        {
+            "id": "os_detection",
+            "name": "OS Detection",
+            "description": "Detect operating system of target"
+        },
+        {
+            "id": "custom_scan",
+            "name": "Custom Scan",
+            "description": "Scan with custom parameters"
+        },
+        {
+            "id": "incremental_scan",
+            "name": "Incremental Scan",
+            "description": "Rescan only new, changed or stale hosts and report the delta against the last scan"
+        }
+    ]
     
     def get_form_schema(self, mode):
         """Return form schema for the specified mode"""
@@ -135,6 +166,37 @@ class ScannerGadget(BaseGadget):
                 }
             }
             
+        elif mode == "incremental_scan":
+            return {
+                "target": {
+                    **base_schema["target"],
+                    "placeholder": "10.0.0.1 10.0.0.2 or 10.0.0.0/24",
+                    "description": "Hosts or ranges to scan, separated by spaces or commas"
+                },
+                "port_range": {
+                    "type": "string",
+                    "label": "Port Range",
+                    "required": False,
+                    "placeholder": "1-1000",
+                    "default": "1-1000",
+                    "description": "Ports to scan on new or changed hosts"
+                },
+                "rescan_after_hours": {
+                    "type": "number",
+                    "label": "Full Rescan After (hours)",
+                    "required": False,
+                    "default": 24,
+                    "description": "Hosts whose last full scan is older than this are scanned again in full"
+                },
+                "reset_baseline": {
+                    "type": "checkbox",
+                    "label": "Reset Baseline",
+                    "required": False,
+                    "default": False,
+                    "description": "Ignore the previous scan and scan every live host in full"
+                }
+            }
+            
         return base_schema
     
     async def execute(self, mode, params, result_dir):
@@ -145,91 +207,64 @@ class ScannerGadget(BaseGadget):
         
         # Save parameters for reference
         params_file = result_dir / "params.json"
-        with open(params_file, 'w') as f:
-            json.dump({
-                "mode": mode,
-                "params": params
-            }, f, indent=2)
+        await self.artifacts.write_json(params_file, {
+            "mode": mode,
+            "params": params
+        })
+        
+        if mode == "incremental_scan":
+            return await self._incremental_scan(params, result_dir)
         
         # Build command based on mode and parameters
         target = params.get("target", "localhost")
-        nmap_path = self.get_binary_path()
-        cmd = [nmap_path]  # Use the validated binary path
-        
-        if mode == "quick_scan":
-            cmd.extend(["-F", target])
-        elif mode == "full_scan":
-            port_range = params.get("port_range", "1-1000")
-            cmd.extend(["-p", port_range, "-sV", target])
-        elif mode == "vuln_scan":
-            categories = params.get("vuln_categories", ["web"])
-            cmd.extend(["--script=vuln", target])
-        elif mode == "stealth_scan":
-            timing = params.get("timing", "sneaky")
-            timing_map = {
-                "paranoid": "0", "sneaky": "1", 
-                "polite": "2", "normal": "3"
-            }
-            cmd.extend([f"-T{timing_map.get(timing, '1')}", "-sS", target])
-        elif mode == "os_detection":
-            cmd.extend(["-O", target])
-        elif mode == "custom_scan":
-            custom_args = params.get("custom_args", "")
-            cmd = [nmap_path] + custom_args.split() + [target]
+        cmd = [self.get_binary_path()]  # Use the validated binary path
+        mode_args = self._mode_args(mode, params)
+        if mode_args is not None:
+            cmd.extend(mode_args + [target])
         
         # Log the command
-        logger.info(f"Executing scan command: {' '.join(cmd)}")
+        self.logger.info("Executing scan command", extra={"command": " ".join(cmd), "mode": mode})
         
         output_file = result_dir / "scan_results.txt"
         error_file = result_dir / "scan_errors.txt"
         
         try:
             # Execute nmap command with actual binary
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
+            return_code, stdout, stderr = await self.run_subprocess(cmd)
             
             # Write output to file
-            with open(output_file, 'wb') as f:
-                f.write(stdout)
+            await self.artifacts.write_bytes(output_file, stdout)
             
             if stderr:
-                with open(error_file, 'wb') as f:
-                    f.write(stderr)
+                await self.artifacts.write_bytes(error_file, stderr)
             
             # Create a summary file
             summary_file = result_dir / "summary.json"
-            with open(summary_file, 'w') as f:
-                json.dump({
-                    "target": target,
-                    "command": " ".join(cmd),
-                    "mode": mode,
-                    "status": "completed" if process.returncode == 0 else "error",
-                    "return_code": process.returncode,
-                    "result_files": [
-                        {"name": "scan_results.txt", "path": str(output_file)}
-                    ]
-                }, f, indent=2)
+            await self.artifacts.write_json(summary_file, {
+                "target": target,
+                "command": " ".join(cmd),
+                "mode": mode,
+                "status": "completed" if return_code == 0 else "error",
+                "return_code": return_code,
+                "result_files": [
+                    {"name": "scan_results.txt", "path": str(output_file)}
+                ]
+            })
             
             return {
-                "status": "completed" if process.returncode == 0 else "error",
+                "status": "completed" if return_code == 0 else "error",
                 "result_file": str(output_file),
                 "command": " ".join(cmd),
-                "return_code": process.returncode
+                "return_code": return_code
             }
             
         except Exception as e:
             # Handle execution errors
             error_msg = f"Error executing scan: {str(e)}"
-            logger.error(error_msg)
+            self.logger.error("Error executing scan", extra={"target": target, "mode": mode, "error": str(e)})
             
             # Write error to file
-            with open(error_file, 'w') as f:
-                f.write(error_msg)
+            await self.artifacts.write_text(error_file, error_msg)
             
             return {
                 "status": "error",
@@ -237,6 +272,228 @@ class ScannerGadget(BaseGadget):
                 "command": " ".join(cmd)
             }
 
+    def _mode_args(self, mode, params):
+        """nmap options for a mode, without the binary and the targets"""
+        if mode == "quick_scan":
+            return ["-F"]
+        elif mode == "full_scan":
+            port_range = params.get("port_range", "1-1000")
+            return ["-p", port_range, "-sV"]
+        elif mode == "vuln_scan":
+            categories = params.get("vuln_categories", ["web"])
+            return ["--script=vuln"]
+        elif mode == "stealth_scan":
+            timing = params.get("timing", "sneaky")
+            timing_map = {
+                "paranoid": "0", "sneaky": "1", 
+                "polite": "2", "normal": "3"
+            }
+            return [f"-T{timing_map.get(timing, '1')}", "-sS"]
+        elif mode == "os_detection":
+            return ["-O"]
+        elif mode == "custom_scan":
+            return params.get("custom_args", "").split()
+        return None
+    
+    async def execute_batch(self, mode, items, result_dir, params=None):
+        """Scan every item's target with one nmap process fed through -iL"""
+        result_dir = Path(result_dir)
+        result_dir.mkdir(exist_ok=True, parents=True)
+        params = params or {}
+        targets = [item.get("target", params.get("target", "localhost")) for item in items]
+        
+        if mode == "incremental_scan":
+            # Already scans a whole target set against a single baseline
+            return await self._incremental_scan({**params, "target": " ".join(targets)}, result_dir)
+        mode_args = self._mode_args(mode, params)
+        if mode_args is None:
+            return {"status": "error", "error": f"Unknown mode: {mode}"}
+        
+        targets_file = result_dir / "targets.txt"
+        await self.artifacts.write_text(targets_file, "\n".join(targets) + "\n")
+        
+        raw_output = []
+        try:
+            # Hosts are logged as they finish, so a retry only scans the remaining ones
+            scanned = await self._scan_grepable(
+                mode_args + ["-iL", str(targets_file)], raw_output, mode, progress=result_dir / "batch_scan.gnmap"
+            )
+        except Exception as e:
+            error_msg = f"Error executing scan: {str(e)}"
+            self.logger.error("Error executing batch scan", extra={"targets": len(targets), "mode": mode, "error": str(e)})
+            await self.artifacts.write_text(result_dir / "scan_errors.txt", error_msg)
+            return {"status": "error", "error": error_msg, "retryable": isinstance(e, TRANSIENT_ERRORS)}
+        
+        await self.artifacts.write_text(result_dir / "scan_results.txt", "\n".join(raw_output))
+        
+        # nmap reports hosts by address, with the name a target was given as in parentheses
+        by_target = {**{entry["hostname"]: entry for entry in scanned.values() if "hostname" in entry}, **scanned}
+        records = [
+            {
+                "index": index,
+                "target": target,
+                "status": "up" if target in by_target else "down",
+                "ports": by_target.get(target, {}).get("ports", {}),
+            }
+            for index, target in enumerate(targets)
+        ]
+        summary = await self.write_batch_results(result_dir, records)
+        summary["result_preview"] = f"{len(scanned)} of {len(targets)} hosts up"
+        return summary
+    
+    async def _incremental_scan(self, params, result_dir):
+        """
+        Scan only what changed since the previous scan of the same target set.
+
+        A ping sweep finds the live hosts. Hosts scanned recently have just
+        their previously open ports re-checked, and only new, stale or changed
+        hosts get a full port scan. The result is the delta against the
+        baseline; the merged state becomes the next baseline.
+        """
+        target = params.get("target", "localhost")
+        port_range = str(params.get("port_range") or "1-1000")
+        max_age = float(params.get("rescan_after_hours") or 24) * 3600
+        targets = [t for t in re.split(r"[\s,]+", target) if t]
+        baseline_key = _baseline_key(targets, port_range)
+        baseline = None if params.get("reset_baseline") else await asyncio.to_thread(_read_baseline, baseline_key)
+        known = (baseline or {}).get("hosts", {})
+        # A retry resumes after the sweep and verification of the failed attempt
+        plan = self.checkpoint.get("incremental_plan")
+        now = plan["scanned_at"] if plan else time.time()
+        raw_output = list(plan["raw_output"]) if plan else []
+        
+        try:
+            if plan:
+                live, fresh, reasons = plan["live"], plan["fresh"], plan["reasons"]
+            else:
+                # 1. Which hosts are up at all
+                live = await self._scan_grepable(["-sn", *targets], raw_output)
+                
+                # 2. Re-check the known open ports of recently scanned hosts
+                reasons = {}
+                fresh = []
+                for host in live:
+                    previous = known.get(host)
+                    if previous is None:
+                        reasons[host] = "new"
+                    elif now - previous.get("scanned_at", 0) > max_age:
+                        reasons[host] = "stale"
+                    else:
+                        fresh.append(host)
+                known_ports = sorted({
+                    int(port.split("/")[0]) for host in fresh for port in known[host]["ports"]
+                })
+                if fresh and known_ports:
+                    checked = await self._scan_grepable(
+                        ["-p", ",".join(map(str, known_ports)), *fresh], raw_output
+                    )
+                    for host in fresh:
+                        still_open = checked.get(host, {}).get("ports", {})
+                        if set(still_open) != set(known[host]["ports"]):
+                            reasons[host] = "changed"
+                await self.checkpoint.save(incremental_plan={
+                    "scanned_at": now, "live": live, "fresh": fresh, "reasons": reasons, "raw_output": raw_output,
+                })
+            
+            # 3. Full scan of everything that is not known to be unchanged, host by host resumable
+            rescanned = {}
+            if reasons:
+                rescanned = await self._scan_grepable(
+                    ["-p", port_range, "-sV", *sorted(reasons)], raw_output, progress=result_dir / "full_scan.gnmap"
+                )
+        except Exception as e:
+            error_msg = f"Error executing scan: {str(e)}"
+            self.logger.error("Error executing incremental scan", extra={"target": target, "error": str(e)})
+            await self.artifacts.write_text(result_dir / "scan_errors.txt", error_msg)
+            return {"status": "error", "error": error_msg, "retryable": isinstance(e, TRANSIENT_ERRORS)}
+        
+        hosts = {}
+        for host in live:
+            if host in reasons:
+                hosts[host] = {"ports": rescanned.get(host, {}).get("ports", {}), "scanned_at": now}
+            else:
+                hosts[host] = known[host]
+        
+        delta = _diff_hosts(known, hosts)
+        delta.update({
+            "target": target,
+            "port_range": port_range,
+            "scanned_at": datetime.fromtimestamp(now).isoformat(),
+            "baseline_result_dir": (baseline or {}).get("result_dir"),
+            "baseline_scanned_at": (baseline or {}).get("updated_at"),
+            "stats": {
+                "hosts_targeted": len(targets),
+                "hosts_up": len(live),
+                "hosts_verified": len(fresh),
+                "hosts_full_scanned": len(reasons),
+                "full_scan_reasons": reasons,
+            },
+        })
+        
+        output_file = result_dir / "scan_results.txt"
+        await self.artifacts.write_text(output_file, "\n".join(raw_output))
+        delta_file = result_dir / "scan_delta.json"
+        await self.artifacts.write_json(delta_file, delta)
+        
+        await asyncio.to_thread(_write_baseline, baseline_key, {
+            "targets": targets,
+            "port_range": port_range,
+            "updated_at": delta["scanned_at"],
+            "result_dir": str(result_dir),
+            "hosts": hosts,
+        })
+        
+        changes = len(delta["hosts_added"]) + len(delta["hosts_removed"]) + len(delta["hosts_changed"])
+        return {
+            "status": "completed",
+            "result_file": str(delta_file),
+            "result_preview": (
+                f"{len(live)} hosts up, {len(reasons)} fully scanned, {changes} changed "
+                f"(+{len(delta['hosts_added'])} -{len(delta['hosts_removed'])} ~{len(delta['hosts_changed'])})"
+            ),
+            "hosts_full_scanned": len(reasons),
+            "changes": changes,
+        }
+    
+    async def _scan_grepable(self, args, raw_output, mode="incremental_scan", progress=None):
+        """
+        Run nmap with grepable output and parse it into {host: {"ports": {...}}}.
+
+        With a progress file, nmap logs each host there as it finishes and the
+        file is checkpointed; a retry excludes the hosts logged by the failed
+        attempt and appends to the same log.
+        """
+        if progress is None:
+            cmd = [self.get_binary_path(), *args, "-oG", "-"]
+        else:
+            progress = Path(progress)
+            previous = ""
+            if self.checkpoint.get(progress.name) and progress.exists():
+                previous = await asyncio.to_thread(progress.read_text, errors="replace")
+            if "# Nmap done" in previous:
+                raw_output.append(f"# resumed from {progress}\n{previous}")
+                return _parse_grepable(previous)
+            finished = _finished_hosts(previous, ping_only="-sn" in args)
+            cmd = [self.get_binary_path(), *args, "-oG", str(progress)]
+            if finished:
+                cmd += ["--append-output", "--exclude", ",".join(sorted(finished))]
+            else:
+                progress.unlink(missing_ok=True)
+            await self.checkpoint.save(**{progress.name: str(progress)})
+        self.logger.info("Executing scan command", extra={"command": " ".join(cmd), "mode": mode})
+        return_code, stdout, stderr = await self.run_subprocess(cmd)
+        if progress is None:
+            output = stdout.decode(errors="replace")
+        else:
+            output = await asyncio.to_thread(progress.read_text, errors="replace") if progress.exists() else ""
+        raw_output.append(f"# {' '.join(cmd)}\n{output}")
+        if return_code < 0 and not self.subprocess_usage[-1].get("limit_exceeded"):
+            # Killed from outside (OOM killer, node shutdown): worth another try from the progress log
+            raise TransientGadgetError(f"nmap killed by signal {-return_code}")
+        if return_code != 0:
+            raise RuntimeError(stderr.decode(errors="replace").strip() or f"nmap exited with {return_code}")
+        return _parse_grepable(output)
+    
     # Optional method to provide a summary of results
     async def summarize_results(self, result_dir):
         """Generate a human-readable summary of scan results"""
@@ -282,4 +539,81 @@ class ScannerGadget(BaseGadget):
             "ports_found": len(ports),
             "open_ports": ports,
             "command": command
-        }
\ No newline at end of file
+        }
+
+
+def _parse_grepable(output):
+    """Parse nmap -oG output into {host: {"ports": {"22/tcp": {"state", "service", "version"}}}}"""
+    hosts = {}
+    for line in output.splitlines():
+        if not line.startswith("Host: "):
+            continue
+        host, _, hostname = line[6:].split("\t", 1)[0].partition(" ")
+        entry = hosts.setdefault(host, {"ports": {}})
+        if hostname.strip("()"):
+            entry["hostname"] = hostname.strip("()")
+        for field in line.split("\t")[1:]:
+            name, _, value = field.partition(": ")
+            if name == "Status":
+                entry["status"] = value.strip().lower()
+            elif name == "Ports":
+                for port in value.split(", "):
+                    parts = port.strip().split("/")
+                    if len(parts) >= 7 and parts[1] == "open":
+                        entry["ports"][f"{parts[0]}/{parts[2]}"] = {
+                            "state": parts[1],
+                            "service": parts[4],
+                            "version": parts[6],
+                        }
+    return {host: entry for host, entry in hosts.items() if entry.get("status", "up") == "up"}
+
+
+def _finished_hosts(output, ping_only=False):
+    """Hosts a grepable log reports as fully scanned (more than the status line unless ping only)"""
+    status_only, finished = set(), set()
+    for line in output.splitlines():
+        if line.startswith("Host: "):
+            host = line[6:].split(" ", 1)[0].split("\t", 1)[0]
+            (status_only if "\tStatus: " in line else finished).add(host)
+    return status_only | finished if ping_only else finished
+
+
+def _diff_hosts(before, after):
+    """Delta between two {host: {"ports": {...}}} states"""
+    changed = {}
+    for host in set(before) & set(after):
+        old, new = before[host]["ports"], after[host]["ports"]
+        diff = {
+            "opened": {port: new[port] for port in sorted(set(new) - set(old))},
+            "closed": sorted(set(old) - set(new)),
+            "changed": {
+                port: {"before": old[port], "after": new[port]}
+                for port in sorted(set(old) & set(new)) if old[port] != new[port]
+            },
+        }
+        if any(diff.values()):
+            changed[host] = diff
+    return {
+        "hosts_added": {host: after[host]["ports"] for host in sorted(set(after) - set(before))},
+        "hosts_removed": sorted(set(before) - set(after)),
+        "hosts_changed": changed,
+        "hosts_unchanged": len(set(before) & set(after)) - len(changed),
+    }
+
+
+def _baseline_key(targets, port_range):
+    key = json.dumps([sorted(targets), port_range])
+    return f"{BASELINE_PREFIX}/{hashlib.sha256(key.encode()).hexdigest()[:32]}.json"
+
+
+def _read_baseline(key):
+    try:
+        return get_storage().read_json(key)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_baseline(key, baseline):
+    with get_storage().open_write(key) as f:
+        f.write(json.dumps(baseline).encode())
+
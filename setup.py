@@ -16,7 +16,21 @@ setup(
         "python-multipart>=0.0.6",
         "httpx>=0.25.0",
         "asyncio>=3.4.3",
+        "prometheus-client>=0.17.0",
+        "msgpack>=1.0.5",
+        "orjson>=3.8.0",
+        "brotli>=1.0.9",
     ],
+    extras_require={
+        # S3 or S3-compatible result storage (GOBLIN_STORAGE_BACKEND=s3)
+        "s3": ["boto3>=1.28.0"],
+        "test": [
+            "pytest>=7.4.2",
+            "pytest-asyncio>=0.21.1",
+            "pytest-cov>=4.1.0",
+            "moto[s3]>=5.0.0",
+        ],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
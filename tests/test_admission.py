@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from goblin_forge.core import admission
+from goblin_forge.core.admission import AdmissionController, AdmissionDecision, TokenBucket
+from goblin_forge.core.task_index import TaskIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+class FakeWorkers:
+    def cached_reports(self):
+        return {"minion@node": {"concurrency": 1, "queues": ["celery"]}}
+
+
+class FakeMinionManager:
+    def __init__(self):
+        self.pending_tasks = TaskIndex()
+        self.completed_tasks = TaskIndex()
+        self.workers = FakeWorkers()
+
+    def queue(self, count, gadget_id="encoder"):
+        for _ in range(count):
+            self.pending_tasks.add({"task_id": f"t{len(self.pending_tasks)}", "gadget_id": gadget_id})
+
+
+@pytest.fixture
+def controller(monkeypatch, clock):
+    for name, value in {
+        "GOBLIN_MAX_PENDING_TASKS": "10",
+        "GOBLIN_ADMISSION_DELAY_THRESHOLD": "0.5",
+        "GOBLIN_ADMISSION_MAX_DELAY": "0",
+        "GOBLIN_ADMISSION_MAX_DELAYED": "2",
+        "GOBLIN_MAX_INFLIGHT_PER_GADGET": "8",
+        "GOBLIN_CLIENT_RATE": "1",
+        "GOBLIN_CLIENT_BURST": "3",
+    }.items():
+        monkeypatch.setenv(name, value)
+    return AdmissionController(FakeMinionManager())
+
+
+def test_bucket_spends_burst_then_refills(clock):
+    bucket = TokenBucket(rate=2, capacity=4)
+    assert bucket.take(4) == 0
+    assert bucket.take(1) == pytest.approx(0.5)
+    clock.now += 1
+    assert bucket.take(2) == 0
+    assert bucket.take(1) > 0
+
+
+def test_bucket_never_exceeds_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=2)
+    clock.now += 60
+    assert bucket.take(2) == 0
+    assert bucket.take(1) == pytest.approx(0.1)
+
+
+def test_bucket_without_rate_never_refills(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert bucket.take() == 0
+    assert bucket.take() == float("inf")
+
+
+def test_bucket_never_fills_beyond_capacity_for_large_requests(clock):
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert bucket.take(4) == float("inf")
+    assert bucket.tokens == 3
+
+
+def test_rate_limit_per_client(controller):
+    assert controller.check("a", "encoder", 3).action == AdmissionDecision.ACCEPT
+    decision = controller.check("a", "encoder")
+    assert decision.rejected and decision.reason == "rate_limited"
+    assert decision.retry_after == 1
+    assert controller.check("b", "encoder").action == AdmissionDecision.ACCEPT
+
+
+def test_global_rejections_do_not_spend_tokens(controller):
+    controller.minion_manager.queue(10)
+    for _ in range(5):
+        assert controller.check("a", "encoder").reason == "queue_full"
+    assert controller._bucket("a").tokens == 3
+
+
+def test_saturated_gadget_does_not_spend_tokens(controller):
+    controller.max_inflight_per_gadget = 6
+    controller.minion_manager.queue(4, gadget_id="scanner")
+    assert controller.check("a", "scanner", 3).reason == "gadget_saturated"
+    assert controller._bucket("a").tokens == 3
+    assert controller.check("a", "encoder", 3).action == AdmissionDecision.ACCEPT
+
+
+def test_delayed_submissions_are_capped(controller):
+    controller.minion_manager.queue(5)
+    first, second = controller.check("a", "encoder"), controller.check("b", "encoder")
+    assert first.action == second.action == AdmissionDecision.DELAY
+    assert controller.delaying == 2
+
+    third = controller.check("c", "encoder")
+    assert third.rejected and third.reason == "overloaded"
+    assert controller._bucket("c").tokens == 3
+
+    async def wait_out():
+        await asyncio.gather(controller.wait(first), controller.wait(second))
+    asyncio.run(wait_out())
+    assert controller.delaying == 0
+    assert controller.check("c", "encoder").action == AdmissionDecision.DELAY
+    assert controller.get_metrics()["delayed"] == 3
+
+
+def test_submission_larger_than_the_burst_is_rejected_outright(controller):
+    decision = controller.check("a", "encoder", 4)
+    assert decision.rejected and decision.reason == "too_large"
+    assert decision.retry_after is None
+    assert controller._bucket("a").tokens == 3
+
+
+def test_client_without_refill_gets_no_retry_after(controller):
+    controller.client_rate = 0
+    assert controller.check("a", "encoder", 3).action == AdmissionDecision.ACCEPT
+    decision = controller.check("a", "encoder")
+    assert decision.reason == "rate_limited" and decision.retry_after is None
+
+
+def test_demand_across_gadgets_is_admitted_as_a_whole(controller):
+    controller.minion_manager.queue(7, gadget_id="scanner")
+    decision = controller.check_demand("a", {"encoder": 1, "scanner": 2})
+    assert decision.reason == "gadget_saturated"
+    assert controller._bucket("a").tokens == 3
+
+    decision = controller.check_demand("b", {"encoder": 2, "scanner": 1})
+    assert decision.action == AdmissionDecision.DELAY
+    assert controller._bucket("b").tokens == 0
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from goblin_forge.core import artifacts
+from goblin_forge.core.artifacts import ArtifactWriter, sync_tree
+
+writer = ArtifactWriter()
+
+
+def _partials(directory):
+    return [path.name for path in directory.rglob("*.partial")]
+
+
+def test_writes_are_published_whole(tmp_path):
+    async def write_all():
+        await writer.write_text(tmp_path / "nested" / "result.txt", "héllo")
+        await writer.write_bytes(tmp_path / "raw.bin", b"\x00\x01")
+        await writer.write_json(tmp_path / "meta.json", {"b": 1, "a": [1, 2]}, sort_keys=True)
+    asyncio.run(write_all())
+
+    assert (tmp_path / "nested" / "result.txt").read_text(encoding="utf-8") == "héllo"
+    assert (tmp_path / "raw.bin").read_bytes() == b"\x00\x01"
+    assert (tmp_path / "meta.json").read_text() == json.dumps({"a": [1, 2], "b": 1}, indent=2)
+    assert _partials(tmp_path) == []
+
+
+def test_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    write_file = artifacts._write_file
+
+    def record_thread(path, data):
+        threads.append(threading.current_thread().name)
+        return write_file(path, data)
+
+    monkeypatch.setattr(artifacts, "_write_file", record_thread)
+    asyncio.run(writer.write_text(tmp_path / "result.txt", "x"))
+    assert threads and threads[0].startswith("goblin-artifacts")
+
+
+def test_stream_replaces_the_artifact_only_on_commit(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "BUFFER_BYTES", 4)
+    target = tmp_path / "results.ndjson"
+    target.write_text("previous\n")
+
+    async def stream():
+        async with writer.open(target) as f:
+            for i in range(5):
+                await f.write(f"line {i}\n")
+            # Chunks already reached the partial file, readers still see the old artifact
+            assert _partials(tmp_path)
+            assert target.read_text() == "previous\n"
+        return f
+
+    stream_result = asyncio.run(stream())
+    assert target.read_text() == "".join(f"line {i}\n" for i in range(5))
+    assert stream_result.bytes_written == len(target.read_bytes())
+    assert _partials(tmp_path) == []
+
+
+def test_failed_stream_is_discarded(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "BUFFER_BYTES", 4)
+    target = tmp_path / "results.ndjson"
+    target.write_text("previous\n")
+
+    async def fail_midway():
+        async with writer.open(target) as f:
+            await f.write("partial data\n")
+            raise RuntimeError("gadget crashed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(fail_midway())
+    assert target.read_text() == "previous\n"
+    assert _partials(tmp_path) == []
+
+
+def test_concurrent_writers_do_not_mix(tmp_path):
+    target = tmp_path / "shared.txt"
+    payloads = [str(i) * 500000 for i in range(8)]
+
+    async def write_concurrently():
+        await asyncio.gather(*(writer.write_text(target, payload) for payload in payloads))
+
+    asyncio.run(write_concurrently())
+    assert target.read_text() in payloads
+
+
+def test_copy_keeps_metadata(tmp_path):
+    source = tmp_path / "upload.txt"
+    source.write_text("data")
+    os.utime(source, (1_000_000, 1_000_000))
+    copied = asyncio.run(writer.copy(source, tmp_path / "inputs" / "upload.txt"))
+    assert copied.read_text() == "data"
+    assert copied.stat().st_mtime == 1_000_000
+
+
+def test_fsync_on_publish(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(artifacts.os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+
+    asyncio.run(writer.write_text(tmp_path / "a.txt", "x"))
+    assert synced == []
+    monkeypatch.setattr(artifacts, "FSYNC", True)
+    asyncio.run(writer.write_text(tmp_path / "b.txt", "x"))
+    assert len(synced) == 2  # The file, then its directory
+
+
+def test_sync_tree_syncs_files_and_directories(tmp_path, monkeypatch):
+    (tmp_path / "items" / "000001").mkdir(parents=True)
+    for name in ("result.txt", "items/000001/out.txt"):
+        (tmp_path / name).write_text("x")
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(artifacts.os, "fsync", lambda fd: synced.append(os.readlink(f"/proc/self/fd/{fd}")) or fsync(fd))
+
+    sync_tree(tmp_path)
+    assert sorted(synced) == sorted(str(path) for path in (
+        tmp_path, tmp_path / "result.txt", tmp_path / "items", tmp_path / "items" / "000001",
+        tmp_path / "items" / "000001" / "out.txt",
+    ))
+
+
+def test_read_text_stays_inside_the_results_tree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    step_output = tmp_path / "results" / "encoder_t1" / "result.txt"
+    step_output.parent.mkdir(parents=True)
+    step_output.write_text("aGk=")
+    (tmp_path / "secret.txt").write_text("secret")
+
+    assert asyncio.run(writer.read_text(step_output)) == "aGk="
+    with pytest.raises(ValueError):
+        asyncio.run(writer.read_text(tmp_path / "secret.txt"))
@@ -0,0 +1,149 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from celery.worker.autoscale import Autoscaler
+
+from goblin_forge.core import autoscaler as autoscaler_module
+from goblin_forge.core.autoscaler import MinionAutoscaler, ScalingPolicy
+
+
+@pytest.fixture
+def policy():
+    return ScalingPolicy(cpu_high=85, memory_high=85, memory_critical=95, load_high=1.5, cpu_count=8)
+
+
+def _decide(policy, procs=2, demand=4, task_weight=1.0, cpu=10, memory=50, load=0.1, bounds=(1, 10)):
+    return policy.decide(procs, bounds[0], bounds[1], demand, task_weight,
+                         cpu_percent=cpu, memory_percent=memory, load_per_cpu=load)
+
+
+def test_target_follows_demand_within_bounds(policy):
+    assert _decide(policy, demand=4) == (4, "demand")
+    assert _decide(policy, demand=0) == (1, "demand")
+    assert _decide(policy, demand=50, task_weight=0.1) == (10, "demand")
+
+
+def test_target_is_limited_to_what_the_cores_carry(policy):
+    assert _decide(policy, demand=10, task_weight=1.0) == (8, "cpu_capacity")
+    assert _decide(policy, demand=10, task_weight=2.0) == (4, "cpu_capacity")
+    # I/O-bound tasks share cores
+    assert _decide(policy, demand=10, task_weight=0.25) == (10, "demand")
+
+
+@pytest.mark.parametrize("readings, reason", [
+    ({"cpu": 90}, "cpu_pressure"),
+    ({"memory": 90}, "memory_pressure"),
+    ({"load": 2.0}, "load_pressure"),
+])
+def test_pressure_holds_growth(policy, readings, reason):
+    assert _decide(policy, procs=2, demand=6, **readings) == (2, reason)
+
+
+def test_pressure_does_not_hold_a_shrink(policy):
+    assert _decide(policy, procs=6, demand=2, cpu=99) == (2, "demand")
+
+
+def test_critical_memory_shrinks_one_process_at_a_time(policy):
+    assert _decide(policy, procs=5, demand=10, memory=97) == (4, "memory_critical")
+    assert _decide(policy, procs=1, demand=10, memory=97) == (1, "memory_critical")
+
+
+class FakePool:
+    def __init__(self, processes):
+        self.num_processes = processes
+        self.maintained = 0
+
+    def grow(self, n):
+        self.num_processes += n
+
+    def shrink(self, n):
+        self.num_processes -= n
+
+    def maintain_pool(self):
+        self.maintained += 1
+
+
+class Readings:
+    """Resource readings the autoscaler sees, set by the test"""
+
+    def __init__(self, monkeypatch):
+        self.cpu, self.memory, self.requests = 10.0, 50.0, []
+        monkeypatch.setattr(autoscaler_module.psutil, "cpu_percent", lambda interval=None: self.cpu)
+        monkeypatch.setattr(autoscaler_module.psutil, "virtual_memory", lambda: SimpleNamespace(percent=self.memory))
+        monkeypatch.setattr(autoscaler_module.os, "getloadavg", lambda: (0.0, 0.0, 0.0))
+        monkeypatch.setattr(autoscaler_module.state, "reserved_requests", self.requests)
+
+    def hold(self, count):
+        self.requests[:] = [SimpleNamespace(kwargs={"resource_cost": {"cpu_slots": 1.0}})] * count
+
+
+@pytest.fixture
+def readings(monkeypatch):
+    return Readings(monkeypatch)
+
+
+@pytest.fixture
+def scaler(readings, policy, monkeypatch):
+    monkeypatch.setenv("GOBLIN_AUTOSCALE_INTERVAL", "0")
+    monkeypatch.setenv("GOBLIN_AUTOSCALE_SCALE_DOWN_AFTER", "3")
+    scaler = MinionAutoscaler(FakePool(2), max_concurrency=8, min_concurrency=1)
+    scaler.policy = policy
+    return scaler
+
+
+def _keepalive_passed(scaler):
+    scaler._last_scale_up = time.monotonic() - scaler.keepalive - 1
+
+
+def test_grows_at_once(scaler, readings):
+    readings.hold(5)
+    scaler.maybe_scale()
+    assert scaler.processes == 5
+    assert scaler.pool.maintained == 1
+    assert scaler.last_decision["action"] == "scale_up"
+    assert scaler.info()["last_decision"]["target"] == 5
+
+
+def test_shrinks_only_after_sustained_low_demand(scaler, readings):
+    readings.hold(5)
+    scaler.maybe_scale()
+    _keepalive_passed(scaler)
+
+    readings.hold(1)
+    actions = []
+    for _ in range(3):
+        scaler.maybe_scale()
+        actions.append(scaler.last_decision["action"])
+    assert actions == ["hold", "hold", "scale_down"]
+    assert scaler.processes == 1
+
+
+def test_demand_in_between_resets_the_streak(scaler, readings):
+    readings.hold(5)
+    scaler.maybe_scale()
+    _keepalive_passed(scaler)
+    for held in (1, 1, 5, 1, 1):
+        readings.hold(held)
+        scaler.maybe_scale()
+    assert scaler.processes == 5
+
+
+def test_critical_memory_shrinks_within_the_keepalive(scaler, readings):
+    readings.hold(5)
+    scaler.maybe_scale()
+    readings.memory = 97
+    scaler.maybe_scale()
+    assert scaler.processes == 4
+    assert scaler.last_decision == {**scaler.last_decision, "action": "scale_down", "reason": "memory_critical"}
+
+
+def test_critical_memory_falls_back_to_scale_down(scaler, readings, monkeypatch):
+    monkeypatch.delattr(Autoscaler, "_shrink")
+    calls = []
+    monkeypatch.setattr(Autoscaler, "scale_down", lambda self, n: calls.append(n))
+    readings.hold(5)
+    scaler.maybe_scale()
+    readings.memory = 97
+    scaler.maybe_scale()
+    assert calls == [1]
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from starlette.testclient import TestClient
+
+from goblin_forge.api import main
+from goblin_forge.core.checkpoint import Checkpoint
+from goblin_forge.core.minion_manager import MinionManager
+from goblin_forge.plugins.base_gadget import BaseGadget
+from goblin_forge.plugins.encoder_gadget import EncoderGadget
+from goblin_forge.plugins.scanner_gadget import ScannerGadget
+
+FAKE_BIN = Path(__file__).resolve().parent.parent / "benchmarks" / "fake_bin"
+
+
+class GreetGadget(BaseGadget):
+    name = "Greet"
+    tab_id = "greet"
+    modes = [{"id": "greet", "name": "Greet"}]
+
+    async def execute(self, mode, params, result_dir):
+        if not params.get("name"):
+            raise ValueError("name is required")
+        output = Path(result_dir) / "greeting.txt"
+        output.write_text(f"{params['greeting']} {params['name']}")
+        return {"status": "completed", "result_file": str(output)}
+
+
+def _batch(gadget, mode, items, result_dir, params=None):
+    gadget.checkpoint = Checkpoint(result_dir, key="batch")
+    return asyncio.run(gadget.execute_batch(mode, items, result_dir, params))
+
+
+def _records(summary):
+    with open(summary["result_file"]) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_default_batch_runs_each_item_in_its_own_directory(tmp_path):
+    items = [{"name": "Ada"}, {"name": "Bob", "greeting": "Hi"}, {}]
+    summary = _batch(GreetGadget(), "greet", items, tmp_path, params={"greeting": "Hello"})
+
+    assert (summary["status"], summary["items"], summary["failed"]) == ("completed", 3, 1)
+    records = _records(summary)
+    assert [record["index"] for record in records] == [0, 1, 2]
+    assert (tmp_path / "items" / "000000" / "greeting.txt").read_text() == "Hello Ada"
+    assert (tmp_path / "items" / "000001" / "greeting.txt").read_text() == "Hi Bob"
+    assert records[2] == {"index": 2, "status": "error", "error": "name is required"}
+
+
+def test_encoder_batch_writes_a_single_file(tmp_path):
+    items = [{"input": "a"}, {"input": "bb"}, {}]
+    summary = _batch(EncoderGadget(), "base64_encode", items, tmp_path, params={"input": "default"})
+
+    assert (summary["items"], summary["failed"]) == (3, 0)
+    assert [record["output"] for record in _records(summary)] == ["YQ==", "YmI=", "ZGVmYXVsdA=="]
+    assert summary["result_preview"] == "YQ==\nYmI=\nZGVmYXVsdA=="
+    assert not (tmp_path / "items").exists()
+
+
+def test_encoder_batch_rejects_unknown_modes(tmp_path):
+    summary = _batch(EncoderGadget(), "rot13", [{"input": "a"}], tmp_path)
+    assert summary == {"status": "error", "error": "Unknown mode: rot13"}
+
+
+def test_scanner_batch_uses_one_nmap_run(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", f"{FAKE_BIN}{os.pathsep}{os.environ.get('PATH', '')}")
+    hosts = tmp_path / "network.json"
+    hosts.write_text(json.dumps({
+        "10.0.0.1": {"up": True, "ports": {"22": "ssh"}},
+        "10.0.0.2": {"up": False},
+    }))
+    monkeypatch.setenv("FAKE_NMAP_HOSTS", str(hosts))
+    monkeypatch.delenv("FAKE_NMAP_HOST_DELAY", raising=False)
+
+    gadget = ScannerGadget()
+    summary = _batch(gadget, "quick_scan", [{"target": "10.0.0.1"}, {"target": "10.0.0.2"}], tmp_path)
+
+    assert summary["status"] == "completed", summary
+    assert summary["result_preview"] == "1 of 2 hosts up"
+    assert (tmp_path / "targets.txt").read_text() == "10.0.0.1\n10.0.0.2\n"
+    up, down = _records(summary)
+    assert (up["target"], up["status"], down["status"]) == ("10.0.0.1", "up", "down")
+    assert [port.split("/")[0] for port in up["ports"]] == ["22"]
+    assert len(gadget.subprocess_usage) == 1
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    manager = MinionManager(results_dir=tmp_path / "results")
+    manager.enqueued = []
+
+    def enqueue(task_info, items=None):
+        manager.enqueued.append((task_info["task_id"], items))
+        return SimpleNamespace(id="celery-1")
+
+    monkeypatch.setattr(manager, "_enqueue", enqueue)
+    return manager
+
+
+def test_batch_is_one_task_with_items_kept_out_of_listings(manager):
+    items = [{"input": "a"}, {"input": "b"}]
+    task = asyncio.run(manager.submit_task(EncoderGadget(), "base64_encode", {}, items=items))
+
+    assert manager.enqueued == [(task["task_id"], items)]
+    details = manager.get_task_details(task["task_id"])
+    assert details["batch_size"] == 2
+    assert "items" not in details
+    assert manager.batch_items[task["task_id"]] == items
+
+
+def test_batches_with_other_items_are_not_coalesced(manager):
+    first = asyncio.run(manager.submit_task(EncoderGadget(), "base64_encode", {}, items=[{"input": "a"}]))
+    second = asyncio.run(manager.submit_task(EncoderGadget(), "base64_encode", {}, items=[{"input": "b"}]))
+    assert "coalesced_with" not in second
+    assert [task_id for task_id, _ in manager.enqueued] == [first["task_id"], second["task_id"]]
+
+
+@pytest.fixture
+def client(manager, monkeypatch):
+    monkeypatch.setattr(main, "minion_manager", manager)
+    # The startup hook would also follow worker heartbeats; only discovery is needed
+    main.plugin_loader.discover_gadgets()
+    return TestClient(main.app)
+
+
+def test_submit_batch_endpoint(client, manager):
+    response = client.post("/api/submit_batch", json={
+        "gadget_id": "encoder", "mode": "base64_encode", "items": [{"input": "a"}, {"input": "b"}],
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["items"] == 2
+    assert manager.enqueued == [(response.json()["task_id"], [{"input": "a"}, {"input": "b"}])]
+
+
+def test_submit_batch_validates_items(client, manager, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BATCH_ITEMS", 2)
+    for items in ([], [{"input": "a"}] * 3):
+        response = client.post("/api/submit_batch", json={"gadget_id": "encoder", "mode": "base64_encode", "items": items})
+        assert response.status_code == 400
+    response = client.post("/api/submit_batch", json={"gadget_id": "missing", "mode": "m", "items": [{}]})
+    assert response.status_code == 404
+    assert manager.enqueued == []
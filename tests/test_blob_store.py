@@ -0,0 +1,77 @@
+import os
+import shutil
+import time
+
+from goblin_forge.core.blob_store import MIN_BYTES, BlobStore
+from goblin_forge.core.results_manager import ResultsManager
+
+DATA = b"open port 22/tcp ssh\n" * (MIN_BYTES // 10)
+
+
+def _result(root, name, files):
+    directory = root / name
+    directory.mkdir(parents=True)
+    for file_name, data in files.items():
+        (directory / file_name).write_bytes(data)
+    return directory
+
+
+def test_identical_files_share_one_blob(tmp_path):
+    store = BlobStore(tmp_path / ".blobs")
+    first = _result(tmp_path, "first", {"scan.txt": DATA})
+    second = _result(tmp_path, "second", {"copy.txt": DATA, "other.txt": DATA + b"x"})
+
+    assert store.ingest(first) == {"files": 1, "deduplicated": 0, "stored_bytes": len(DATA), "bytes_saved": 0}
+    report = store.ingest(second)
+    assert report["deduplicated"] == 1
+    assert report["bytes_saved"] == len(DATA)
+
+    assert os.path.samefile(first / "scan.txt", second / "copy.txt")
+    assert (second / "copy.txt").read_bytes() == DATA
+    stats = store.stats()
+    assert stats["blobs"] == 2
+    assert stats["references"] == 3
+    assert stats["bytes_saved"] == len(DATA)
+
+
+def test_small_skipped_and_linked_files_are_left_alone(tmp_path):
+    store = BlobStore(tmp_path / ".blobs")
+    result = _result(tmp_path, "r", {"small.txt": b"tiny", "checkpoint.json": DATA, ".hidden": DATA})
+    assert store.ingest(result)["files"] == 0
+    assert store.ingest(_result(tmp_path, "again", {"scan.txt": DATA}))["files"] == 1
+    # Already a link to its blob
+    assert store.ingest(tmp_path / "again")["files"] == 0
+
+
+def test_blob_is_freed_after_its_last_reference(tmp_path):
+    store = BlobStore(tmp_path / ".blobs")
+    first = _result(tmp_path, "first", {"scan.txt": DATA})
+    second = _result(tmp_path, "second", {"scan.txt": DATA})
+    store.ingest(first)
+    store.ingest(second)
+
+    shutil.rmtree(first)
+    assert store.collect_garbage() == {"blobs_freed": 0, "bytes_freed": 0}
+    assert (second / "scan.txt").read_bytes() == DATA
+
+    shutil.rmtree(second)
+    assert store.stats()["unreferenced_blobs"] == 1
+    assert store.collect_garbage() == {"blobs_freed": 1, "bytes_freed": len(DATA)}
+    assert store.stats()["blobs"] == 0
+
+
+def test_retention_cleanup_frees_blobs(tmp_path):
+    manager = ResultsManager(tmp_path / "results", retention_days=1)
+    old = _result(manager.base_dir, "goblinforge_20200101_000000_scanner_quick_scan", {"scan.txt": DATA})
+    new = _result(manager.base_dir, "goblinforge_20200101_000001_scanner_quick_scan", {"scan.txt": DATA * 2})
+    manager.store_artifacts(old)
+    manager.store_artifacts(new)
+    week_ago = time.time() - 7 * 86400
+    os.utime(old, (week_ago, week_ago))
+
+    assert manager.cleanup_old_results() == 1
+    assert not old.exists()
+    stats = manager.get_storage_stats()
+    assert stats["blobs"] == 1
+    assert stats["stored_bytes"] == len(DATA) * 2
+    assert stats["backend"]["backend"] == "local"
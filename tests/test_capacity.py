@@ -0,0 +1,91 @@
+import json
+import subprocess
+import sys
+
+import psutil
+
+from goblin_forge.core import capacity
+from goblin_forge.core.capacity import CapacityLedger, read_ledgers
+
+NODE = {"cpu_slots": 2.0, "memory_mb": 1024.0, "subprocesses": 4.0, "io_weight": 4.0}
+
+
+def _ledger(tmp_path):
+    return CapacityLedger(tmp_path / "node.json", capacity=dict(NODE))
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_acquire_until_full_then_release(tmp_path):
+    ledger = _ledger(tmp_path)
+    assert ledger.try_acquire("a", {"cpu_slots": 1.0, "memory_mb": 256})
+    assert ledger.try_acquire("b", {"cpu_slots": 1.0, "memory_mb": 256})
+    assert not ledger.try_acquire("c", {"cpu_slots": 0.5})
+
+    snapshot = ledger.snapshot()
+    assert snapshot["in_use"]["cpu_slots"] == 2.0
+    assert set(snapshot["tasks"]) == {"a", "b"}
+    assert set(snapshot["waiting"]) == {"c"}
+
+    ledger.release("a")
+    assert ledger.try_acquire("c", {"cpu_slots": 0.5})
+    snapshot = ledger.snapshot()
+    assert set(snapshot["tasks"]) == {"b", "c"}
+    assert snapshot["waiting"] == {}
+
+
+def test_acquire_is_idempotent(tmp_path):
+    ledger = _ledger(tmp_path)
+    assert ledger.try_acquire("a", {"cpu_slots": 2.0})
+    assert ledger.try_acquire("a", {"cpu_slots": 2.0})
+    assert ledger.snapshot()["in_use"]["cpu_slots"] == 2.0
+
+
+def test_task_larger_than_node_runs_alone(tmp_path):
+    ledger = _ledger(tmp_path)
+    assert ledger.try_acquire("small", {"cpu_slots": 0.5})
+    assert not ledger.try_acquire("huge", {"cpu_slots": 8.0})
+    ledger.release("small")
+    assert ledger.try_acquire("huge", {"cpu_slots": 8.0})
+
+
+def test_aged_waiter_blocks_new_reservations(tmp_path, monkeypatch):
+    monkeypatch.setattr(capacity, "AGING_SECONDS", 0)
+    ledger = _ledger(tmp_path)
+    assert ledger.try_acquire("light-1", {"cpu_slots": 1.0})
+    assert not ledger.try_acquire("heavy", {"cpu_slots": 2.0})
+
+    # Room for another light task, but the heavy one has waited long enough
+    assert not ledger.try_acquire("light-2", {"cpu_slots": 1.0})
+    ledger.release("light-1")
+    assert ledger.try_acquire("heavy", {"cpu_slots": 2.0})
+    assert set(ledger.snapshot()["waiting"]) == {"light-2"}
+
+
+def test_reservations_of_dead_processes_are_reaped(tmp_path):
+    me = psutil.Process()
+    (tmp_path / "node.json").write_text(json.dumps({
+        "capacity": NODE,
+        "reservations": {
+            "dead": {"cost": {"cpu_slots": 2.0}, "pid": _dead_pid(), "create_time": 0},
+            # Our pid, but another process's start time: the pid was reused
+            "reused": {"cost": {"cpu_slots": 2.0}, "pid": me.pid, "create_time": me.create_time() - 100},
+        },
+    }))
+    ledger = _ledger(tmp_path)
+    assert ledger.snapshot()["tasks"] == {}
+    assert ledger.try_acquire("a", {"cpu_slots": 2.0})
+
+
+def test_read_ledgers(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.try_acquire("a", {"cpu_slots": 1.0})
+    ledger.try_acquire("b", {"cpu_slots": 2.0})
+    nodes = read_ledgers(tmp_path)
+    assert set(nodes) == {"node"}
+    assert nodes["node"]["tasks"] == {"a": {"cpu_slots": 1.0}}
+    assert set(nodes["node"]["waiting"]) == {"b"}
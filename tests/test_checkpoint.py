@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from goblin_forge.core import checkpoint as checkpoint_module
+from goblin_forge.core.checkpoint import CHECKPOINT_FILE, Checkpoint, retry_delay
+from goblin_forge.plugins.base_gadget import BaseGadget
+
+
+class FlakyGadget(BaseGadget):
+    tab_id = "flaky"
+    modes = [{"id": "echo", "name": "Echo"}]
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.calls = []
+
+    async def execute(self, mode, params, result_dir):
+        self.calls.append(params["value"])
+        if params["value"] in self.failing:
+            raise ConnectionError("network down")
+        return {"status": "completed", "echo": params["value"]}
+
+
+def _run_batch(gadget, result_dir, key="batch"):
+    gadget.checkpoint = Checkpoint(result_dir, key=key)
+    items = [{"value": value} for value in ("a", "b", "c", "d")]
+    result = asyncio.run(gadget.execute_batch("echo", items, result_dir))
+    gadget.checkpoint.flush()
+    return result
+
+
+def test_saved_progress_is_resumed(tmp_path):
+    first = Checkpoint(tmp_path, key="k")
+    assert not first.resumed
+    asyncio.run(first.save(offset=10, shards=["a"]))
+
+    again = Checkpoint(tmp_path, key="k")
+    assert again.resumed
+    assert again.get("offset") == 10
+    assert again.get("shards") == ["a"]
+
+
+def test_progress_of_other_inputs_is_ignored(tmp_path):
+    asyncio.run(Checkpoint(tmp_path, key="k").save(offset=10))
+    other = Checkpoint(tmp_path, key="other")
+    assert not other.resumed
+    assert other.get("offset") is None
+
+
+def test_update_is_throttled_until_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint_module, "CHECKPOINT_INTERVAL", 3600)
+    progress = Checkpoint(tmp_path, key="k")
+    asyncio.run(progress.update(offset=1))  # First write goes through
+    asyncio.run(progress.update(offset=2))
+    assert json.loads((tmp_path / CHECKPOINT_FILE).read_text())["state"]["offset"] == 1
+    progress.flush()
+    assert json.loads((tmp_path / CHECKPOINT_FILE).read_text())["state"]["offset"] == 2
+
+
+def test_progress_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    flush = Checkpoint.flush
+
+    def recording_flush(self):
+        threads.append(threading.current_thread())
+        flush(self)
+
+    monkeypatch.setattr(Checkpoint, "flush", recording_flush)
+    monkeypatch.setattr(checkpoint_module, "CHECKPOINT_INTERVAL", 0)
+    progress = Checkpoint(tmp_path, key="k")
+    asyncio.run(progress.save(offset=1))
+    asyncio.run(progress.update(offset=2))
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_clear_removes_the_file(tmp_path):
+    progress = Checkpoint(tmp_path, key="k")
+    asyncio.run(progress.save(offset=1))
+    progress.clear()
+    assert not (tmp_path / CHECKPOINT_FILE).exists()
+    assert not Checkpoint(tmp_path, key="k").resumed
+
+
+def test_without_result_dir_nothing_is_written(tmp_path):
+    progress = Checkpoint()
+    asyncio.run(progress.save(offset=1))
+    asyncio.run(progress.update(offset=2))
+    progress.flush()
+    assert not progress.resumed
+
+
+def test_retried_batch_runs_only_unfinished_items(tmp_path):
+    failed = FlakyGadget(failing={"b", "d"})
+    result = _run_batch(failed, tmp_path)
+    assert result["failed"] == 2
+    assert failed.calls == ["a", "b", "c", "d"]
+
+    retried = FlakyGadget()
+    result = _run_batch(retried, tmp_path)
+    assert retried.checkpoint.resumed
+    assert retried.calls == ["b", "d"]
+    assert result["failed"] == 0
+    records = [json.loads(line) for line in (tmp_path / "batch_results.ndjson").read_text().splitlines()]
+    assert [record["echo"] for record in records] == ["a", "b", "c", "d"]
+
+
+def test_batch_with_other_inputs_starts_over(tmp_path):
+    _run_batch(FlakyGadget(failing={"b"}), tmp_path, key="first")
+    rerun = FlakyGadget()
+    _run_batch(rerun, tmp_path, key="second")
+    assert rerun.calls == ["a", "b", "c", "d"]
+
+
+@pytest.mark.parametrize("attempt", [1, 2, 5, 20])
+def test_retry_delay_is_capped_full_jitter(attempt):
+    delays = [retry_delay(attempt, base=10, cap=60) for _ in range(200)]
+    assert all(0 <= delay <= min(60, 10 * 2 ** (attempt - 1)) for delay in delays)
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from goblin_forge.core.minion_manager import MinionManager
+from goblin_forge.plugins.base_gadget import BaseGadget
+
+
+class EchoGadget(BaseGadget):
+    name = "Echo"
+    tab_id = "echo"
+    modes = [{"id": "echo", "name": "Echo"}]
+
+    async def execute(self, mode, params, result_dir):
+        return {"status": "completed"}
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    manager = MinionManager(results_dir=tmp_path / "results")
+    enqueued = []
+
+    def enqueue(task_info, items=None):
+        # Stand-in for the broker: nothing runs until the test completes the task
+        enqueued.append(task_info["task_id"])
+        task_info["celery_task_id"] = f"celery-{len(enqueued)}"
+        return SimpleNamespace(id=task_info["celery_task_id"])
+
+    monkeypatch.setattr(manager, "_enqueue", enqueue)
+    manager.enqueued = enqueued
+    return manager
+
+
+def _submit(manager, params):
+    return asyncio.run(manager.submit_task(EchoGadget(), "echo", params))
+
+
+def test_identical_submissions_attach_to_the_running_task(manager):
+    leader = _submit(manager, {"text": "hello"})
+    follower = _submit(manager, {"text": " hello ", "unused": ""})
+    other = _submit(manager, {"text": "bye"})
+
+    assert follower["coalesced_with"] == leader["task_id"]
+    assert follower["result_dir"] == leader["result_dir"]
+    assert follower["celery_task_id"] == leader["celery_task_id"]
+    assert "coalesced_with" not in other
+    assert manager.enqueued == [leader["task_id"], other["task_id"]]
+    assert manager.coalesced_count == 1
+
+
+def test_explicit_result_dirs_are_never_coalesced(manager, tmp_path):
+    first = asyncio.run(manager.submit_task(EchoGadget(), "echo", {"text": "a"}, result_dir=tmp_path / "a"))
+    second = asyncio.run(manager.submit_task(EchoGadget(), "echo", {"text": "a"}, result_dir=tmp_path / "b"))
+    assert "coalesced_with" not in second
+    assert manager.enqueued == [first["task_id"], second["task_id"]]
+
+
+def test_leader_completion_fans_out_to_followers(manager):
+    finished = []
+    manager.completion_listeners.append(lambda task_id, status, result: finished.append((task_id, status)))
+    leader = _submit(manager, {"text": "hello"})
+    followers = [_submit(manager, {"text": "hello"}) for _ in range(2)]
+
+    result = {"status": "completed", "result_file": "out.txt", "execution_time": 4.0}
+    manager.update_task_status(leader["task_id"], manager.STATUS_IDLE, result)
+
+    for follower in followers:
+        details = manager.get_task_details(follower["task_id"])
+        assert details["status"] == manager.STATUS_IDLE
+        assert details["result"] == result
+    assert len(manager.pending_tasks) == 0
+    assert {task_id for task_id, _ in finished} == {leader["task_id"], *(f["task_id"] for f in followers)}
+    assert manager.coalesced_seconds_saved == 8.0
+
+    # The finished task no longer takes followers
+    again = _submit(manager, {"text": "hello"})
+    assert "coalesced_with" not in again
+
+
+def test_cancelled_follower_detaches_without_stopping_the_leader(manager):
+    leader = _submit(manager, {"text": "hello"})
+    first = _submit(manager, {"text": "hello"})
+
+    response = asyncio.run(manager.cancel_task(first["task_id"]))
+    assert response["status"] == "success"
+    assert manager.get_task_details(first["task_id"])["status"] == manager.STATUS_ERROR
+    assert manager.get_task_details(leader["task_id"])["status"] == manager.STATUS_BUSY
+
+    # A later follower must not reuse the cancelled follower's id
+    second = _submit(manager, {"text": "hello"})
+    third = _submit(manager, {"text": "hello"})
+    assert len({first["task_id"], second["task_id"], third["task_id"]}) == 3
+
+    manager.update_task_status(leader["task_id"], manager.STATUS_IDLE, {"status": "completed"})
+    assert manager.get_task_details(first["task_id"])["result"] == {"error": "Task cancelled by user", "cancelled": True}
+    assert manager.get_task_details(second["task_id"])["status"] == manager.STATUS_IDLE
+    assert manager.get_task_details(third["task_id"])["status"] == manager.STATUS_IDLE
+
+
+def test_coalescing_window_can_be_disabled(manager):
+    manager.coalesce_window = 0
+    _submit(manager, {"text": "hello"})
+    _submit(manager, {"text": "hello"})
+    assert len(manager.enqueued) == 2
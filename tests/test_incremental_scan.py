@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from goblin_forge.core.results_manager import ResultsManager
+from goblin_forge.plugins import scanner_gadget
+from goblin_forge.plugins.scanner_gadget import ScannerGadget
+
+FAKE_BIN = Path(__file__).resolve().parent.parent / "benchmarks" / "fake_bin"
+
+
+@pytest.fixture
+def network(tmp_path, monkeypatch):
+    """Hosts served by the fake nmap; call write() after changing them"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PATH", f"{FAKE_BIN}{os.pathsep}{os.environ.get('PATH', '')}")
+    hosts_file = tmp_path / "network.json"
+    monkeypatch.setenv("FAKE_NMAP_HOSTS", str(hosts_file))
+    monkeypatch.delenv("FAKE_NMAP_HOST_DELAY", raising=False)
+
+    class Network(dict):
+        def write(self):
+            hosts_file.write_text(json.dumps(self))
+
+    network = Network({
+        "10.0.0.1": {"up": True, "ports": {"22": "ssh", "80": "http"}},
+        "10.0.0.2": {"up": True, "ports": {"22": "ssh", "443": "https"}},
+        "10.0.0.3": {"up": False},
+    })
+    network.write()
+    return network
+
+
+def _scan(tmp_path, name, target="10.0.0.1 10.0.0.2 10.0.0.3"):
+    result_dir = tmp_path / name
+    result_dir.mkdir()
+    result = asyncio.run(ScannerGadget().execute("incremental_scan", {"target": target}, result_dir))
+    assert result["status"] == "completed", result
+    with open(result["result_file"]) as f:
+        return json.load(f)
+
+
+def _port_numbers(ports):
+    return sorted(int(port.split("/")[0]) for port in ports)
+
+
+def test_first_scan_reports_every_live_host_as_new(network, tmp_path):
+    delta = _scan(tmp_path, "scan1")
+    assert sorted(delta["hosts_added"]) == ["10.0.0.1", "10.0.0.2"]
+    assert _port_numbers(delta["hosts_added"]["10.0.0.1"]) == [22, 80]
+    assert delta["hosts_removed"] == []
+    assert delta["hosts_changed"] == {}
+    assert delta["stats"]["full_scan_reasons"] == {"10.0.0.1": "new", "10.0.0.2": "new"}
+
+
+def test_second_scan_reports_the_diff(network, tmp_path, monkeypatch):
+    _scan(tmp_path, "scan1")
+    # A day later every known host is due for a full rescan
+    now = time.time() + 25 * 3600
+    monkeypatch.setattr(scanner_gadget.time, "time", lambda: now)
+
+    network["10.0.0.1"]["ports"]["21"] = "ftp"
+    del network["10.0.0.2"]["ports"]["443"]
+    network["10.0.0.3"] = {"up": True, "ports": {"25": "smtp"}}
+    network.write()
+    delta = _scan(tmp_path, "scan2")
+
+    assert list(delta["hosts_added"]) == ["10.0.0.3"]
+    assert _port_numbers(delta["hosts_added"]["10.0.0.3"]) == [25]
+    assert delta["hosts_removed"] == []
+    assert _port_numbers(delta["hosts_changed"]["10.0.0.1"]["opened"]) == [21]
+    assert delta["hosts_changed"]["10.0.0.1"]["closed"] == []
+    assert _port_numbers(delta["hosts_changed"]["10.0.0.2"]["closed"]) == [443]
+    assert delta["hosts_changed"]["10.0.0.2"]["opened"] == {}
+    assert delta["baseline_result_dir"] == str(tmp_path / "scan1")
+    assert set(delta["stats"]["full_scan_reasons"].values()) == {"new", "stale"}
+
+
+def test_recent_hosts_only_get_their_known_ports_rechecked(network, tmp_path):
+    _scan(tmp_path, "scan1")
+
+    network["10.0.0.1"]["ports"]["21"] = "ftp"
+    del network["10.0.0.2"]["ports"]["443"]
+    network.write()
+    delta = _scan(tmp_path, "scan2")
+
+    # A closed known port triggers a full scan; a newly opened one waits until the host is stale
+    assert list(delta["hosts_changed"]) == ["10.0.0.2"]
+    assert _port_numbers(delta["hosts_changed"]["10.0.0.2"]["closed"]) == [443]
+    assert delta["stats"]["full_scan_reasons"] == {"10.0.0.2": "changed"}
+    assert delta["stats"]["hosts_verified"] == 2
+
+
+def test_hosts_that_go_down_are_removed(network, tmp_path):
+    _scan(tmp_path, "scan1")
+    network["10.0.0.2"]["up"] = False
+    network.write()
+    delta = _scan(tmp_path, "scan2")
+    assert delta["hosts_removed"] == ["10.0.0.2"]
+    assert delta["hosts_added"] == {}
+    assert delta["hosts_changed"] == {}
+    assert delta["hosts_unchanged"] == 1
+    assert delta["stats"]["full_scan_reasons"] == {}
+
+
+def test_baselines_are_kept_per_target_set(network, tmp_path):
+    _scan(tmp_path, "scan1")
+    delta = _scan(tmp_path, "scan2", target="10.0.0.1")
+    assert list(delta["hosts_added"]) == ["10.0.0.1"]
+    assert delta["baseline_result_dir"] is None
+
+
+def test_baselines_expire_with_the_results(network, tmp_path):
+    _scan(tmp_path, "scan1")
+    results = ResultsManager(tmp_path / "results", retention_days=7)
+    [baseline] = (tmp_path / "results" / scanner_gadget.BASELINE_PREFIX).iterdir()
+    assert results.cleanup_stored_state() == 0
+
+    eight_days_ago = time.time() - 8 * 24 * 3600
+    os.utime(baseline, (eight_days_ago, eight_days_ago))
+    assert results.cleanup_stored_state() == 1
+    assert not baseline.exists()
+
+    delta = _scan(tmp_path, "scan2")
+    assert delta["baseline_result_dir"] is None
+    assert sorted(delta["hosts_added"]) == ["10.0.0.1", "10.0.0.2"]
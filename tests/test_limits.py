@@ -0,0 +1,134 @@
+import asyncio
+import os
+import resource
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from goblin_forge.core import limits
+from goblin_forge.core.limits import Cgroup, apply_limits, classify_exit, resolve_limits
+from goblin_forge.plugins.base_gadget import BaseGadget
+from goblin_forge.plugins.scanner_gadget import ScannerGadget
+
+FAKE_BIN = Path(__file__).resolve().parent.parent / "benchmarks" / "fake_bin"
+
+
+class ShellGadget(BaseGadget):
+    tab_id = "shell"
+    subprocess_limits = {"timeout_seconds": 30}
+    mode_limits = {
+        "slow": {"timeout_seconds": 0.5},
+        "busy": {"cpu_seconds": 1},
+        "writer": {"file_size_mb": 1},
+    }
+
+
+def _run(mode, cmd, tmp_path):
+    gadget = ShellGadget()
+    gadget.active_mode = mode
+    code, stdout, _ = asyncio.run(gadget.run_subprocess(cmd, cwd=tmp_path))
+    return code, stdout, gadget.subprocess_usage[-1]
+
+
+def test_mode_limits_override_gadget_and_default_limits(monkeypatch):
+    monkeypatch.setenv("GOBLIN_SUBPROCESS_LIMITS", "timeout_seconds=60, open_files=256,bogus=1,cpu_seconds=")
+    assert limits.default_limits() == {"timeout_seconds": 60.0, "open_files": 256.0}
+    resolved = resolve_limits({"timeout_seconds": 30, "cpu_seconds": 10}, {"fast": {"timeout_seconds": 5}}, "fast")
+    assert resolved == {"timeout_seconds": 5, "open_files": 256.0, "cpu_seconds": 10}
+    # A mode can lift a limit altogether
+    assert "cpu_seconds" not in resolve_limits({"cpu_seconds": 10}, {"long": {"cpu_seconds": None}}, "long")
+
+
+def test_scanner_modes_have_their_own_limits(monkeypatch):
+    monkeypatch.delenv("GOBLIN_SUBPROCESS_LIMITS", raising=False)
+    monkeypatch.setenv("PATH", f"{FAKE_BIN}{os.pathsep}{os.environ.get('PATH', '')}")
+    scanner = ScannerGadget()
+    assert scanner.get_subprocess_limits("quick_scan")["timeout_seconds"] == 300
+    assert scanner.get_subprocess_limits("ping_scan")["timeout_seconds"] == 1800
+    assert scanner.get_subprocess_limits("custom_scan")["cgroup_memory_mb"] == 1024
+
+
+def test_rlimits_are_applied_to_the_started_process():
+    process = subprocess.Popen(["sleep", "5"])
+    try:
+        apply_limits(process.pid, {"cpu_seconds": 10, "open_files": 64, "file_size_mb": 2})
+        assert resource.prlimit(process.pid, resource.RLIMIT_CPU) == (10, 15)
+        assert resource.prlimit(process.pid, resource.RLIMIT_NOFILE) == (64, 64)
+        assert resource.prlimit(process.pid, resource.RLIMIT_FSIZE) == (2 * 2**20, 2 * 2**20)
+    finally:
+        process.kill()
+        process.wait()
+    # A process that is already gone is not an error
+    apply_limits(process.pid, {"open_files": 64})
+
+
+@pytest.mark.parametrize("return_code, kwargs, expected", [
+    (0, {}, None),
+    (1, {}, None),
+    (None, {"timed_out": True}, limits.TIMEOUT),
+    (-signal.SIGKILL, {"oom_killed": True}, limits.MEMORY_LIMIT),
+    (-signal.SIGXCPU, {}, limits.CPU_LIMIT),
+    (128 + signal.SIGXCPU, {}, limits.CPU_LIMIT),
+    (-signal.SIGKILL, {"cpu_time": 10.2}, limits.CPU_LIMIT),
+    (-signal.SIGKILL, {"cpu_time": 0.1}, None),
+    (-signal.SIGXFSZ, {}, limits.FILE_SIZE_LIMIT),
+    (-signal.SIGTERM, {}, None),
+])
+def test_classify_exit(return_code, kwargs, expected):
+    assert classify_exit(return_code, {"cpu_seconds": 10}, **kwargs) == expected
+
+
+def test_timeout_stops_the_subprocess(tmp_path):
+    code, _, usage = _run("slow", ["sh", "-c", "echo started; sleep 30"], tmp_path)
+    assert usage["limit_exceeded"] == limits.TIMEOUT
+    assert usage["wall_seconds"] < 10
+    assert code == -signal.SIGTERM
+
+
+def test_cpu_limit_stops_the_subprocess(tmp_path):
+    code, _, usage = _run("busy", [sys.executable, "-c", "while True: pass"], tmp_path)
+    assert code == -signal.SIGXCPU
+    assert usage["limit_exceeded"] == limits.CPU_LIMIT
+
+
+def test_file_size_limit_stops_the_subprocess(tmp_path):
+    # Limits are applied just after the spawn, so give them time to land before the write
+    code, _, usage = _run("writer", ["sh", "-c", "sleep 0.2; head -c 3000000 /dev/zero > big.bin"], tmp_path)
+    assert usage["limit_exceeded"] == limits.FILE_SIZE_LIMIT
+    assert (tmp_path / "big.bin").stat().st_size <= 2**20
+
+
+def test_subprocess_within_limits_is_accounted(tmp_path):
+    code, stdout, usage = _run("writer", ["sh", "-c", "echo ok"], tmp_path)
+    assert (code, stdout) == (0, b"ok\n")
+    assert "limit_exceeded" not in usage
+    assert usage["stdout_bytes"] == 3
+
+
+def test_cgroup_needs_a_root_and_cgroup_limits(tmp_path, monkeypatch):
+    monkeypatch.delenv("GOBLIN_CGROUP_ROOT", raising=False)
+    assert Cgroup.create({"cgroup_cpus": 1}) is None
+    monkeypatch.setenv("GOBLIN_CGROUP_ROOT", str(tmp_path))
+    assert Cgroup.create({"timeout_seconds": 5}) is None
+    assert Cgroup.create({"cgroup_cpus": 1}) is not None
+
+
+def test_cgroup_limits_are_written(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOBLIN_CGROUP_ROOT", str(tmp_path))
+    cgroup = Cgroup.create({"cgroup_cpus": 0.5, "cgroup_memory_mb": 64})
+    assert cgroup.path.parent == tmp_path
+    assert (cgroup.path / "cpu.max").read_text() == "50000 100000"
+    assert (cgroup.path / "memory.max").read_text() == str(64 * 2**20)
+    assert (cgroup.path / "memory.swap.max").read_text() == "0"
+
+    assert not cgroup.oom_killed()
+    (cgroup.path / "memory.events").write_text("low 0\nhigh 0\nmax 3\noom 1\noom_kill 1\n")
+    assert cgroup.oom_killed()
+
+
+def test_unwritable_cgroup_root_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOBLIN_CGROUP_ROOT", str(tmp_path / "missing"))
+    assert Cgroup.create({"cgroup_memory_mb": 64}) is None
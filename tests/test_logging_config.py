@@ -0,0 +1,113 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+
+from goblin_forge.core import logging_config
+from goblin_forge.core.logging_config import (
+    NonBlockingQueueHandler, SamplingFilter, _parse_pairs, _truncate, configure_logging, get_logging_stats,
+    shutdown_logging,
+)
+
+
+def _record(level=logging.INFO, **extra):
+    record = logging.LogRecord("goblin_forge.test", level, __file__, 1, "message", (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampled_events_are_dropped_and_counted(monkeypatch):
+    sampler = SamplingFilter({"task.status": "0.25"})
+    draws = iter([0.1, 0.3, 0.9, 0.2])
+    monkeypatch.setattr(logging_config.random, "random", lambda: next(draws))
+
+    kept = [sampler.filter(_record(event="task.status")) for _ in range(4)]
+    assert kept == [True, False, False, True]
+    assert sampler.dropped == 2
+
+
+def test_records_outside_sampling_are_always_kept():
+    sampler = SamplingFilter({"task.status": 0})
+    assert sampler.filter(_record())  # No event
+    assert sampler.filter(_record(event="unlisted"))
+    assert sampler.filter(_record(logging.WARNING, event="task.status"))
+    assert sampler.filter(_record(event="task.status", error="boom"))
+    for status in logging_config.KEPT_STATUSES:
+        assert sampler.filter(_record(event="task.status", status=status))
+    assert not sampler.filter(_record(event="task.status", status="completed"))
+    assert sampler.dropped == 1
+
+
+def test_default_rates_can_be_overridden():
+    assert SamplingFilter().rates["api.gadgets"] == 0.01
+    assert SamplingFilter({"api.gadgets": "1"}).rates["api.gadgets"] == 1.0
+
+
+def test_parse_pairs_skips_incomplete_entries():
+    assert _parse_pairs(" a=1, b = 0.5 ,c=,=2,d") == {"a": "1", "b": "0.5"}
+    assert _parse_pairs(None) == {}
+
+
+def test_truncate_bounds_values():
+    assert _truncate("x" * 12, 10) == "xxxxxxxxxx...[2 more chars]"
+    assert _truncate(12345, 2) == 12345
+    assert len(_truncate(list(range(10000)), 50)) < 100
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1), max_field=5)
+    handler.handle(_record(params="abcdefgh"))
+    handler.handle(_record())
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().params == "abcde...[3 more chars]"
+
+
+@pytest.fixture
+def pipeline():
+    """Install a fresh logging pipeline, restoring the one already configured on import"""
+    logger = logging.getLogger(logging_config.ROOT_LOGGER)
+    saved = (logger.handlers, logger.propagate, logger.level)
+    previous = logging_config._listener
+    shutdown_logging()
+    stream = io.StringIO()
+    yield logger, stream
+    shutdown_logging()
+    logger.handlers, logger.propagate, logger.level = saved
+    if previous is not None:
+        logging_config._listener = logging.handlers.QueueListener(
+            logger.handlers[0].queue, *previous.handlers, respect_handler_level=True
+        )
+        logging_config._listener.start()
+
+
+def test_configured_pipeline_writes_structured_records(pipeline, monkeypatch):
+    logger, stream = pipeline
+    monkeypatch.setenv("GOBLIN_LOG_SAMPLE", "task.status=0")
+    monkeypatch.setenv("GOBLIN_LOG_MAX_FIELD", "8")
+    handler = configure_logging(service="api", stream=stream)
+    assert configure_logging(service="api", stream=stream) is handler
+
+    log = logging.getLogger("goblin_forge.core.test")
+    log.info("Task status", extra={"event": "task.status", "task_id": "t1"})
+    log.info("Task status", extra={"event": "task.status", "task_id": "t2", "status": "cancelled"})
+    log.info("Submitted", extra={"task_id": "t3", "params": "a" * 20})
+    shutdown_logging()
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [entry["task_id"] for entry in entries] == ["t2", "t3"]
+    assert entries[0]["service"] == "api" and entries[0]["level"] == "INFO"
+    assert entries[1]["params"] == "aaaaaaaa...[12 more chars]"
+    assert get_logging_stats()["dropped_sampled"] == 1
+    assert not logger.propagate
+
+
+def test_text_format(pipeline, monkeypatch):
+    _, stream = pipeline
+    monkeypatch.setenv("GOBLIN_LOG_FORMAT", "text")
+    configure_logging(stream=stream)
+    logging.getLogger("goblin_forge.core.test").warning("Slow broker", extra={"latency": 2.5})
+    shutdown_logging()
+    assert stream.getvalue().rstrip().endswith("WARNING goblin_forge.core.test: Slow broker latency=2.5")
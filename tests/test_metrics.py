@@ -0,0 +1,95 @@
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from goblin_forge.core import metrics
+
+REPO = Path(__file__).resolve().parent.parent
+
+RECORD = """
+import sys
+from goblin_forge.core import metrics
+metrics.configure_metrics(sys.argv[1])
+metrics.TASK_OUTCOMES.labels(gadget="encoder", mode="hash_md5", outcome="completed").inc(int(sys.argv[2]))
+metrics.TASK_EXECUTION_TIME.labels(gadget="encoder", mode="hash_md5").observe(0.2)
+print(metrics.os.environ["PROMETHEUS_MULTIPROC_DIR"], flush=True)
+sys.stdin.read()  # Stay alive, as a serving process would, until the test is done
+"""
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "metrics"
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(directory))
+    return directory
+
+
+@pytest.fixture
+def record(metrics_dir):
+    """Start a process that configures metrics for a service and records samples"""
+    processes = []
+
+    def record(service, count=1):
+        env = {**os.environ, "GOBLIN_METRICS_DIR": str(metrics_dir), "PYTHONPATH": str(REPO)}
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        process = subprocess.Popen([sys.executable, "-c", RECORD, service, str(count)], env=env,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        processes.append(process)
+        return Path(process.stdout.readline().strip())
+
+    yield record
+    for process in processes:
+        process.communicate("", timeout=10)
+
+
+def _sample(body, name):
+    for line in body.decode().splitlines():
+        if line.startswith(name):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} not in metrics")
+
+
+def test_samples_of_every_process_tree_are_merged(metrics_dir, record):
+    api_dir = record("api", 2)
+    minion_dir = record("minion", 3)
+    host = socket.gethostname()
+    assert api_dir.parent == minion_dir.parent == metrics_dir
+    assert api_dir.name.startswith(f"api_{host}_") and minion_dir.name.startswith(f"minion_{host}_")
+
+    body, content_type = metrics.render_metrics()
+    assert content_type.startswith("text/plain")
+    outcomes = 'goblin_task_outcomes_total{gadget="encoder",mode="hash_md5",outcome="completed"}'
+    assert _sample(body, outcomes) == 5
+    assert _sample(body, 'goblin_task_execution_seconds_count{gadget="encoder",mode="hash_md5"}') == 2
+
+
+def test_openmetrics_is_served_when_accepted(metrics_dir, record):
+    record("api")
+    body, content_type = metrics.render_metrics("application/openmetrics-text; version=1.0.0")
+    assert content_type.startswith("application/openmetrics-text")
+    assert body.rstrip().endswith(b"# EOF")
+
+
+def test_directories_of_dead_process_trees_are_removed(metrics_dir, record):
+    host = socket.gethostname()
+    dead = metrics_dir / f"minion_{host}_999999999"
+    live = metrics_dir / f"api_{host}_{os.getpid()}"
+    elsewhere = metrics_dir / "minion_other-node_1"
+    for directory in (dead, live, elsewhere):
+        directory.mkdir(parents=True)
+
+    record("minion")
+    assert not dead.exists()
+    assert live.exists() and elsewhere.exists()
+
+
+def test_each_process_tree_gets_its_own_directory(metrics_dir, record):
+    first = record("minion", 3)
+    second = record("minion", 1)
+    assert first != second and first.exists() and second.exists()
+    body, _ = metrics.render_metrics()
+    assert _sample(body, 'goblin_task_outcomes_total{gadget="encoder",mode="hash_md5",outcome="completed"}') == 4
@@ -0,0 +1,182 @@
+import asyncio
+import json
+
+import pytest
+
+from goblin_forge.core import pipeline as pipeline_module
+from goblin_forge.core.pipeline import PIPELINE_FILE, PipelineError, PipelineManager
+from goblin_forge.core.results_manager import ResultsManager
+
+
+class FakeSpec:
+    def __init__(self, tab_id, modes):
+        self.tab_id = tab_id
+        self.modes = [{"id": mode} for mode in modes]
+
+
+class FakePluginLoader:
+    specs = {"encoder": FakeSpec("encoder", ["hash_md5", "base64_encode"])}
+
+    def get_spec(self, gadget_id):
+        return self.specs.get(gadget_id)
+
+    def instantiate_gadget(self, gadget_id):
+        return gadget_id
+
+
+class FakeMinionManager:
+    """Records submitted steps; tests finish them through the completion listeners"""
+
+    STATUS_IDLE = "Idle Goblin"
+    STATUS_ERROR = "Troubled Goblin"
+
+    def __init__(self, results_dir):
+        self.results_dir = results_dir
+        self.results_manager = ResultsManager(results_dir)
+        self.completion_listeners = []
+        self.submitted = []
+        self.cancelled = []
+
+    async def submit_task(self, gadget, mode, params, result_dir=None):
+        task_id = f"task-{len(self.submitted)}"
+        self.submitted.append({"task_id": task_id, "mode": mode, "params": params, "result_dir": result_dir})
+        return {"task_id": task_id, "status": "Busy Goblin"}
+
+    async def cancel_task(self, task_id):
+        # Like MinionManager, the cancelled task finishes as an error marked cancelled
+        self.cancelled.append(task_id)
+        self.finish(task_id, ok=False, error="Task cancelled by user", cancelled=True)
+
+    def finish(self, task_id, ok=True, **result):
+        for listener in self.completion_listeners:
+            listener(task_id, self.STATUS_IDLE if ok else self.STATUS_ERROR, result)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return PipelineManager(FakeMinionManager(tmp_path / "results"), FakePluginLoader())
+
+
+def _step(step_id, parameters=None, depends_on=(), mode="hash_md5"):
+    return {"id": step_id, "gadget_id": "encoder", "mode": mode,
+            "parameters": parameters or {}, "depends_on": list(depends_on)}
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def _finish(manager, task_id, **kwargs):
+    # Outside a running loop the listener starts dependents before returning
+    manager.minion_manager.finish(task_id, **kwargs)
+
+
+def _statuses(pipeline):
+    return {step_id: step["status"] for step_id, step in pipeline["steps"].items()}
+
+
+def test_validate_orders_steps_by_dependency(manager):
+    ordered = manager.validate([
+        _step("report", {"input_file": "${steps.hash.result_file}"}),
+        _step("hash", depends_on=["fetch"]),
+        _step("fetch"),
+    ])
+    assert [step["id"] for step in ordered] == ["fetch", "hash", "report"]
+    assert ordered[2]["depends_on"] == ["hash"]
+
+
+@pytest.mark.parametrize("steps, message", [
+    ([], "at least one step"),
+    ([_step("a"), _step("a")], "Duplicate step id"),
+    ([_step("bad id")], "Invalid step id"),
+    ([{**_step("a"), "gadget_id": "nope"}], "gadget nope not found"),
+    ([_step("a", mode="nope")], "has no mode nope"),
+    ([_step("a", depends_on=["missing"])], "unknown steps"),
+    ([_step("a", {"x": ["${steps.b.result_file}"]}), _step("b", depends_on=["a"])], "Dependency cycle"),
+])
+def test_validate_rejects_bad_pipelines(manager, steps, message):
+    with pytest.raises(PipelineError, match=message):
+        manager.validate(steps)
+
+
+def test_steps_start_when_dependencies_complete(manager):
+    steps = [
+        _step("a"),
+        _step("b", {"input_file": "${steps.a.result_file}"}),
+        _step("c"),
+    ]
+    pipeline = _run(manager.submit_pipeline("demo", steps))
+    assert _statuses(pipeline) == {"a": "running", "b": "waiting", "c": "running"}
+    record = json.loads((manager.minion_manager.results_dir / pipeline["result_dir"].split("/")[-1] / PIPELINE_FILE).read_text())
+    assert record["pipeline_id"] == pipeline["pipeline_id"]
+
+    _finish(manager, pipeline["steps"]["a"]["task_id"], result_file="/results/a/result.txt")
+    assert pipeline["steps"]["b"]["status"] == "running"
+    assert manager.minion_manager.submitted[-1]["params"] == {"input_file": "/results/a/result.txt"}
+
+    _finish(manager, pipeline["steps"]["b"]["task_id"])
+    _finish(manager, pipeline["steps"]["c"]["task_id"])
+    assert pipeline["status"] == "completed"
+    assert "completion_time" in pipeline
+
+
+def test_failure_skips_every_dependent(manager):
+    steps = [
+        _step("a"),
+        _step("b", depends_on=["a"]),
+        _step("c", depends_on=["b"]),
+        _step("d"),
+    ]
+    pipeline = _run(manager.submit_pipeline("demo", steps))
+    _finish(manager, pipeline["steps"]["a"]["task_id"], ok=False, error="boom")
+    assert _statuses(pipeline) == {"a": "error", "b": "skipped", "c": "skipped", "d": "running"}
+    assert pipeline["steps"]["a"]["error"] == "boom"
+    assert pipeline["status"] == "running"
+
+    _finish(manager, pipeline["steps"]["d"]["task_id"])
+    assert pipeline["status"] == "error"
+
+
+def test_missing_output_fails_the_step(manager):
+    steps = [_step("a"), _step("b", {"input_file": "${steps.a.nothing}"}), _step("c", depends_on=["b"])]
+    pipeline = _run(manager.submit_pipeline("demo", steps))
+    _finish(manager, pipeline["steps"]["a"]["task_id"])
+    assert _statuses(pipeline) == {"a": "completed", "b": "error", "c": "skipped"}
+    assert "no output 'nothing'" in pipeline["steps"]["b"]["error"]
+    assert pipeline["status"] == "error"
+
+
+def test_cancel_stops_running_and_waiting_steps(manager):
+    pipeline = _run(manager.submit_pipeline("demo", [_step("a"), _step("b", depends_on=["a"]), _step("c")]))
+    _finish(manager, pipeline["steps"]["c"]["task_id"])
+    response = _run(manager.cancel_pipeline(pipeline["pipeline_id"]))
+    assert response["status"] == "success"
+    assert manager.minion_manager.cancelled == [pipeline["steps"]["a"]["task_id"]]
+    assert _statuses(pipeline) == {"a": "cancelled", "b": "cancelled", "c": "completed"}
+    assert "error" not in pipeline["steps"]["a"]
+    assert pipeline["status"] == "cancelled"
+    assert "completion_time" in pipeline
+
+
+def test_cancelled_step_task_skips_its_dependents(manager):
+    pipeline = _run(manager.submit_pipeline("demo", [_step("a"), _step("b", depends_on=["a"])]))
+    _finish(manager, pipeline["steps"]["a"]["task_id"], ok=False, error="Task cancelled by user", cancelled=True)
+    assert _statuses(pipeline) == {"a": "cancelled", "b": "skipped"}
+    assert pipeline["status"] == "error"
+
+
+def test_finished_pipelines_are_trimmed_but_stay_readable(manager, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "MAX_PIPELINES", 2)
+    pipelines = []
+    for i in range(3):
+        pipeline = _run(manager.submit_pipeline(f"p{i}", [_step("a")]))
+        _finish(manager, pipeline["steps"]["a"]["task_id"], result_file=f"/results/{i}.txt")
+        pipelines.append(pipeline)
+
+    assert list(manager.pipelines) == [p["pipeline_id"] for p in pipelines[1:]]
+    assert [p["pipeline_id"] for p in manager.list_pipelines()] == [p["pipeline_id"] for p in reversed(pipelines[1:])]
+
+    trimmed = _run(manager.get_pipeline(pipelines[0]["pipeline_id"]))
+    assert trimmed["status"] == "completed"
+    assert trimmed["steps"]["a"]["result"] == {"result_file": "/results/0.txt"}
+    assert _run(manager.get_pipeline("pipeline_unknown")) is None
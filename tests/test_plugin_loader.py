@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from goblin_forge.core.plugin_loader import PluginLoader
+
+PLUGIN = '''
+from goblin_forge.plugins.base_gadget import BaseGadget
+
+
+class EchoGadget(BaseGadget):
+    name = "Echo"
+    tab_id = "echo"
+    modes = [{{"id": "echo", "name": "Echo"}}]
+    form_schemas = {{"echo": {{"text": {{"type": "text"}}}}}}
+    version = {version!r}
+'''
+
+COMPUTED_SCHEMA = '''
+from goblin_forge.plugins.base_gadget import BaseGadget
+
+
+class ShoutGadget(BaseGadget):
+    name = "Shout"
+    tab_id = "shout"
+    modes = [{"id": "shout", "name": "Shout"}]
+
+    def get_form_schema(self, mode):
+        return {"text": {"type": "text", "label": mode.upper()}}
+'''
+
+
+@pytest.fixture
+def plugin_dir(tmp_path):
+    plugin_dir = tmp_path / "plugins"
+    plugin_dir.mkdir()
+    (plugin_dir / "__init__.py").write_text("")
+    (plugin_dir / "echo_gadget.py").write_text(PLUGIN.format(version="1"))
+    return plugin_dir
+
+
+def _loader(plugin_dir):
+    return PluginLoader(plugin_dir=str(plugin_dir), manifest_path=str(plugin_dir.parent / "manifest.json"))
+
+
+def test_discovery_reads_the_source_without_importing(plugin_dir):
+    loader = _loader(plugin_dir)
+    [spec] = loader.discover_gadgets()
+    assert spec.tab_id == "echo"
+    assert spec.entry["source"] == "static"
+    assert spec.modes[0]["form_schema"] == {"text": {"type": "text"}}
+    assert loader._modules == {}
+
+    # A fresh loader serves the same catalog from the manifest
+    manifest = json.loads((plugin_dir.parent / "manifest.json").read_text())
+    assert [g["tab_id"] for f in manifest["files"].values() for g in f["gadgets"]] == ["echo"]
+    assert _loader(plugin_dir).discover_gadgets()[0].modes == spec.modes
+
+
+def test_edited_plugin_is_imported_again_after_a_rescan(plugin_dir):
+    loader = _loader(plugin_dir)
+    loader.discover_gadgets()
+    assert loader.get_gadget("echo").version == "1"
+
+    (plugin_dir / "echo_gadget.py").write_text(PLUGIN.format(version="22"))
+    loader.discover_gadgets()
+    assert loader.get_gadget("echo").version == "22"
+
+
+def test_removed_plugin_is_forgotten(plugin_dir):
+    loader = _loader(plugin_dir)
+    loader.discover_gadgets()
+    loader.get_gadget("echo")
+
+    (plugin_dir / "echo_gadget.py").unlink()
+    assert loader.discover_gadgets() == []
+    assert loader.get_gadget("echo") is None
+    assert loader._modules == {} and loader._classes == {}
+
+
+def test_computed_form_schemas_are_filled_once_and_persisted(plugin_dir):
+    (plugin_dir / "shout_gadget.py").write_text(COMPUTED_SCHEMA)
+    loader = _loader(plugin_dir)
+    spec = loader.discover_gadgets()[1]
+    assert spec.tab_id == "shout" and "form_schema" not in spec.modes[0]
+
+    assert spec.describe_modes()[0]["form_schema"] == {"text": {"type": "text", "label": "SHOUT"}}
+
+    fresh = _loader(plugin_dir)
+    assert fresh.discover_gadgets()[1].describe_modes()[0]["form_schema"]["text"]["label"] == "SHOUT"
+    assert fresh._modules == {}
+
+
+def test_broken_plugin_is_retried(plugin_dir):
+    (plugin_dir / "echo_gadget.py").write_text("class Broken(:\n")
+    loader = _loader(plugin_dir)
+    assert loader.discover_gadgets() == []
+
+    (plugin_dir / "echo_gadget.py").write_text(PLUGIN.format(version="3"))
+    assert [spec.tab_id for spec in loader.discover_gadgets()] == ["echo"]
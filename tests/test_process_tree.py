@@ -0,0 +1,156 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from goblin_forge.core import process_tree
+from goblin_forge.plugins.base_gadget import BaseGadget
+
+# Starts a grandchild in the same group and reports its pid
+SPAWNER = "import subprocess, time\nchild = subprocess.Popen(['sleep', '60'])\nprint(child.pid, flush=True)\ntime.sleep(60)"
+# Ignores SIGTERM, so only SIGKILL stops it
+STUBBORN = "import signal, time\nsignal.signal(signal.SIGTERM, signal.SIG_IGN)\nprint('ready', flush=True)\ntime.sleep(60)"
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOBLIN_PROCESS_DIR", str(tmp_path / "processes"))
+
+
+def _start(code):
+    process = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True, start_new_session=True)
+    first_line = process.stdout.readline().strip()
+    return process, first_line
+
+
+def _gone(pid):
+    try:
+        return psutil.Process(pid).status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+
+
+def _registered():
+    return sorted(path.name for path in process_tree._registry_dir().glob("*.json"))
+
+
+def test_terminate_tree_stops_the_whole_group():
+    process, grandchild = _start(SPAWNER)
+    report = process_tree.terminate_tree(process.pid, grace=5)
+    process.wait(timeout=5)
+
+    assert (report["processes"], report["terminated"], report["killed"]) == (2, 2, 0)
+    assert report["survivors"] == []
+    assert report["reclaimed"]["memory_mb"] > 0
+    assert _gone(int(grandchild))
+
+
+def test_processes_ignoring_sigterm_are_killed():
+    process, _ = _start(STUBBORN)
+    start = time.monotonic()
+    report = process_tree.terminate_tree(process.pid, grace=0.3)
+    assert process.wait(timeout=5) == -9
+    assert (report["terminated"], report["killed"]) == (0, 1)
+    assert time.monotonic() - start < 3
+
+
+def test_exited_groups_report_nothing():
+    process = subprocess.Popen(["true"], start_new_session=True)
+    process.wait()
+    report = process_tree.terminate_tree(process.pid)
+    assert report["processes"] == 0
+
+
+def test_task_processes_are_found_through_the_registry():
+    mine, _ = _start(SPAWNER)
+    other, _ = _start(SPAWNER)
+    process_tree.register("task-1", mine.pid, "python")
+    process_tree.register("task-2", other.pid, "python")
+    try:
+        report = process_tree.terminate_task_processes("task-1", grace=5)
+        mine.wait(timeout=5)
+        assert (report["groups"], report["processes"], report["terminated"]) == (1, 2, 2)
+        assert other.poll() is None
+        assert _registered() == [f"task-2.{other.pid}.json"]
+    finally:
+        process_tree.terminate_tree(other.pid, grace=1)
+        other.wait(timeout=5)
+
+
+def test_unregister_removes_the_entry():
+    process = subprocess.Popen(["sleep", "60"], start_new_session=True)
+    try:
+        process_tree.register("task/1", process.pid, "sleep")
+        assert _registered() == [f"task_1.{process.pid}.json"]
+        process_tree.unregister("task/1", process.pid)
+        process_tree.unregister("task/1", process.pid)
+        assert _registered() == []
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_trees_of_dead_minions_are_reaped(monkeypatch):
+    dead_owner = subprocess.Popen(["true"])
+    dead_owner.wait()
+    orphaned, _ = _start(SPAWNER)
+    owned, _ = _start(SPAWNER)
+    process_tree.register("task-1", owned.pid, "python")
+    with monkeypatch.context() as patch:
+        patch.setattr(process_tree.os, "getpid", lambda: dead_owner.pid)
+        process_tree.register("task-2", orphaned.pid, "python")
+    try:
+        report = process_tree.reap_orphaned_trees(grace=5)
+        orphaned.wait(timeout=5)
+        assert (report["groups"], report["processes"]) == (1, 2)
+        assert owned.poll() is None
+        assert _registered() == [f"task-1.{owned.pid}.json"]
+    finally:
+        process_tree.terminate_tree(owned.pid, grace=1)
+        owned.wait(timeout=5)
+
+
+def test_merge_reports():
+    total = process_tree.merge_reports([
+        {"processes": 2, "terminated": 2, "killed": 0, "survivors": [], "reclaimed": {"memory_mb": 1.5}},
+        {"groups": 2, "processes": 3, "terminated": 1, "killed": 1, "survivors": [42], "reclaimed": {"memory_mb": 2.0}},
+    ])
+    assert total == {"groups": 3, "processes": 5, "terminated": 3, "killed": 1, "survivors": [42],
+                     "reclaimed": {"memory_mb": 3.5}}
+
+
+class ShellGadget(BaseGadget):
+    tab_id = "shell"
+
+
+def test_run_subprocess_leaves_no_background_processes():
+    gadget = ShellGadget()
+    gadget.active_task_id = "task-1"
+    code, stdout, _ = asyncio.run(gadget.run_subprocess(["sh", "-c", "sleep 60 > /dev/null 2>&1 & echo $!"]))
+    assert code == 0
+    assert _gone(int(stdout))
+    assert gadget.subprocess_usage[-1]["stopped"]["processes"] == 1
+    assert _registered() == []
+
+
+def test_cancelled_subprocess_is_stopped_with_its_children():
+    gadget = ShellGadget()
+    gadget.active_task_id = "task-1"
+
+    async def cancel_while_running():
+        task = asyncio.ensure_future(gadget.run_subprocess([sys.executable, "-c", SPAWNER]))
+        await asyncio.sleep(0.5)
+        registered = _registered()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return registered
+
+    registered = asyncio.run(cancel_while_running())
+    assert len(registered) == 1 and registered[0].startswith("task-1.")
+    pgid = int(registered[0].split(".")[1])
+    assert _gone(pgid)
+    assert _registered() == []
@@ -0,0 +1,84 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from goblin_forge.core.minion_manager import MinionManager
+from goblin_forge.core.resource_usage import ResourceMonitor
+
+
+def _burn(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_monitor_measures_cpu_time_and_memory():
+    with ResourceMonitor(sample_interval=0.01) as monitor:
+        _burn(0.2)
+        ballast = bytearray(64 * 2**20)
+        ballast[::4096] = b"x" * len(ballast[::4096])
+        time.sleep(0.05)
+    usage = monitor.stop()
+    del ballast
+
+    assert usage["cpu_user_seconds"] + usage["cpu_system_seconds"] >= 0.15
+    assert usage["run_time_seconds"] >= 0.2
+    assert usage["peak_rss_bytes"] >= 64 * 2**20
+    assert monitor.stop() is usage
+
+
+def test_monitor_counts_child_processes():
+    with ResourceMonitor(sample_interval=0.01) as monitor:
+        subprocess.run([sys.executable, "-c", "import time\nend = time.process_time() + 0.2\nwhile time.process_time() < end: pass"],
+                       check=True)
+    usage = monitor.stop()
+    assert usage["children_cpu_user_seconds"] + usage["children_cpu_system_seconds"] >= 0.15
+    assert usage["cpu_user_seconds"] < 0.15
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return MinionManager(results_dir=tmp_path / "results")
+
+
+def _finish(manager, task_id, usage, cost=None, status="completed", **extra):
+    manager.minion_details[task_id] = {
+        "task_id": task_id, "gadget_name": "Scanner", "mode": "ping", "status": manager.STATUS_BUSY,
+        "submit_time": "2026-01-01T00:00:00", "resource_cost": cost, **extra,
+    }
+    manager.pending_tasks.add(manager.minion_details[task_id])
+    manager.update_task_status(task_id, manager.STATUS_IDLE, {
+        "status": status, "resource_usage": usage, "queue_wait_seconds": 1.0,
+    })
+
+
+def test_usage_is_aggregated_per_gadget_and_mode(manager):
+    cost = {"cpu_slots": 0.5, "memory_mb": 100, "subprocesses": 1}
+    _finish(manager, "t1", {"run_time_seconds": 4.0, "cpu_user_seconds": 1.0, "cpu_system_seconds": 0.5,
+                            "children_cpu_user_seconds": 0.5, "children_cpu_system_seconds": 0.0,
+                            "peak_rss_bytes": 50 * 2**20, "read_bytes": 10, "write_bytes": 20,
+                            "subprocess_count": 1}, cost)
+    _finish(manager, "t2", {"run_time_seconds": 2.0, "cpu_user_seconds": 2.0,
+                            "peak_rss_bytes": 200 * 2**20, "subprocess_count": 3}, cost, status="error")
+
+    summary = manager.get_resource_usage()["Scanner:ping"]
+    assert summary["tasks"] == 2
+    assert summary["outcomes"] == {"completed": 1, "error": 1}
+    assert summary["cpu_seconds"] == pytest.approx(4.0)
+    assert summary["avg_cpu_seconds"] == pytest.approx(2.0)
+    assert summary["avg_run_time_seconds"] == pytest.approx(3.0)
+    assert summary["avg_queue_wait_seconds"] == pytest.approx(1.0)
+    assert (summary["read_bytes"], summary["write_bytes"]) == (10, 20)
+    assert summary["peak_rss_bytes_max"] == 200 * 2**20
+    assert summary["cpu_slots_max"] == pytest.approx(1.0)
+
+    assert summary["observed_cost"] == {"cpu_slots": pytest.approx(4.0 / 6.0), "memory_mb": 200.0, "subprocesses": 3}
+    assert summary["exceeds_declared"] == ["cpu_slots", "memory_mb", "subprocesses"]
+    assert manager.get_task_details("t1")["resource_usage"]["read_bytes"] == 10
+
+
+def test_coalesced_followers_are_not_counted_twice(manager):
+    _finish(manager, "t1", {"run_time_seconds": 1.0}, coalesced_with="t0")
+    assert manager.get_resource_usage() == {}
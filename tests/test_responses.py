@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from goblin_forge.api import responses
+from goblin_forge.api.responses import CompressionMiddleware, FastJSONResponse, choose_encoding
+
+LARGE = {"tasks": [{"task_id": f"t{i}", "status": "completed"} for i in range(200)]}
+
+
+def _app(minimum_size=None):
+    async def large(request):
+        return FastJSONResponse(LARGE)
+
+    async def small(request):
+        return FastJSONResponse({"ok": True})
+
+    async def image(request):
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    async def streamed(request):
+        async def chunks():
+            for _ in range(3):
+                yield b"x" * 1000
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app = Starlette(routes=[Route(path, endpoint) for path, endpoint in (
+        ("/large", large), ("/small", small), ("/image", image), ("/streamed", streamed),
+    )])
+    return TestClient(CompressionMiddleware(app, minimum_size=minimum_size))
+
+
+def test_fast_json_response_renders_compact_json():
+    body = FastJSONResponse({"result_dir": Path("/results/t1"), 1: "one", "items": [1, 2]}).body
+    assert body == b'{"result_dir":"/results/t1","1":"one","items":[1,2]}'
+
+
+def test_fast_json_response_without_orjson(monkeypatch):
+    monkeypatch.setattr(responses, "orjson", None)
+    assert FastJSONResponse({"a": [1, 2]}).body == b'{"a":[1,2]}'
+
+
+def test_choose_encoding_follows_client_preference(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", object())
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("br;q=0, gzip;q=0") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding(None) is None
+    monkeypatch.setattr(responses, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+
+
+def test_large_json_is_gzipped():
+    response = _app().get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(json.dumps(LARGE)) / 4
+    assert response.json() == LARGE
+
+
+def test_large_json_is_brotli_compressed(monkeypatch):
+    pytest.importorskip("brotli")
+    response = _app().get("/large", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == LARGE
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/streamed"])
+def test_other_responses_pass_through(path):
+    response = _app().get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_clients_without_accept_encoding_get_identity():
+    response = _app().get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == LARGE
+
+
+def test_minimum_size_from_environment(monkeypatch):
+    monkeypatch.setenv("GOBLIN_COMPRESS_MIN_SIZE", "1")
+    client = _app()
+    assert client.get("/small", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from goblin_forge.core import minion_manager
+from goblin_forge.core.minion_manager import MinionManager, RESULT_MANIFEST, _run_gadget_task
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    # Minions keep results under ./results, like the coordinator below
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(minion_manager, "_results_manager", None)
+    return tmp_path / "results"
+
+
+def _run(results_dir, gadget_class="EncoderGadget", **params):
+    result_dir = results_dir / "encoder_t1"
+    return result_dir, _run_gadget_task("plugins.encoder_gadget", gadget_class, "base64_encode",
+                                        params or {"input": "hello"}, str(result_dir), submitted_at=1.0)
+
+
+def test_envelope_leaves_the_full_result_on_disk(results_dir):
+    result_dir, envelope = _run(results_dir, input="hello")
+
+    assert envelope["status"] == envelope["outcome"] == "completed"
+    assert envelope["result_file"] == str(result_dir / "result.txt")
+    assert envelope["result_manifest"] == str(result_dir / RESULT_MANIFEST)
+    assert envelope["result_preview"] == "aGVsbG8="
+    for key in ("params", "result", "resource_cost", "storage"):
+        assert key not in envelope
+    assert "subprocesses" not in envelope["resource_usage"]
+    assert envelope["resource_usage"]["subprocess_count"] == 0
+
+    manifest = json.loads((result_dir / RESULT_MANIFEST).read_text())
+    assert manifest["params"] == {"input": "hello"}
+    assert manifest["result"]["result_preview"] == "aGVsbG8="
+    assert manifest["resource_usage"]["subprocesses"] == []
+    assert manifest["execution_timestamp"] == envelope["execution_timestamp"]
+
+
+def test_preview_is_capped(results_dir, monkeypatch):
+    monkeypatch.setattr(minion_manager, "RESULT_PREVIEW_CHARS", 10)
+    result_dir, envelope = _run(results_dir, input="x" * 300)
+    assert envelope["result_preview"] == "eHh4eHh4eH..."
+    # The result file itself is complete
+    assert len((result_dir / "result.txt").read_text()) == 400
+
+
+def test_failure_still_writes_the_manifest(results_dir):
+    result_dir, envelope = _run(results_dir, gadget_class="MissingGadget")
+    assert envelope["status"] == "error" and envelope["outcome"] == "exception"
+    assert "MissingGadget" in envelope["error"]
+    assert "params" not in envelope
+    manifest = json.loads((result_dir / RESULT_MANIFEST).read_text())
+    assert manifest["params"] == {"input": "hello"}
+    assert manifest["error"] == envelope["error"]
+
+
+def test_coordinator_serves_the_full_result(results_dir):
+    manager = MinionManager(results_dir=results_dir)
+    result_dir, _ = _run(results_dir, input="hello")
+    manager.minion_details["t1"] = {"task_id": "t1", "result_dir": str(result_dir)}
+    manager.minion_details["t2"] = {"task_id": "t2", "result_dir": str(results_dir / "encoder_t2")}
+
+    assert manager.get_task_result("t1")["result"]["status"] == "completed"
+    assert manager.get_task_result("t2") is None
+    assert manager.get_task_result("unknown") is None
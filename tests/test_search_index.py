@@ -0,0 +1,134 @@
+import os
+import threading
+
+import pytest
+
+from goblin_forge.core.results_manager import ResultsManager
+from goblin_forge.core.search_index import SearchIndex
+
+
+class FakeMinionManager:
+    def __init__(self, results_dir):
+        self.results_dir = results_dir
+        self.results_manager = ResultsManager(results_dir)
+        self.minion_details = {}
+        self.completion_listeners = []
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return FakeMinionManager(tmp_path / "results")
+
+
+@pytest.fixture
+def index(manager):
+    return SearchIndex(manager)
+
+
+def _result(manager, name, files):
+    result_dir = manager.results_dir / name
+    for path, content in files.items():
+        (result_dir / path).parent.mkdir(parents=True, exist_ok=True)
+        mode = "wb" if isinstance(content, bytes) else "w"
+        with open(result_dir / path, mode) as f:
+            f.write(content)
+    return result_dir
+
+
+def test_lines_are_found_by_any_substring(manager, index):
+    result_dir = _result(manager, "goblinforge_20260101_000000_scanner_ping", {
+        "scan_results.txt": "Host: 10.0.0.1\n22/open/tcp//OpenSSH 9.6\n",
+        "raw/nmap.gnmap": "Host: 10.0.0.2 Status: Up\n",
+    })
+    index.schedule_index(result_dir, task_id="t1", gadget_id="scanner", mode="ping", status="completed").result()
+
+    [match] = index.search("openssh")[0]
+    assert match["file"] == str(result_dir / "scan_results.txt")
+    assert (match["line"], match["column"], match["offset"]) == (2, 14, 15)
+    assert match["task_id"] == "t1" and match["mode"] == "ping"
+
+    matches, _ = index.search("Host: 10.0.0")
+    assert sorted(m["file"] for m in matches) == [str(result_dir / "raw/nmap.gnmap"), str(result_dir / "scan_results.txt")]
+    with pytest.raises(ValueError):
+        index.search("ab")
+
+
+def test_checkpoints_and_binary_files_are_skipped(manager, index):
+    result_dir = _result(manager, "goblinforge_20260101_000000_encoder_md5", {
+        "checkpoint.json": '{"needle": 1}',
+        "blob.bin": b"needle\0\1\2",
+        "result.txt": "no match here",
+    })
+    index.schedule_index(result_dir).result()
+    assert index.search("needle") == ([], None)
+    assert index.stats()["files"] == 1
+
+
+def test_reindexing_replaces_changed_files(manager, index):
+    result_dir = _result(manager, "goblinforge_20260101_000000_encoder_md5", {"a.txt": "first version", "b.txt": "stays"})
+    index.schedule_index(result_dir).result()
+
+    (result_dir / "a.txt").write_text("second edition, longer")
+    (result_dir / "b.txt").unlink()
+    index.schedule_index(result_dir).result()
+    assert index.search("first")[0] == []
+    assert len(index.search("second")[0]) == 1
+    assert index.search("stays")[0] == []
+
+
+def test_completion_listener_indexes_with_task_details(manager, index):
+    result_dir = _result(manager, "goblinforge_20260101_000000_encoder_md5", {"result.txt": "deadbeef"})
+    manager.minion_details["t1"] = {"result_dir": str(result_dir), "gadget_id": "encoder", "mode": "hash_md5"}
+    [listener] = manager.completion_listeners
+    listener("t1", "Idle Goblin", {"status": "completed"})
+    index.schedule_sync().result()  # Queued behind the listener's update
+
+    [match] = index.search("deadbeef", gadget_id="encoder")[0]
+    assert (match["task_id"], match["mode"], match["status"]) == ("t1", "hash_md5", "completed")
+    assert index.search("deadbeef", gadget_id="scanner")[0] == []
+
+
+def test_results_are_paged_newest_first(manager, index):
+    result_dir = _result(manager, "goblinforge_20260101_000000_encoder_md5", {
+        "result.txt": "".join(f"match {i}\n" for i in range(5)),
+    })
+    index.schedule_index(result_dir).result()
+    first, cursor = index.search("match", limit=3)
+    rest, end = index.search("match", limit=3, cursor=cursor)
+    assert [m["line"] for m in first + rest] == [5, 4, 3, 2, 1]
+    assert end is None
+
+
+def test_sync_follows_the_results_tree(manager, index):
+    old = _result(manager, "goblinforge_20260101_000000_encoder_md5", {"result.txt": "old result"})
+    index.schedule_index(old).result()
+    _result(manager, "goblinforge_20260102_000000_encoder_md5", {"step/result.txt": "new result"})
+    for path in old.iterdir():
+        path.unlink()
+    old.rmdir()
+
+    index.schedule_sync().result()
+    assert index.search("old result")[0] == []
+    assert len(index.search("new result")[0]) == 1
+
+    index.schedule_remove([manager.results_dir / "goblinforge_20260102_000000_encoder_md5"]).result()
+    assert index.stats()["results"] == 0
+
+
+def test_pending_updates_are_counted_across_threads(manager, index):
+    result_dir = _result(manager, "goblinforge_20260101_000000_encoder_md5", {"result.txt": "line"})
+    futures = []
+
+    def submit():
+        for _ in range(50):
+            futures.append(index.schedule_index(result_dir))
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for future in futures:
+        future.result()
+    assert index.stats()["pending_updates"] == 0
+    assert os.path.exists(index.path)
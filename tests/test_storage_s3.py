@@ -0,0 +1,139 @@
+import io
+
+import pytest
+
+moto = pytest.importorskip("moto")
+
+from goblin_forge.core import storage as storage_module
+from goblin_forge.core.storage import MIN_PART_BYTES, S3Storage, _BodyReader, _MultipartWriter
+
+BUCKET = "goblin-results"
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    with moto.mock_aws():
+        storage = S3Storage(bucket=BUCKET, prefix="results", region="us-east-1", results_dir=tmp_path / "results")
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+
+
+def _objects(storage):
+    response = storage.client.list_objects_v2(Bucket=BUCKET)
+    return sorted(item["Key"] for item in response.get("Contents", []))
+
+
+def _uploads(storage):
+    return storage.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+
+
+def test_small_object_is_a_single_put(s3):
+    with s3.open_write("scan/result.txt") as f:
+        f.write(b"hello")
+    assert _objects(s3) == ["results/scan/result.txt"]
+    assert _uploads(s3) == []
+    assert s3.stat("scan/result.txt").size == 5
+
+
+def test_large_object_is_uploaded_in_parts(s3):
+    data = bytes(range(256)) * (MIN_PART_BYTES * 2 // 256 + 1000)
+    writer = _MultipartWriter(s3.client, BUCKET, "results/big.bin", part_bytes=MIN_PART_BYTES)
+    with writer:
+        for start in range(0, len(data), 300_000):
+            writer.write(data[start:start + 300_000])
+
+    assert [part["PartNumber"] for part in writer._parts] == [1, 2, 3]
+    assert _uploads(s3) == []
+    with s3.open_read("big.bin") as f:
+        assert f.read() == data
+
+
+def test_failed_upload_is_aborted(s3):
+    writer = _MultipartWriter(s3.client, BUCKET, "results/big.bin", part_bytes=MIN_PART_BYTES)
+    with pytest.raises(RuntimeError):
+        with writer:
+            writer.write(b"x" * (MIN_PART_BYTES + 1))
+            assert len(_uploads(s3)) == 1
+            raise RuntimeError("scan crashed")
+    assert _uploads(s3) == []
+    assert not s3.exists("big.bin")
+
+
+def test_unfinished_upload_is_aborted_on_close(s3):
+    writer = _MultipartWriter(s3.client, BUCKET, "results/big.bin", part_bytes=MIN_PART_BYTES)
+    writer.write(b"x" * (MIN_PART_BYTES + 1))
+    writer.close()
+    assert _uploads(s3) == []
+    assert not s3.exists("big.bin")
+
+
+def test_body_reader_streams_lines_and_chunks():
+    body = io.BytesIO(b"first\nsecond\n" + b"z" * 10_000)
+    with io.BufferedReader(_BodyReader(body), buffer_size=4096) as f:
+        assert f.readline() == b"first\n"
+        assert f.readline() == b"second\n"
+        assert f.read(100) == b"z" * 100
+        assert len(f.read()) == 9_900
+    assert body.closed
+
+
+def test_read_json_and_missing_keys(s3):
+    with s3.open_write("scan/meta.json") as f:
+        f.write(b'{"hosts": 3}')
+    assert s3.read_json("scan/meta.json") == {"hosts": 3}
+    assert s3.stat("scan/nothing.json") is None
+    with pytest.raises(FileNotFoundError):
+        s3.open_read("scan/nothing.json")
+
+
+def test_publish_and_restore_round_trip(s3, tmp_path):
+    result_dir = s3.results_dir / "goblinforge_1_scan"
+    (result_dir / "raw").mkdir(parents=True)
+    (result_dir / "result.txt").write_text("open ports")
+    (result_dir / "raw" / "nmap.gnmap").write_text("Host: 10.0.0.1")
+    (result_dir / ".checkpoint.json").write_text("{}")
+
+    report = s3.publish(result_dir)
+    assert report == {"files": 2, "bytes": 24, "removed": 0}
+    assert _objects(s3) == ["results/goblinforge_1_scan/raw/nmap.gnmap", "results/goblinforge_1_scan/result.txt"]
+    assert s3.list_prefixes() == ["goblinforge_1_scan"]
+
+    # Files dropped from the working copy are dropped from the bucket on the next publish
+    (result_dir / "raw" / "nmap.gnmap").unlink()
+    assert s3.publish(result_dir)["removed"] == 1
+    assert _objects(s3) == ["results/goblinforge_1_scan/result.txt"]
+
+    (result_dir / "result.txt").unlink()
+    assert s3.restore(result_dir) == 1
+    assert (result_dir / "result.txt").read_text() == "open ports"
+    assert s3.restore(result_dir) == 0
+    assert s3.restore(tmp_path / "elsewhere") == 0
+
+
+def test_publish_rejects_directories_outside_the_results_tree(s3, tmp_path):
+    with pytest.raises(ValueError):
+        s3.publish(tmp_path / "elsewhere")
+
+
+def test_delete_prefix_batches_requests(s3, monkeypatch):
+    monkeypatch.setattr(storage_module, "DELETE_BATCH", 3)
+    for i in range(7):
+        with s3.open_write(f"old_scan/part{i}.txt") as f:
+            f.write(b"x")
+    with s3.open_write("kept_scan/result.txt") as f:
+        f.write(b"x")
+
+    batches = []
+    delete_objects = s3.client.delete_objects
+
+    def record(**kwargs):
+        batches.append(len(kwargs["Delete"]["Objects"]))
+        return delete_objects(**kwargs)
+
+    monkeypatch.setattr(s3.client, "delete_objects", record)
+    s3.delete_prefix("old_scan")
+    assert batches == [3, 3, 1]
+    assert _objects(s3) == ["results/kept_scan/result.txt"]
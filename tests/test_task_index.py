@@ -0,0 +1,94 @@
+import pytest
+
+from goblin_forge.core.task_index import TaskIndex, parse_timestamp, project_fields
+
+
+def _index(count=10):
+    index = TaskIndex()
+    for i in range(count):
+        index.add({
+            "task_id": f"t{i}",
+            "gadget_id": "scanner" if i % 2 else "encoder",
+            "mode": "quick_scan" if i % 2 else "hash_md5",
+            "status": "running",
+            "submit_time": 1000 + i,
+        })
+    return index
+
+
+def _pages(index, limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        items, cursor = index.query(limit=limit, cursor=cursor, **kwargs)
+        pages.append([task["task_id"] for task in items])
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_task_once():
+    pages = _pages(_index(10), limit=4)
+    assert pages == [["t0", "t1", "t2", "t3"], ["t4", "t5", "t6", "t7"], ["t8", "t9"]]
+
+
+def test_exact_last_page_has_no_cursor():
+    items, cursor = _index(4).query(limit=4)
+    assert len(items) == 4
+    assert cursor is None
+
+
+def test_descending_pages():
+    pages = _pages(_index(5), limit=2, descending=True)
+    assert pages == [["t4", "t3"], ["t2", "t1"], ["t0"]]
+
+
+def test_filtered_pages():
+    index = _index(10)
+    assert _pages(index, limit=2, gadget_id="scanner") == [["t1", "t3"], ["t5", "t7"], ["t9"]]
+    assert index.count(gadget_id="scanner") == 5
+    assert index.count(gadget_id="scanner", mode="hash_md5") == 0
+
+
+def test_time_bounds():
+    items, _ = _index(10).query(limit=50, since=1003, until=1005)
+    assert [task["task_id"] for task in items] == ["t3", "t4", "t5"]
+
+
+def test_cursor_survives_removal_and_reindex():
+    index = _index(6)
+    items, cursor = index.query(limit=2, status="running")
+    assert [task["task_id"] for task in items] == ["t0", "t1"]
+
+    index.remove("t2")
+    task = index.get("t3")
+    task["status"] = "done"
+    index.reindex("t3")
+
+    items, cursor = index.query(limit=2, cursor=cursor, status="running")
+    assert [task["task_id"] for task in items] == ["t4", "t5"]
+    assert cursor is None
+    assert index.count(status="done") == 1
+
+
+def test_pop_oldest_and_latest():
+    index = _index(3)
+    assert index.pop_oldest()["task_id"] == "t0"
+    assert [task["task_id"] for task in index.latest(5)] == ["t2", "t1"]
+    assert len(index) == 2
+
+
+def test_readding_a_task_moves_it_to_the_end():
+    index = _index(3)
+    index.add(dict(index.get("t0")))
+    assert [task["task_id"] for task in index] == ["t1", "t2", "t0"]
+
+
+def test_unknown_filter_is_rejected():
+    with pytest.raises(ValueError):
+        _index(2).query(owner="someone")
+
+
+def test_helpers():
+    assert parse_timestamp("1970-01-01T00:00:10+00:00") == 10
+    assert parse_timestamp("12.5") == 12.5
+    assert parse_timestamp(None) is None
+    assert project_fields({"task_id": "t", "status": "x"}, ["status", "missing"]) == {"status": "x"}
@@ -0,0 +1,138 @@
+import json
+import types
+
+import pytest
+
+from goblin_forge.core import minion_manager, tracing
+
+
+class CollectingExporter(tracing.SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def named(self, name):
+        return next(span for span in self.spans if span["name"] == name)
+
+
+@pytest.fixture
+def exporter():
+    collected = CollectingExporter()
+    tracing.set_exporter(collected)
+    yield collected
+    tracing.set_exporter(None)
+
+
+def test_traceparent_round_trip():
+    context = tracing.SpanContext("a" * 32, "b" * 16)
+    parsed = tracing.parse_traceparent(context.traceparent)
+    assert (parsed.trace_id, parsed.span_id, parsed.sampled) == ("a" * 32, "b" * 16, True)
+    assert tracing.parse_traceparent(f"00-{'a' * 32}-{'b' * 16}-00").sampled is False
+
+
+@pytest.mark.parametrize("value", [None, "", "garbage", f"00-{'a' * 31}-{'b' * 16}-01", f"00-{'a' * 32}-{'b' * 15}-01"])
+def test_malformed_traceparent_is_ignored(value):
+    assert tracing.parse_traceparent(value) is None
+
+
+def test_nested_spans_share_the_trace(exporter):
+    with tracing.start_span("outer", task_id="t1") as outer:
+        assert tracing.current_span() is outer
+        with tracing.start_span("inner") as inner:
+            assert tracing.current_traceparent() == inner.traceparent
+        assert tracing.current_span() is outer
+    assert tracing.current_span() is None
+
+    # Children finish, and are exported, first
+    assert [span["name"] for span in exporter.spans] == ["inner", "outer"]
+    inner_span, outer_span = exporter.spans
+    assert inner_span["trace_id"] == outer_span["trace_id"]
+    assert inner_span["parent_id"] == outer_span["span_id"]
+    assert outer_span["parent_id"] is None
+    assert outer_span["attributes"] == {"task_id": "t1"}
+    assert outer_span["end_time"] >= inner_span["end_time"]
+
+
+def test_remote_parent_continues_the_trace(exporter):
+    parent = tracing.SpanContext("c" * 32, "d" * 16)
+    with tracing.start_span("remote", parent=parent.traceparent):
+        pass
+    span = exporter.named("remote")
+    assert (span["trace_id"], span["parent_id"]) == ("c" * 32, "d" * 16)
+
+
+def test_error_is_recorded_and_raised(exporter):
+    with pytest.raises(ValueError):
+        with tracing.start_span("failing"):
+            raise ValueError("boom")
+    span = exporter.named("failing")
+    assert (span["status"], span["status_message"]) == ("error", "boom")
+
+
+def test_record_span_keeps_the_elapsed_interval(exporter):
+    with tracing.start_span("task") as task:
+        queued = tracing.record_span("broker.queue", 100.0, 102.5, parent=task)
+    span = exporter.named("broker.queue")
+    assert (span["start_time"], span["end_time"], span["duration_ms"]) == (100.0, 102.5, 2500.0)
+    assert span["parent_id"] == task.context.span_id
+    queued.end()  # Ending twice exports once
+    assert [span["name"] for span in exporter.spans].count("broker.queue") == 1
+
+
+def test_unsampled_traces_are_not_exported(exporter, monkeypatch):
+    monkeypatch.setenv("GOBLIN_TRACE_SAMPLE_RATE", "0")
+    with tracing.start_span("dropped"):
+        with tracing.start_span("child") as child:
+            assert not child.context.sampled
+    assert exporter.spans == []
+
+
+def test_exporter_errors_do_not_break_the_operation(exporter, monkeypatch):
+    def fail(span):
+        raise OSError("disk full")
+    monkeypatch.setattr(exporter, "export", fail)
+    with tracing.start_span("survives") as span:
+        pass
+    assert span.end_time is not None
+
+
+def test_jsonl_exporter_appends_one_line_per_span(tmp_path, monkeypatch):
+    path = tmp_path / "traces" / "spans.jsonl"
+    monkeypatch.setenv("GOBLIN_TRACE_FILE", str(path))
+    monkeypatch.setenv("GOBLIN_TRACE_EXPORTER", "jsonl")
+    tracing.set_exporter(None)
+    try:
+        with tracing.start_span("first"):
+            pass
+        with tracing.start_span("second"):
+            pass
+    finally:
+        tracing.set_exporter(None)
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["first", "second"]
+
+
+def test_request_traceparent_from_message_headers():
+    traceparent = tracing.SpanContext("e" * 32, "f" * 16).traceparent
+    assert minion_manager._request_traceparent(types.SimpleNamespace(traceparent=traceparent)) == traceparent
+    request = types.SimpleNamespace(traceparent=None, headers={"traceparent": traceparent})
+    assert minion_manager._request_traceparent(request) == traceparent
+
+
+def test_worker_spans_join_the_submitting_trace(exporter, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(minion_manager, "_results_manager", None)
+    with tracing.start_span("api.submit_task") as submit:
+        output = minion_manager.execute_gadget_task.apply(kwargs=dict(
+            gadget_module="plugins.encoder_gadget", gadget_class="EncoderGadget", mode="base64_encode",
+            params={"input": "hi"}, result_dir=str(tmp_path / "out"), task_id="t1", submitted_at=1.0,
+        ), headers={"traceparent": submit.traceparent}).get()
+    assert output["status"] == "completed"
+
+    worker = exporter.named("worker.execute_gadget_task")
+    assert worker["parent_id"] == submit.context.span_id
+    assert exporter.named("broker.queue")["parent_id"] == submit.context.span_id
+    for name in ("worker.load_gadget", "gadget.execute", "worker.publish_results"):
+        assert exporter.named(name)["parent_id"] == worker["span_id"]
+    assert {span["trace_id"] for span in exporter.spans} == {submit.context.trace_id}
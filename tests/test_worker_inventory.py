@@ -0,0 +1,157 @@
+from types import SimpleNamespace
+
+import pytest
+
+from goblin_forge.core import worker_inventory
+from goblin_forge.core.worker_inventory import WorkerInventory
+
+
+class FakeControl:
+    """Answers control commands the way the workers in `workers` would"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.broadcasts = 0
+        self.silent = set()
+
+    def broadcast(self, command, reply, timeout, limit):
+        assert command == "minion_inventory"
+        self.broadcasts += 1
+        # Replies are deserialized, so they share nothing with the worker's state
+        return [{hostname: {**report, "queues": list(report["queues"])}} for hostname, report in self.workers.items()]
+
+    def _reply(self, hostname):
+        return [] if hostname in self.silent else [{hostname: {"ok": "done"}}]
+
+    def cancel_consumer(self, queue, destination, **kwargs):
+        hostname, = destination
+        self.workers[hostname]["queues"].remove(queue)
+        return self._reply(hostname)
+
+    def add_consumer(self, queue, destination, **kwargs):
+        hostname, = destination
+        self.workers[hostname]["queues"].append(queue)
+        return self._reply(hostname)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(worker_inventory, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def workers():
+    return {
+        "minion@a": {"concurrency": 4, "active": 2, "reserved": 1, "processed": 10,
+                     "queues": ["celery", "scans"], "processes": [{"pid": 1, "rss_mb": 50.0}]},
+        "minion@b": {"concurrency": 2, "active": 0, "reserved": 0, "processed": 3, "queues": ["celery"]},
+    }
+
+
+@pytest.fixture
+def inventory(workers, clock):
+    app = SimpleNamespace(control=FakeControl(workers), conf=SimpleNamespace(task_default_queue="celery"))
+    return WorkerInventory(app)
+
+
+def _states(inventory):
+    return {worker["hostname"]: worker["state"] for worker in inventory.snapshot()["workers"]}
+
+
+def _heartbeat(inventory, hostname, processed, active, kind="worker-heartbeat"):
+    inventory._on_event({"type": kind, "hostname": hostname, "processed": processed, "active": active, "freq": 2.0})
+
+
+def test_heartbeats_give_rates_and_busy_ratio(inventory, clock):
+    for processed, active in ((10, 2), (20, 4), (40, 4)):
+        _heartbeat(inventory, "minion@a", processed, active)
+        clock.now += 2
+    clock.now -= 2
+
+    worker = inventory.snapshot()["workers"][0]
+    assert worker["hostname"] == "minion@a"
+    assert worker["tasks_per_second"] == 7.5
+    assert worker["busy_ratio"] == round((2 + 4 + 4) / 3 / 4, 3)
+    assert worker["rss_mb"] == 50.0
+
+
+def test_workers_missing_heartbeats_go_offline(inventory, workers, clock):
+    del workers["minion@b"]
+    _heartbeat(inventory, "minion@b", 1, 0)
+    assert _states(inventory)["minion@b"] == "active"
+    clock.now += 2.0 * worker_inventory.MISSED_HEARTBEATS + 1
+    inventory._expire()
+    snapshot = inventory.snapshot()
+    assert {worker["hostname"]: worker["state"] for worker in snapshot["workers"]}["minion@b"] == "offline"
+    assert snapshot["totals"]["workers"] == 1
+
+
+def test_inspection_is_cached(inventory, clock):
+    inventory.snapshot()
+    inventory.snapshot()
+    assert inventory.app.control.broadcasts == 1
+    clock.now += worker_inventory.INVENTORY_TTL + 1
+    inventory.snapshot()
+    assert inventory.app.control.broadcasts == 2
+
+
+def test_totals_cover_the_serving_workers(inventory):
+    totals = inventory.snapshot()["totals"]
+    assert totals == {"workers": 2, "consuming": 2, "concurrency": 6, "active": 2, "reserved": 1,
+                      "busy_ratio": round(2 / 6, 3), "tasks_per_second": 0, "rss_mb": 50.0}
+
+
+def test_pause_and_resume_one_worker(inventory, workers):
+    result = inventory.pause("minion@a")
+    assert result["status"] == "success"
+    assert result["queues"] == ["celery", "scans"]
+    assert workers["minion@a"]["queues"] == [] and workers["minion@b"]["queues"] == ["celery"]
+    assert _states(inventory) == {"minion@a": "paused", "minion@b": "active"}
+    assert inventory.snapshot()["totals"]["consuming"] == 1
+    assert inventory.pause("minion@a")["message"] == "Minion already paused"
+
+    result = inventory.resume("minion@a")
+    assert result["status"] == "success"
+    assert sorted(workers["minion@a"]["queues"]) == ["celery", "scans"]
+    assert _states(inventory)["minion@a"] == "active"
+    assert inventory.resume("minion@a")["message"] == "Minion not paused"
+
+
+def test_drained_once_no_tasks_are_held(inventory, workers):
+    assert inventory.pause("minion@a", drain=True)["message"] == "Minion minion@a draining"
+    assert _states(inventory)["minion@a"] == "draining"
+
+    workers["minion@a"].update(active=0, reserved=0)
+    inventory._expire()
+    assert _states(inventory)["minion@a"] == "drained"
+
+
+def test_restarted_worker_consumes_again(inventory, workers):
+    inventory.pause("minion@a", drain=True)
+    _heartbeat(inventory, "minion@a", 0, 0, kind="worker-online")
+    workers["minion@a"]["queues"] = ["celery", "scans"]
+    inventory._expire()
+    assert _states(inventory)["minion@a"] == "active"
+
+
+def test_resume_without_known_queues_uses_the_default(inventory, workers):
+    workers["minion@b"]["queues"] = []
+    assert inventory.resume("minion@b")["queues"] == ["celery"]
+    assert workers["minion@b"]["queues"] == ["celery"]
+
+
+def test_unknown_or_silent_workers(inventory):
+    assert inventory.pause("minion@z") == {"status": "error", "message": "Minion minion@z not found"}
+    assert inventory.resume("minion@z")["status"] == "error"
+    inventory.app.control.silent.add("minion@b")
+    assert inventory.pause("minion@b") == {"status": "error", "message": "Minion minion@b did not answer"}